@@ -1,12 +1,21 @@
+import bisect
+import functools
+import io
+import itertools
+import mmap
 import os
+import struct
 import sys
+import time
+#argparse, sqlite3, hashlib, pickle, zlib, signal, concurrent.futures and optional packages (numpy,
+#msgpack, orjson) are imported only where they are used, so parsing a file starts fast
 
 #===============================================================================================
 #PE Parser
 #=========
 #
 #Program for parsing and viewing the internal binary structure of executable files in PE format.
-#64bit applications not supported. Developed in Python 3.7.1.
+#Both PE32 and PE32+ (64bit) applications are supported. Developed in Python 3.7.1.
 #
 #@date: 31 June 2019
 #@version: Python 3.7.1
@@ -21,480 +30,2921 @@ PE_HEADER_OFFSET_ADDR = int("0x3C", 16)
 PE_HEADER_SIZE = int("0x14", 16)
 SECTION_HEADER_SIZE = int("0x28", 16)
 IMPORT_DIRECTORY_SIZE = int("0x14", 16)
+MAX_NAME_LENGTH = 4096      #longest DLL/API name read before the name is cut off
+HEADER_READ_SIZE = 4096     #first read of header-only queries (covers the headers of almost every file)
+PARSE_CACHE_VERSION = 3     #schema of models stored in ParseCache (increase whenever the parsed model changes)
+PARSE_CACHE_SIZE = 256      #default bound of ParseCache (in MB)
+PARSE_CACHE_FLUSH = 256     #cache hits whose access times are written to ParseCache in one transaction
+ORDINAL_DATABASE_VERSION = 1    #schema of OrdinalDatabase (older databases are migrated when opened)
+#limits of work spent on one file in form of: {limit : maximum}, exceeding any of them is an anomaly
+#(except "Warnings": warnings over the limit are only counted in one last warning)
+DEFAULT_LIMITS = {
+    "Sections": 4096,               #section headers
+    "Import Directories": 4096,
+    "Thunks": 1 << 20,              #import thunks of all import directories together
+    "Exports": 1 << 22,             #entries of all export tables together
+    "Name Bytes": 64 << 20,         #bytes of DLL/API/resource names read
+    "Resource Entries": 1 << 20,    #entries of all resource directories together
+    "Relocations": 1 << 22,         #entries of all base relocation blocks together
+    "TLS Callbacks": 4096,
+    "Warnings": 1000                #anomalies recorded by lenient parsing
+}
+SECTION_CHUNK_SIZE = 1 << 24    #bytes of section data analyzed in one go
+OUTPUT_CHUNK_SIZE = 4096        #number of export table entries read and serialized in one go
+ZERO_RUN_LENGTH = 16        #shortest run of zero bytes counted in "Zero Runs" (padding, code caves)
 
-def readBytes(file, numberOfBytes):
-    hexString = ""
-    for i in range(numberOfBytes):
-        nextByte = format(ord(file.read(1)), 'x')
-        if (len(nextByte) == 1):
-            nextByte = '0' + nextByte
-        hexString += nextByte
-    return hexString
-
-def reverseBytes(hexString):
-    reversedBytes = ""
-    for i in range(len(hexString)-1, -1, -2):
-        if (i != 0):
-            reversedBytes += (hexString[i-1] + hexString[i])
-    return reversedBytes
+MZ_SIGNATURE = 0x5A4D       #"MZ"
+PE_SIGNATURE = 0x00004550   #"PE\0\0"
+PE32_MAGIC = 0x010B
+PE32PLUS_MAGIC = 0x020B     #64-bit applications
+
+#===============================================================================================
+#Class "Layout" is a declarative description of one binary structure in form of:
+#[(field name, struct format code)]. Every structure is decoded with one precompiled little-endian
+#struct.Struct straight into a map {field name : integer}, and the byte size of every field is
+#kept for display width.
+#
+#@param:
+#   fields - list of (field name, struct format code) pairs, in the order of the structure
+#
+#@author: Physx
+#===============================================================================================
+class Layout:
+    def __init__(self, fields):
+        self.fields = [name for name, code in fields]
+        self.struct = struct.Struct("<" + "".join(code for name, code in fields))
+        self.sizes = [struct.calcsize("<" + code) for name, code in fields]
+        self.size = self.struct.size
+
+    def unpack(self, buffer, offset):
+        return dict(zip(self.fields, self.struct.unpack_from(buffer, offset)))
+
+#HEADER LAYOUTS
+MZ_HEADER_LAYOUT = Layout([("Signature", "H"), ("Bytes on Last Page of File", "H"), ("Pages in File", "H"), ("Relocations", "H"), ("Size of Header in Paragraphs", "H"), ("Minimum Extra Paragraphs", "H"), ("Maximum Extra Paragraphs", "H"), ("Initial (relative) SS", "H"), ("Initial SP", "H"), ("Checksum", "H"), ("Initial IP", "H"), ("Initial (relative) CS", "H"), ("Offset to Relocation Table", "H"), ("Overlay Number", "H")])
+
+PE_HEADER_LAYOUT = Layout([("Signature", "I"), ("Machine", "H"), ("Number of Sections", "H"), ("Time Date Stamp", "I"), ("Pointer to Symbol Table", "I"), ("Number of Symbols", "I"), ("Size of Optional Header", "H"), ("Characteristics", "H")])
+
+#data directories in the order of the data directory array at the end of the optional header, every
+#entry is decoded into fields "RVA    <name> Table" and "Size   <name> Table"
+DATA_DIRECTORY_NAMES = ["EXPORT", "IMPORT", "RESOURCE", "EXCEPTION", "CERTIFICATE", "BASE RELOCATION", "DEBUG", "ARCHITECTURE", "GLOBAL PTR", "TLS", "LOAD CONFIG", "BOUND IMPORT", "IAT", "DELAY IMPORT", "CLR RUNTIME", "RESERVED"]
+DATA_DIRECTORY_SIZE = 8
+
+#optional header layouts differ only in "Base of Data" (PE32 only) and 64-bit image base, stack and heap fields (PE32+)
+def optionalHeaderLayout(magic):
+    address = "I" if magic == PE32_MAGIC else "Q"
+    return Layout([("Magic", "H"), ("Major Linker Version", "B"), ("Minor Linker Version", "B"), ("Size of Code", "I"), ("Size of Initialized Data", "I"), ("Size of Unitialized Data", "I"), ("Address of Entry Point", "I"), ("Base of Code", "I")]
+        + ([("Base of Data", "I")] if magic == PE32_MAGIC else [])
+        + [("Image Base", address), ("Section Alignment", "I"), ("File Alignment", "I"), ("Major O/S Version", "H"), ("Minor O/S Version", "H"), ("Major Image Version", "H"), ("Minor Image Version", "H"), ("Major Subsystem Version", "H"), ("Minor Subsystem Version", "H"), ("Win32 Version Value", "I"), ("Size of Image", "I"), ("Size of Headers", "I"), ("Checksum", "I"), ("Subsystem", "H"), ("DLL Characteristics", "H"),
+           ("Size of Stack Reserve", address), ("Size of Stack Commit", address), ("Size of Heap Reserve", address), ("Size of Heap Commit", address), ("Loader Flags", "I"), ("Number of Data Directories", "I")]
+        + [(prefix + name + " Table", "I") for name in DATA_DIRECTORY_NAMES for prefix in ("RVA    ", "Size   ")])
+
+OPT_HEADER_LAYOUTS = {PE32_MAGIC: optionalHeaderLayout(PE32_MAGIC), PE32PLUS_MAGIC: optionalHeaderLayout(PE32PLUS_MAGIC)}
+
+SECTION_HEADER_LAYOUT = Layout([("Name", "8s"), ("Virtual Size", "I"), ("RVA", "I"), ("Size of Raw Data", "I"), ("Pointer to Raw Data", "I"), ("Pointer to Relocations", "I"), ("Pointer to Line Numbers", "I"), ("Number of Relocations", "H"), ("Number of Line Numbers", "H"), ("Characteristics", "I")])
+SECTION_HEADER_FIELDS = SECTION_HEADER_LAYOUT.fields[1:]
+SECTION_HEADER_SIZES = SECTION_HEADER_LAYOUT.sizes[1:]
+
+#TABLE LAYOUTS
+IMPORT_DIRECTORY_LAYOUT = Layout([("Import Name Table RVA", "I"), ("Time Date Stamp", "I"), ("Forwarder Chain", "I"), ("Name RVA", "I"), ("Import Address Table RVA", "I")])
+
+EXPORT_DIRECTORY_LAYOUT = Layout([("Characteristics", "I"), ("Time Date Stamp", "I"), ("Major Version", "H"), ("Minor Version", "H"), ("Name RVA", "I"), ("Ordinal Base", "I"), ("Number of Functions", "I"), ("Number of Names", "I"), ("Address Table RVA", "I"), ("Name Pointer Table RVA", "I"), ("Ordinal Table RVA", "I")])
+#export tables in form of: {table : (RVA field, count field, entry type, name)}, "Names" are read from the name pointer table
+EXPORT_TABLES = {"Functions": ("Address Table RVA", "Number of Functions", "I", "Export Address Table"), "Names": ("Name Pointer Table RVA", "Number of Names", "I", "Export Name Pointer Table"), "Ordinals": ("Ordinal Table RVA", "Number of Names", "H", "Export Ordinal Table")}
+
+RESOURCE_DIRECTORY_LAYOUT = Layout([("Characteristics", "I"), ("Time Date Stamp", "I"), ("Major Version", "H"), ("Minor Version", "H"), ("Number of Named Entries", "H"), ("Number of ID Entries", "H")])
+RESOURCE_ENTRY_STRUCT = struct.Struct("<II") #name offset or ID, offset of the subdirectory or of the data entry (both relative to the resource directory)
+RESOURCE_DATA_LAYOUT = Layout([("Data RVA", "I"), ("Size", "I"), ("Code Page", "I"), ("Reserved", "I")])
+RESOURCE_HIGH_BIT = 1 << 31     #set in named entries and in entries pointing to a subdirectory
+
+#IDs of predefined resource types (first level of the resource tree)
+RESOURCE_TYPES = {1: "CURSOR", 2: "BITMAP", 3: "ICON", 4: "MENU", 5: "DIALOG", 6: "STRING", 7: "FONTDIR", 8: "FONT", 9: "ACCELERATOR", 10: "RCDATA", 11: "MESSAGETABLE", 12: "GROUP_CURSOR", 14: "GROUP_ICON", 16: "VERSION", 17: "DLGINCLUDE", 19: "PLUGPLAY", 20: "VXD", 21: "ANICURSOR", 22: "ANIICON", 23: "HTML", 24: "MANIFEST"}
+
+RELOCATION_BLOCK_LAYOUT = Layout([("Page RVA", "I"), ("Block Size", "I")])
+
+DEBUG_DIRECTORY_LAYOUT = Layout([("Characteristics", "I"), ("Time Date Stamp", "I"), ("Major Version", "H"), ("Minor Version", "H"), ("Type", "I"), ("Size of Data", "I"), ("Address of Raw Data", "I"), ("Pointer to Raw Data", "I")])
+DEBUG_TYPE_CODEVIEW = 2
+CODEVIEW_RSDS_STRUCT = struct.Struct("<4sIHH8sI")  #"RSDS", GUID, age (PDB 7.0)
+CODEVIEW_NB10_STRUCT = struct.Struct("<4s4xII")    #"NB10", offset (skipped), signature, age (PDB 2.0)
+
+#TLS and load config directories hold virtual addresses, which are 64-bit in PE32+
+def tlsDirectoryLayout(magic):
+    address = "I" if magic == PE32_MAGIC else "Q"
+    return Layout([("Raw Data Start VA", address), ("Raw Data End VA", address), ("Address of Index", address), ("Address of Callbacks", address), ("Size of Zero Fill", "I"), ("Characteristics", "I")])
+
+TLS_DIRECTORY_LAYOUTS = {PE32_MAGIC: tlsDirectoryLayout(PE32_MAGIC), PE32PLUS_MAGIC: tlsDirectoryLayout(PE32PLUS_MAGIC)}
+
+#load config directory grows with every Windows version, only the fields covered by its "Size" are read
+def loadConfigLayout(magic):
+    address = "I" if magic == PE32_MAGIC else "Q"
+    return Layout([("Size", "I"), ("Time Date Stamp", "I"), ("Major Version", "H"), ("Minor Version", "H"), ("Global Flags Clear", "I"), ("Global Flags Set", "I"), ("Critical Section Default Timeout", "I"),
+        ("De-Commit Free Block Threshold", address), ("De-Commit Total Free Threshold", address), ("Lock Prefix Table", address), ("Maximum Allocation Size", address), ("Virtual Memory Threshold", address)]
+        + ([("Process Heap Flags", "I"), ("Process Affinity Mask", address)] if magic == PE32_MAGIC else [("Process Affinity Mask", address), ("Process Heap Flags", "I")])
+        + [("CSD Version", "H"), ("Dependent Load Flags", "H"), ("Edit List", address), ("Security Cookie", address), ("SE Handler Table", address), ("SE Handler Count", address),
+           ("Guard CF Check Function Pointer", address), ("Guard CF Dispatch Function Pointer", address), ("Guard CF Function Table", address), ("Guard CF Function Count", address), ("Guard Flags", "I")])
+
+LOAD_CONFIG_LAYOUTS = {PE32_MAGIC: loadConfigLayout(PE32_MAGIC), PE32PLUS_MAGIC: loadConfigLayout(PE32PLUS_MAGIC)}
+
+UINT16 = struct.Struct("<H")
+UINT32 = struct.Struct("<I")
+UINT64 = struct.Struct("<Q")
+
+#import thunks in form of: {optional header magic : (thunk struct, "import by ordinal" flag)}
+IMPORT_THUNK_FORMATS = {PE32_MAGIC: (UINT32, 1 << 31), PE32PLUS_MAGIC: (UINT64, 1 << 63)}
+
+class PEFormatError(Exception):
+    pass
+
+class RVAError(PEFormatError): #RVA doesn't fall into any section
+    pass
 
 def hexFormat(hexString): #for example: 0x0036, 0x000034fa, ...
     return '0x' + hexString
 
-def layoutPrint(firstString, secondString): #for tabular display of data
-    spaces = ""
-    for i in range(DISPLAY_LAYOUT_WIDTH - len(firstString)):
-        spaces += ' '
-    print("    " + firstString + spaces + secondString, end = '')
+def hexField(value, size): #integer field padded to its width in bytes, for example: hexField(0x36, 2) --> 0x0036
+    return hexFormat(format(value, '0' + str(size*2) + 'x'))
+
+def layoutLine(firstString, secondString): #for tabular display of data
+    return "    " + firstString.ljust(DISPLAY_LAYOUT_WIDTH) + secondString
+
+
+#===============================================================================================
+#PROFILING
+#The parser is instrumented with named stages (timed without the stages nested in them, so the
+#breakdown adds up) and counters, reported to the active profiler. By default the active profiler
+#is a NullProfiler whose hooks do nothing, so instrumentation costs one method call per stage.
+#
+#   Open           - mapping or reading the file
+#   Headers        - MZ, PE and optional header, section table
+#   Imports        - DLL names and thunk tables, per import directory
+#   Exports        - export directory and tables
+#   Export Names   - names of the export name pointer table
+#   Export Lookups - ordinal and address maps of the export table
+#   Sections       - analysis of section data
+#   Parse Cache    - hashing and database work of ParseCache
+#   Render         - output of the parsed file (tables parsed on the way are reported as their stages)
+#===============================================================================================
+class NullProfiler: #disabled profiling, every hook is a no-op
+    def stage(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def count(self, counter, amount = 1):
+        pass
+
+    def countFile(self, pe):
+        pass
+
+#===============================================================================================
+#Class "Profiler" collects stage timings and counters of parsed files. Every stage and counter is
+#also passed on to the sinks as it is recorded, in form of: sink(metric, value, kind), where kind
+#is "ms" for stage timings (value in milliseconds) and "c" for counters, see MetricsSink.
+#
+#@param:
+#   sinks - list of callables receiving the metrics (optional)
+#
+#@author: Physx
+#===============================================================================================
+class Profiler:
+    def __init__(self, sinks = None):
+        self.stages = {} # structure --> { stage : [calls, seconds] }
+        self.counters = {} # structure --> { counter : amount }
+        self.sinks = sinks or []
+        self._running = [] # structure --> [ [stage, start, seconds of nested stages] ]
+
+    def stage(self, name): #context manager timing one run of the stage
+        self._running.append([name, time.perf_counter(), 0.0])
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        name, start, nested = self._running.pop()
+        elapsed = time.perf_counter() - start
+        if (self._running):
+            self._running[-1][2] += elapsed
+        self.add(name, elapsed - nested)
+
+    def add(self, name, seconds, calls = 1):
+        stage = self.stages.get(name)
+        if (stage is None):
+            stage = self.stages[name] = [0, 0.0]
+        stage[0] += calls
+        stage[1] += seconds
+        for sink in self.sinks:
+            sink(name, seconds * 1000, "ms")
+
+    def count(self, counter, amount = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+        for sink in self.sinks:
+            sink(counter, amount, "c")
+
+    def countFile(self, pe): #counters of one parsed file, when it is closed
+        lookups = pe.index.calcPhysOffset.cache_info()
+        self.count("Files")
+        self.count("RVA Lookups", lookups.hits + lookups.misses)
+        self.count("RVA Cache Hits", lookups.hits)
+        if (pe.warnings):
+            self.count("Warnings", len(pe.warnings))
+
+    def take(self): #(stages, counters) collected so far, the profiler starts over (used to send profiles of worker processes)
+        profile = (self.stages, self.counters)
+        self.stages = {}
+        self.counters = {}
+        return profile
+
+    def merge(self, profile): #adds (stages, counters) from "take" of another profiler
+        stages, counters = profile
+        for name, (calls, seconds) in stages.items():
+            self.add(name, seconds, calls)
+        for counter, amount in counters.items():
+            self.count(counter, amount)
+
+    def close(self):
+        for sink in self.sinks:
+            if (hasattr(sink, "close")):
+                sink.close()
+
+    def report(self): #per-stage breakdown and counters as lines of text
+        total = sum(seconds for calls, seconds in self.stages.values())
+        lines = ["Profile", "=======", "    " + "Stage".ljust(20) + "Calls".rjust(10) + "Total ms".rjust(12) + "Mean us".rjust(12) + "Share".rjust(8)]
+        for name, (calls, seconds) in sorted(self.stages.items(), key = lambda item: -item[1][1]):
+            lines.append("    " + name.ljust(20) + str(calls).rjust(10) + format(seconds * 1000, ".3f").rjust(12) + format(seconds * 1e6 / calls, ".1f").rjust(12) + format(seconds / total if total else 0, ".1%").rjust(8))
+        lines.append("    " + "Total".ljust(20) + "".rjust(10) + format(total * 1000, ".3f").rjust(12))
+        lines.append("")
+        for counter, amount in self.counters.items():
+            lines.append(layoutLine(counter + ":", str(amount)))
+        if (self.counters.get("RVA Lookups")):
+            lines.append(layoutLine("RVA Cache Hit Rate:", format(self.counters["RVA Cache Hits"] / self.counters["RVA Lookups"], ".1%")))
+        return lines
+
+#===============================================================================================
+#Class "MetricsSink" writes metrics of a Profiler in statsd line format, for example:
+#"perilica.export_names:0.153|ms" or "perilica.rva_lookups:2048|c", appended to a local file, or
+#sent as UDP datagrams to a statsd compatible daemon if target is "udp://HOST:PORT". Metrics are
+#best effort: failed sends are dropped instead of stopping the parser.
+#
+#@param:
+#   target - file path or "udp://HOST:PORT"
+#   prefix - prefix of metric names
+#
+#@author: Physx
+#===============================================================================================
+class MetricsSink:
+    def __init__(self, target, prefix = "perilica."):
+        self.prefix = prefix
+        self.file = None
+        self.socket = None
+        if (target.startswith("udp://")):
+            import socket
+            host, separator, port = target[len("udp://"):].rpartition(":")
+            self.address = (host or "localhost", int(port))
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.file = open(target, "a")
+
+    def __call__(self, metric, value, kind):
+        line = self.prefix + metric.lower().replace(" ", "_") + ":" + (format(value, ".3f") if kind == "ms" else str(value)) + "|" + kind
+        if (self.file is not None):
+            self.file.write(line + "\n")
+            return
+        try:
+            self.socket.sendto(line.encode("ascii"), self.address)
+        except OSError:
+            pass
+
+    def close(self):
+        if (self.file is not None):
+            self.file.close()
+        if (self.socket is not None):
+            self.socket.close()
+
+_profiler = NullProfiler()
+
+def setProfiler(profiler): #makes the profiler active (None disables profiling), returns the previously active one
+    global _profiler
+    previous = _profiler
+    _profiler = profiler if profiler is not None else NullProfiler()
+    return previous
 
-def hexStringToASCII(hexString):
-    asciiString = ""
-    i = 0
-    while (i != len(hexString)):
-        hexPart = hexString[i] + hexString[i+1]
-        if (hexPart != '00'):
-            asciiString += chr(int(hexPart, 16))
-        i += 2
-    return asciiString
+def activeProfiler():
+    return _profiler
 
 
-#Function "calcPhysOffset"  first searches for section in which rightful section RVA is found,
-#then calculates offset address based on RVA, section RVA and Pointer to Raw Data.
+#===============================================================================================
+#Class "SectionIndex" translates RVAs into physical offsets. Section ranges are sorted by RVA once,
+#when the file is loaded, so every lookup is a bisect instead of a scan over all sections, and hot
+#lookups are served from a per-file LRU cache.
 #
 #@param:
 #   sections - map for sections' data in form of: {section name : [list of all essential data]}
-#   RVA - relative virtual address to be calculated into physical offset
+#   sizeOfHeaders - "Size of Headers" from the optional header (headers are mapped 1:1)
+#   cacheSize - number of lookups kept in the LRU cache
+#
+#@author: Physx
+#===============================================================================================
+class SectionIndex:
+    def __init__(self, sections, sizeOfHeaders = 0, cacheSize = 4096):
+        ranges = []
+        for key in sections:
+            virtualSize, sectionRVA, sizeOfRawData, pointerToRawData = sections[key][0:4]
+            size = virtualSize or sizeOfRawData
+            if (size != 0):
+                ranges.append((sectionRVA, sectionRVA + size, pointerToRawData))
+        ranges.sort()
+        self.ranges = ranges
+        self.starts = [sectionRange[0] for sectionRange in ranges]
+        self.sizeOfHeaders = sizeOfHeaders
+        self.calcPhysOffset = functools.lru_cache(maxsize = cacheSize)(self._calcPhysOffset)
+
+    #Function "calcPhysOffset" first searches for section in which rightful section RVA is found,
+    #then calculates offset address based on RVA, section RVA and Pointer to Raw Data.
+    #Raises RVAError if RVA is outside of all sections.
+    #
+    #@param:
+    #   RVA - relative virtual address (integer) to be calculated into physical offset (integer)
+    def _calcPhysOffset(self, RVA):
+        i = bisect.bisect_right(self.starts, RVA) - 1
+        if (i >= 0):
+            sectionRVA, end, pointerToRawData = self.ranges[i]
+            if (RVA < end):
+                return RVA - sectionRVA + pointerToRawData
+        elif (RVA < self.sizeOfHeaders):
+            return RVA
+        raise RVAError("RVA " + hex(RVA) + " Outside of All Sections")
+
+#Function "mapFile" maps the whole PE file into memory (read only), so headers and tables can be
+#decoded straight from the buffer without any read/seek calls.
+#
+#@param:
+#   filepath - path to the PE file
+#
+#@author: Physx
+def mapFile(filepath):
+    with open(filepath, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError: #empty files can't be mapped
+            return b""
+    _profiler.count("Bytes Mapped", len(buffer))
+    return buffer
+
+#Function "readHeaders" reads only the beginning of the file up to the end of the section table,
+#for header-only queries which never touch the rest of the file.
+#
+#@param:
+#   filepath - path to the PE file
 #
 #@author: Physx
-def calcPhysOffset(sections, RVA):
-    for key in sections:
-        virtualSize = sections[key][0]
-        sectionRVA = sections[key][1]
-        pointerToRawData = sections[key][3]
-        if ((int(sectionRVA, 16) <= (int(RVA, 16))) and (int(sectionRVA, 16) + int(virtualSize, 16) - 1) >= (int(RVA, 16))):
+def readHeaders(filepath):
+    with open(filepath, "rb") as file:
+        buffer = file.read(HEADER_READ_SIZE)
+        reads = 1
+        if (len(buffer) >= MZ_HEADER_SIZE):
+            pe_header_offset = UINT32.unpack_from(buffer, PE_HEADER_OFFSET_ADDR)[0]
+            if (pe_header_offset + PE_HEADER_LAYOUT.size > len(buffer)):
+                buffer += file.read(pe_header_offset + PE_HEADER_LAYOUT.size - len(buffer))
+                reads += 1
+            if (pe_header_offset + PE_HEADER_LAYOUT.size <= len(buffer)):
+                pe_header = PE_HEADER_LAYOUT.unpack(buffer, pe_header_offset)
+                end = pe_header_offset + PE_HEADER_LAYOUT.size + pe_header["Size of Optional Header"] + pe_header["Number of Sections"] * SECTION_HEADER_SIZE
+                if (end > len(buffer)):
+                    buffer += file.read(end - len(buffer))
+                    reads += 1
+    _profiler.count("Reads", reads)
+    _profiler.count("Bytes Read", len(buffer))
+    return buffer
+
+def raiseAnomaly(table, message, fatal = True): #anomaly handler of strict parsing
+    if (fatal):
+        raise PEFormatError(message)
+
+#Function "parseHeaders" decodes MZ header, PE header, optional header and section headers into
+#integers using the header layouts. Raises PEFormatError if the buffer is not PE32 or PE32+.
+#Anomalies of the section table are reported to the anomaly handler: a section table reaching past
+#the end of the file or over the limit is cut off, duplicate section names get "#<index>" appended.
+#Data directories past "Number of Data Directories" or past the end of the file are zero.
+#
+#@param:
+#   buffer - mmap, bytes or memoryview with the content of the PE file
+#   maxSections - limit of section headers read
+#   anomaly - function(table, message, fatal) called on anomalies (raises PEFormatError by default)
+#
+#@author: Physx
+def parseHeaders(buffer, maxSections = DEFAULT_LIMITS["Sections"], anomaly = raiseAnomaly):
+    if (len(buffer) < MZ_HEADER_SIZE or UINT16.unpack_from(buffer, 0)[0] != MZ_SIGNATURE):
+        raise PEFormatError("Not PE File Format")
+    mz_header = MZ_HEADER_LAYOUT.unpack(buffer, 0)
+
+    pe_header_offset = UINT32.unpack_from(buffer, PE_HEADER_OFFSET_ADDR)[0]
+    if (pe_header_offset + PE_HEADER_LAYOUT.size > len(buffer)):
+        raise PEFormatError("Not PE File Format")
+    pe_header = PE_HEADER_LAYOUT.unpack(buffer, pe_header_offset)
+    if (pe_header["Signature"] != PE_SIGNATURE):
+        raise PEFormatError("Not PE File Format")
+
+    optionalHeaderOffset = pe_header_offset + PE_HEADER_LAYOUT.size
+    magic = UINT16.unpack_from(buffer, optionalHeaderOffset)[0]
+    if (magic not in OPT_HEADER_LAYOUTS):
+        raise PEFormatError("Unknown Optional Header Magic " + hexField(magic, 2))
+    layout = OPT_HEADER_LAYOUTS[magic]
+    end = optionalHeaderOffset + layout.size
+    if (end > len(buffer) >= end - len(DATA_DIRECTORY_NAMES) * DATA_DIRECTORY_SIZE): #data directory array cut off by the end of the file
+        opt_header = layout.unpack(bytes(buffer[optionalHeaderOffset:end]).ljust(layout.size, b"\0"), 0)
+    else:
+        opt_header = layout.unpack(buffer, optionalHeaderOffset)
+    for name in DATA_DIRECTORY_NAMES[opt_header["Number of Data Directories"]:]: #entries past "Number of Data Directories" are not part of the array
+        opt_header["RVA    " + name + " Table"] = opt_header["Size   " + name + " Table"] = 0
+
+    sections = {} # structure --> { sectionName : [list of all data in this section] }
+    offset = optionalHeaderOffset + pe_header["Size of Optional Header"]
+    numberOfSections = pe_header["Number of Sections"]
+    if (numberOfSections > maxSections):
+        anomaly("Sections", "Sections Limit of " + str(maxSections) + " Exceeded")
+        numberOfSections = maxSections
+    for i in range(numberOfSections):
+        if (offset + SECTION_HEADER_SIZE > len(buffer)):
+            anomaly("Sections", "Section Table Out of File")
             break
-    
-    RVA = int(RVA, 16)
-    sectionRVA = int(sectionRVA, 16)
-    pointerToRawData = int(pointerToRawData, 16)
-    result = format(RVA - sectionRVA + pointerToRawData, 'x')
-    if (len(result) < 8):
-        for i in range(8 - len(result)):
-            result = '0' + result
-    return result
-
-def fourDigitString(hexString):
-    if (len(hexString) != 4):
-        for i in range(4 - len(hexString)):
-            hexString = '0' + hexString
-    return hexString
-    
-def main():
-    print("PErilica" + chr(0x2122) + "    by Physx")
-    print()
-    
-    #PE file can be drag and dropped on this .py file (if not drag and dropped, must be input in console)
-    try:
-        filepath = sys.argv[1]
-        pe_file = open(filepath, "br")
-        directories = filepath.split("\\")
-        print(directories[len(directories)-1].upper() + " " + "="*80)
-        print()
-    except:
-        print("Input file path: ", end = '')
-        filepath = input()
+        fields = SECTION_HEADER_LAYOUT.struct.unpack_from(buffer, offset)
+        sectionName = fields[0].partition(b"\0")[0].decode("latin-1")
+        if (sectionName in sections):
+            anomaly("Sections", "Duplicate Section Name \"" + sectionName + "\"", False)
+            sectionName += "#" + str(i)
+        sections[sectionName] = list(fields[1:])
+        offset += SECTION_HEADER_SIZE
+
+    return mz_header, pe_header, opt_header, sections
+
+#names decoded so far in this process in form of: {raw bytes : name}, shared by all files so the
+#same DLL/API names met in every sample of a batch are decoded and stored only once. Only short
+#names are interned and the cache stops growing at NAME_CACHE_BYTES, so a hostile corpus of long
+#unique names can't pin memory in the worker processes.
+NAME_CACHE_BYTES = 32 << 20     #memory taken by interned names (keys and decoded names)
+INTERN_NAME_LENGTH = 256        #longest interned name, longer names are decoded every time
+_nameCache = {}
+_nameCacheBytes = 0
+
+def internName(raw):
+    global _nameCacheBytes
+    name = _nameCache.get(raw)
+    if (name is None):
+        name = raw.decode("latin-1")
+        if (len(raw) <= INTERN_NAME_LENGTH and _nameCacheBytes < NAME_CACHE_BYTES):
+            _nameCache[raw] = name
+            _nameCacheBytes += sys.getsizeof(raw) + sys.getsizeof(name)
+    return name
+
+#===============================================================================================
+#Class "StringTable" reads NUL terminated ASCII names (DLL names, hint/name entries, export names,
+#forwarders) straight from the buffer with a single find per name. Names are deduplicated per
+#offset within the file and interned across files.
+#
+#@param:
+#   buffer - mmap, bytes or memoryview with the content of the PE file
+#   maxLength - longest name read, unterminated names are cut off at this length
+#
+#@author: Physx
+#===============================================================================================
+class StringTable:
+    def __init__(self, buffer, maxLength = MAX_NAME_LENGTH):
+        self.buffer = buffer
+        self.maxLength = maxLength
+        self._names = {}
+
+    def read(self, offset):
+        name = self._names.get(offset)
+        if (name is None):
+            name = self._names[offset] = self.readOnce(offset)
+        return name
+
+    def readOnce(self, offset): #name that is read only once (export names), without keeping it per offset
+        if (isinstance(self.buffer, memoryview)): #no find on views: only the longest possible name is copied
+            return internName(bytes(self.buffer[offset:offset + self.maxLength]).partition(b"\0")[0])
+        end = self.buffer.find(b"\0", offset, offset + self.maxLength)
+        if (end == -1):
+            end = min(offset + self.maxLength, len(self.buffer))
+        return internName(bytes(self.buffer[offset:end])) #slices of a bytearray aren't hashable, slices of bytes and mmap are bytes already
+
+#===============================================================================================
+#Class "PEFile" is the object model of one loaded PE file. Headers and section headers are decoded
+#when the object is created, while import and export tables are parsed on first access of the
+#"imports" and "exports" attributes, so header-only queries never touch the tables.
+#
+#@param:
+#   source - path to the PE file, or bytes/bytearray/memoryview/mmap with its content
+#   ordinalDatabase - OrdinalDatabase used to resolve names of imports by ordinal (optional)
+#   maxNameLength - longest DLL/API name read from the string tables
+#   headersOnly - read only the headers and the section table of the file at path (its tables can't be parsed then)
+#   strict - stop on the first anomaly with PEFormatError, otherwise (lenient parsing) anomalies are
+#            recorded in "warnings" and the rest of the file is parsed
+#   limits - {limit : maximum} overriding DEFAULT_LIMITS
+#
+#Every read is checked against the end of the file and every table walk takes its entries from
+#the limits, so a hostile file can't make the parser read past the buffer, loop for long or
+#allocate huge tables.
+#
+#@author: Physx
+#===============================================================================================
+class PEFile:
+    _UNPARSED = object()
+
+    def __init__(self, source, ordinalDatabase = None, maxNameLength = MAX_NAME_LENGTH, headersOnly = False, strict = True, limits = None):
+        self.filepath = None
+        self.ordinalDatabase = ordinalDatabase
+        self.strict = strict
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.warnings = [] #anomalies in form of: [{"Table": ..., "Message": ...}]
+        self._suppressedWarnings = 0
+        self._budget = dict(self.limits)
+        self._mapped = False
+        if (isinstance(source, memoryview) and (source.format != "B" or source.ndim != 1)):
+            source = source.cast("B") #views are read in place, only flattened to bytes
+        if (isinstance(source, (bytes, bytearray, memoryview, mmap.mmap))):
+            self.buffer = source
+        else:
+            self.filepath = source
+            with _profiler.stage("Open"):
+                if (headersOnly):
+                    self.buffer = readHeaders(source)
+                else:
+                    self.buffer = mapFile(source)
+                    self._mapped = isinstance(self.buffer, mmap.mmap)
+        try:
+            with _profiler.stage("Headers"):
+                self.mz_header, self.pe_header, self.opt_header, self.sections = parseHeaders(self.buffer, self.limits["Sections"], self._anomaly)
+        except struct.error:
+            self.close()
+            raise PEFormatError("Not PE File Format")
+        except PEFormatError:
+            self.close()
+            raise
+        self.index = SectionIndex(self.sections, self.opt_header["Size of Headers"])
+        self.strings = StringTable(self.buffer, maxNameLength)
+        self.thunkStruct, self.ordinalFlag = IMPORT_THUNK_FORMATS[self.opt_header["Magic"]]
+        self._imports = PEFile._UNPARSED
+        self._exports = PEFile._UNPARSED
+        self._exportMaps = None
+        self._sectionAnalysis = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        _profiler.countFile(self)
+        self.close()
+
+    def close(self):
+        if (self._mapped):
+            self.buffer.close()
+            self._mapped = False
+
+    @property
+    def imports(self): #list of import directories, each with its list of "Thunks"
+        if (self._imports is PEFile._UNPARSED):
+            self._imports = self._parseImports()
+        return self._imports
+
+    @property
+    def exports(self): #export directory with "Functions", "Names" and "Ordinals" tables, None if there is no export table
+        if (self._exports is PEFile._UNPARSED):
+            self._exports = self._parseExports()
+        return self._exports
+
+    def physOffset(self, RVA):
+        return self.index.calcPhysOffset(RVA)
+
+    def _anomaly(self, table, message, fatal = True): #strict parsing stops on fatal anomalies, lenient parsing records all of them
+        if (self.strict and fatal):
+            raise PEFormatError(message)
+        if (len(self.warnings) < self.limits["Warnings"]):
+            self.warnings.append({"Table": table, "Message": message})
+            return
+        #a hostile file can raise millions of anomalies: the ones over the limit only update the last warning
+        self._suppressedWarnings += 1
+        if (self._suppressedWarnings == 1):
+            self.warnings.append({"Table": "Warnings", "Message": ""})
+        self.warnings[-1]["Message"] = str(self._suppressedWarnings) + " Further Warnings Suppressed"
+
+    def _spend(self, limit, amount, table): #takes work from the limit, returns how much of it is allowed
+        allowed = max(min(amount, self._budget[limit]), 0)
+        if (allowed < amount and self._budget[limit] >= 0):
+            self._anomaly(table, limit + " Limit of " + str(self.limits[limit]) + " Exceeded")
+        self._budget[limit] -= amount
+        return allowed
+
+    def _locate(self, RVA, table): #physical offset of RVA, None if it is outside all sections (lenient parsing)
+        try:
+            return self.physOffset(RVA)
+        except RVAError as error:
+            self._anomaly(table, str(error))
+            return None
+
+    def _inFile(self, offset, size, table, what): #bounds check of a read from the buffer
+        if (offset + size <= len(self.buffer)):
+            return True
+        self._anomaly(table, what + " Out of File")
+        return False
+
+    def _readName(self, RVA, table): #DLL/API name at RVA, "" if it can't be read (lenient parsing)
+        try:
+            offset = self.index.calcPhysOffset(RVA)
+        except RVAError as error:
+            self._anomaly(table, str(error))
+            return ""
+        return self._readNameAt(offset, table)
+
+    def _readNameAt(self, offset, table):
+        if (offset >= len(self.buffer)):
+            self._anomaly(table, "Name Out of File", False)
+            return ""
+        name = self.strings.read(offset)
+        #names are the hottest read, so the limit is spent here without going through "_spend"
+        budget = self._budget
+        budget["Name Bytes"] -= len(name) + 1
+        if (budget["Name Bytes"] < 0):
+            if (budget["Name Bytes"] + len(name) + 1 >= 0):
+                self._anomaly(table, "Name Bytes Limit of " + str(self.limits["Name Bytes"]) + " Exceeded")
+            return ""
+        return name
+
+    def _readNames(self, RVAs, table): #names at RVAs, read name by name only if some of them are damaged or over the limit
+        calcPhysOffset, read = self.index.calcPhysOffset, (self.strings.readOnce if table == "Exports" else self.strings.read)
         try:
-            pe_file = open(filepath, "br"); print()
-            if ("/" in filepath):
-                directories = filepath.split("/")
+            names = [read(calcPhysOffset(RVA)) for RVA in RVAs]
+        except RVAError:
+            names = None
+        if (names is None or "" in names or sum(map(len, names)) + len(names) > self._budget["Name Bytes"]):
+            return [self._readName(RVA, table) for RVA in RVAs]
+        self._budget["Name Bytes"] -= sum(map(len, names)) + len(names)
+        return names
+
+    def _parseImports(self):
+        return list(self._walkImports())
+
+    def iterImports(self, withThunks = True): #yields import directories one by one, without keeping them if "imports" wasn't parsed yet
+        if (self._imports is not PEFile._UNPARSED):
+            return iter(self._imports)
+        return self._walkImports(withThunks)
+
+    def _walkImports(self, withThunks = True): #without thunks, only the import directory table and DLL names are read
+        importTableRVA = self.opt_header["RVA    IMPORT Table"]
+        if (importTableRVA == 0):
+            return
+        offset = self._locate(importTableRVA, "Imports")
+        while (offset is not None and self._inFile(offset, IMPORT_DIRECTORY_SIZE, "Imports", "Import Directory Table")):
+            directory = IMPORT_DIRECTORY_LAYOUT.unpack(self.buffer, offset)
+            if (not any(directory.values())): #20 Bytes of Zeroes = End of Import Directory
+                return
+            if (self._spend("Import Directories", 1, "Imports") == 0):
+                return
+            with _profiler.stage("Imports"):
+                directory["Name"] = self._readName(directory["Name RVA"], "Imports")
+                if (withThunks):
+                    directory["Thunks"] = self._parseThunks(directory["Name"], directory["Import Name Table RVA"] or directory["Import Address Table RVA"])
+            yield directory
+            offset += IMPORT_DIRECTORY_SIZE
+
+    def _parseThunks(self, dllName, importNameTableRVA):
+        thunks = []
+        offset = self._locate(importNameTableRVA, "Imports")
+        if (offset is None):
+            return thunks
+        #the thunk table ends at the first zero thunk, at the end of the file or at the thunk limit
+        buffer = self.buffer
+        unpackThunk, unpackHint, readNameAt, ordinalFlag = self.thunkStruct.unpack_from, UINT16.unpack_from, self._readNameAt, self.ordinalFlag
+        calcPhysOffset = self.index.calcPhysOffset
+        size = self.thunkStruct.size
+        end = len(buffer) - size
+        limit = offset + max(self._budget["Thunks"], 0) * size
+        while (True):
+            if (offset > end):
+                self._anomaly("Imports", "Import Thunk Table Out of File")
+                break
+            thunk = unpackThunk(buffer, offset)[0]
+            if (thunk == 0):
+                break
+            if (offset >= limit):
+                self._spend("Thunks", len(thunks) + 1, "Imports")
+                return thunks
+            if (thunk & ordinalFlag):
+                ordinal = thunk & 0xFFFF
+                thunks.append({"Ordinal": ordinal, "Hint": None, "Name": self._ordinalName(dllName, ordinal)})
             else:
-                directories = filepath.split("\\")
-            print(directories[len(directories)-1].upper() + " " + "="*80)
-            print()
-        except:
-            print("Error: This File Doesn't Exist!")
+                try:
+                    hintNameOffset = calcPhysOffset(thunk & 0x7FFFFFFF)
+                except RVAError as error:
+                    self._anomaly("Imports", str(error))
+                    hintNameOffset = None
+                if (hintNameOffset is not None and hintNameOffset + 2 <= len(buffer)):
+                    thunks.append({"Ordinal": None, "Hint": unpackHint(buffer, hintNameOffset)[0], "Name": readNameAt(hintNameOffset + 2, "Imports")})
+                else:
+                    if (hintNameOffset is not None):
+                        self._anomaly("Imports", "Hint/Name Entry Out of File")
+                    thunks.append({"Ordinal": None, "Hint": 0, "Name": ""})
+            offset += size
+        self._spend("Thunks", len(thunks), "Imports")
+        return thunks
+
+    def _ordinalName(self, dllName, ordinal): #ordinal imports are looked up in exports of the imported DLL
+        if (self.ordinalDatabase is None):
+            return ""
+        return self.ordinalDatabase.lookup(dllName, ordinal) or ""
+
+    @property
+    def exportNames(self): #{ordinal index : name}
+        return self._resolveExports()[0]
+
+    @property
+    def exportAddresses(self): #{name : function RVA}
+        return self._resolveExports()[1]
+
+    def _resolveExports(self):
+        if (self._exportMaps is None):
+            exports = self.exports
+            with _profiler.stage("Export Lookups"):
+                self._exportMaps = resolveExports(exports)
+        return self._exportMaps
+
+    def exportDirectory(self): #export directory with its "Name", without reading the tables (None if there is no export table)
+        if (self._exports is not PEFile._UNPARSED):
+            return self._exports
+        exportTableRVA = self.opt_header["RVA    EXPORT Table"]
+        if (exportTableRVA == 0):
+            return None
+        offset = self._locate(exportTableRVA, "Exports")
+        if (offset is None or not self._inFile(offset, EXPORT_DIRECTORY_LAYOUT.size, "Exports", "Export Directory")):
+            return None
+        exports = EXPORT_DIRECTORY_LAYOUT.unpack(self.buffer, offset)
+        exports["Name"] = self._readName(exports["Name RVA"], "Exports")
+        return exports
+
+    def _tableSpan(self, RVA, count, code, what): #(offset, number of entries) of export table, cut off at the end of the file and at the limit (lenient parsing)
+        count = self._spend("Exports", count, "Exports")
+        if (count == 0):
+            return None, 0
+        offset = self._locate(RVA, "Exports")
+        if (offset is None):
+            return None, 0
+        size = struct.calcsize("<" + code)
+        if (offset >= len(self.buffer)):
+            self._anomaly("Exports", what + " Out of File")
+            return None, 0
+        if (not self._inFile(offset, count * size, "Exports", what)):
+            count = max(len(self.buffer) - offset, 0) // size
+        return offset, count
+
+    def _readTable(self, RVA, count, code, what):
+        offset, count = self._tableSpan(RVA, count, code, what)
+        if (count == 0):
+            return []
+        return list(struct.unpack_from("<" + str(count) + code, self.buffer, offset))
+
+    def _readForwarders(self, exports, functions, start = 0): #function RVAs pointing back into the export directory are forwarder strings ("DLL.Function")
+        exportTableRVA = self.opt_header["RVA    EXPORT Table"]
+        exportTableEnd = exportTableRVA + self.opt_header["Size   EXPORT Table"]
+        for i, functionRVA in enumerate(functions, start):
+            if (exportTableRVA <= functionRVA < exportTableEnd):
+                exports["Forwarders"][i] = self._readName(functionRVA, "Exports")
+
+    #Function "exportTable" reads export table "Functions", "Names" or "Ordinals" in chunks, straight
+    #from the file if "exports" wasn't parsed, so renderers stream even huge tables without holding
+    #them. Forwarders met among "Functions" are collected into exports["Forwarders"] meanwhile.
+    #
+    #@param:
+    #   exports - export directory (see "exportDirectory")
+    #   table - "Functions", "Names" or "Ordinals"
+    #   chunkSize - number of entries in one chunk
+    #
+    #@return: (number of entries, iterator of chunks of entries)
+    def exportTable(self, exports, table, chunkSize = OUTPUT_CHUNK_SIZE):
+        if (self._exports is not PEFile._UNPARSED):
+            values = exports[table]
+            return len(values), (values[start:start + chunkSize] for start in range(0, len(values), chunkSize))
+        RVAField, countField, code, what = EXPORT_TABLES[table]
+        offset, count = self._tableSpan(exports[RVAField], exports[countField], code, what)
+        exports.setdefault("Forwarders", {})
+        return count, self._exportChunks(exports, table, offset, count, code, chunkSize)
+
+    def _exportChunks(self, exports, table, offset, count, code, chunkSize):
+        size = struct.calcsize("<" + code)
+        for start in range(0, count, chunkSize):
+            with _profiler.stage("Exports"):
+                values = list(struct.unpack_from("<" + str(min(chunkSize, count - start)) + code, self.buffer, offset + start * size))
+                if (table == "Names"):
+                    with _profiler.stage("Export Names"):
+                        values = self._readNames(values, "Exports")
+                elif (table == "Functions"):
+                    self._readForwarders(exports, values, start)
+            yield values
+
+    def _parseExports(self):
+        with _profiler.stage("Exports"):
+            return self._parseExportTables()
+
+    def _parseExportTables(self):
+        exports = self.exportDirectory()
+        if (exports is None):
+            return None
+
+        #all three tables are read with one unpack each
+        exports["Functions"] = self._readTable(exports["Address Table RVA"], exports["Number of Functions"], *EXPORT_TABLES["Functions"][2:])
+        namePointers = self._readTable(exports["Name Pointer Table RVA"], exports["Number of Names"], *EXPORT_TABLES["Names"][2:])
+        exports["Ordinals"] = self._readTable(exports["Ordinal Table RVA"], exports["Number of Names"], *EXPORT_TABLES["Ordinals"][2:])
+        with _profiler.stage("Export Names"):
+            exports["Names"] = self._readNames(namePointers, "Exports")
+        exports["Forwarders"] = {}
+        self._readForwarders(exports, exports["Functions"])
+        return exports
+
+    def dataDirectory(self, name): #(RVA, size) of the data directory, for example: dataDirectory("RESOURCE")
+        return self.opt_header["RVA    " + name + " Table"], self.opt_header["Size   " + name + " Table"]
+
+    def _content(self): #content of the file, mapped again if this object was restored from ParseCache without it
+        if (not self.buffer and self.filepath is not None):
+            self.buffer = mapFile(self.filepath)
+            self._mapped = isinstance(self.buffer, mmap.mmap)
+            self.strings = StringTable(self.buffer, self.strings.maxLength)
+        return self.buffer
+
+    #Function "iterResources" walks the resource tree depth first and yields its nodes one at a time:
+    #directories with the RESOURCE_DIRECTORY_LAYOUT fields and data entries with the RESOURCE_DATA_LAYOUT
+    #fields, each with its "Path" from the root (names of named entries, IDs of the others, the first
+    #level being the resource type, see RESOURCE_TYPES). Only the directories on the way from the root
+    #are kept, so even huge trees are walked in constant memory, and a directory pointing back to one
+    #of them is reported as an anomaly instead of being walked forever.
+    def iterResources(self):
+        resourceRVA = self.dataDirectory("RESOURCE")[0] #the tree is bounded by the file and the limits, not by the directory size
+        if (resourceRVA == 0):
+            return
+        buffer = self._content()
+        base = self._locate(resourceRVA, "Resources")
+        if (base is None):
             return
+        node = self._resourceDirectory(base, [])
+        if (node is None):
+            return
+        yield node
+        stack = [[0, 0, self._resourceEntries(node), []]] # structure --> [ [directory offset, next entry, number of entries, path] ]
+        while (stack):
+            frame = stack[-1]
+            directoryOffset, index, count, path = frame
+            if (index >= count):
+                stack.pop()
+                continue
+            frame[1] += 1
+            entryOffset = base + directoryOffset + RESOURCE_DIRECTORY_LAYOUT.size + index * RESOURCE_ENTRY_STRUCT.size
+            if (not self._inFile(entryOffset, RESOURCE_ENTRY_STRUCT.size, "Resources", "Resource Directory Entry")):
+                stack.pop()
+                continue
+            nameOrID, target = RESOURCE_ENTRY_STRUCT.unpack_from(buffer, entryOffset)
+            entryPath = path + [self._resourceName(base + (nameOrID ^ RESOURCE_HIGH_BIT)) if nameOrID & RESOURCE_HIGH_BIT else nameOrID]
+            if (target & RESOURCE_HIGH_BIT):
+                target ^= RESOURCE_HIGH_BIT
+                if (any(target == ancestor[0] for ancestor in stack)):
+                    self._anomaly("Resources", "Resource Directory Loop at " + hex(target))
+                    continue
+                node = self._resourceDirectory(base + target, entryPath)
+                if (node is not None):
+                    yield node
+                    stack.append([target, 0, self._resourceEntries(node), entryPath])
+            elif (self._inFile(base + target, RESOURCE_DATA_LAYOUT.size, "Resources", "Resource Data Entry")):
+                node = {"Path": entryPath}
+                node.update(RESOURCE_DATA_LAYOUT.unpack(buffer, base + target))
+                yield node
 
-    #CHECKING IF THE LOADED FILE IS IN PE FORMAT AND 32BIT APPLICATION==========
-    mz = reverseBytes(readBytes(pe_file, 2))
-    if not(mz == "5a4d" or mz == "5A4D"):
-        print("Error: Not PE File Format! Program Terminated.")
-        return
-    pe_file.seek(PE_HEADER_OFFSET_ADDR)
-    pe_header_offset = reverseBytes(readBytes(pe_file, 4))
-    pe_file.seek(int(pe_header_offset, 16) + 4)
-    machine = reverseBytes(readBytes(pe_file, 2))
-    if not(machine == "014c" or machine == "014C"):
-        print("Error: 64-bit Applications Not Supported! Program Terminated.")
-        return
-    #===========================================================================
-    pe_file.seek(0)
-
-    #MZ HEADER LOADING
-    mz_header = {"Signature": "", "Bytes on Last Page of File": "", "Pages in File": "", "Relocations": "", "Size of Header in Paragraphs": "", "Minimum Extra Paragraphs": "", "Maximum Extra Paragraphs": "", "Initial (relative) SS": "", "Initial SP": "", "Checksum": "", "Initial IP": "", "Initial (relative) CS": "", "Offset to Relocation Table": "", "Overlay Number": ""}
-    for i in range(0, MZ_HEADER_SIZE, 2):
-        for key in mz_header:
-            if (mz_header[key] == ""):
-                mz_header[key] = reverseBytes(readBytes(pe_file, 2))
+    def _resourceDirectory(self, offset, path): #resource directory node at physical offset (None if it is out of file)
+        if (not self._inFile(offset, RESOURCE_DIRECTORY_LAYOUT.size, "Resources", "Resource Directory")):
+            return None
+        node = {"Path": path}
+        node.update(RESOURCE_DIRECTORY_LAYOUT.unpack(self.buffer, offset))
+        return node
+
+    def _resourceEntries(self, node): #number of entries of the resource directory taken from the limit
+        return self._spend("Resource Entries", node["Number of Named Entries"] + node["Number of ID Entries"], "Resources")
+
+    def _resourceName(self, offset): #length-prefixed UTF-16 name of a named resource entry, "" if it can't be read (lenient parsing)
+        if (not self._inFile(offset, 2, "Resources", "Resource Name")):
+            return ""
+        size = UINT16.unpack_from(self.buffer, offset)[0] * 2
+        if (not self._inFile(offset + 2, size, "Resources", "Resource Name") or self._spend("Name Bytes", size, "Resources") < size):
+            return ""
+        return bytes(self.buffer[offset + 2:offset + 2 + size]).decode("utf-16-le", "replace")
+
+    def iterRelocations(self): #yields base relocation blocks one at a time: {"Page RVA", "Block Size", "Entries": [(type, offset in the page)]}
+        relocationRVA, relocationSize = self.dataDirectory("BASE RELOCATION")
+        if (relocationRVA == 0):
+            return
+        buffer = self._content()
+        offset = self._locate(relocationRVA, "Relocations")
+        if (offset is None):
+            return
+        end = offset + relocationSize
+        while (offset + RELOCATION_BLOCK_LAYOUT.size <= end):
+            if (not self._inFile(offset, RELOCATION_BLOCK_LAYOUT.size, "Relocations", "Relocation Block")):
+                return
+            block = RELOCATION_BLOCK_LAYOUT.unpack(buffer, offset)
+            if (block["Block Size"] == 0): #padding at the end of the table
+                return
+            if (block["Block Size"] < RELOCATION_BLOCK_LAYOUT.size or offset + block["Block Size"] > end):
+                self._anomaly("Relocations", "Relocation Block Size " + hex(block["Block Size"]) + " Out of Table")
+                return
+            size = (block["Block Size"] - RELOCATION_BLOCK_LAYOUT.size) // 2
+            count = self._spend("Relocations", size, "Relocations")
+            if (not self._inFile(offset + RELOCATION_BLOCK_LAYOUT.size, count * 2, "Relocations", "Relocation Block")):
+                count = max(len(buffer) - offset - RELOCATION_BLOCK_LAYOUT.size, 0) // 2
+            entries = struct.unpack_from("<" + str(count) + "H", buffer, offset + RELOCATION_BLOCK_LAYOUT.size)
+            block["Entries"] = [(entry >> 12, entry & 0xFFF) for entry in entries]
+            yield block
+            if (count < size):
+                return
+            offset += block["Block Size"]
+
+    def tlsDirectory(self): #TLS directory (None if there is no TLS directory), its callbacks are read by "iterTLSCallbacks"
+        tlsRVA = self.dataDirectory("TLS")[0] #the directory size is ignored, as by the loader
+        if (tlsRVA == 0):
+            return None
+        buffer = self._content()
+        layout = TLS_DIRECTORY_LAYOUTS[self.opt_header["Magic"]]
+        offset = self._locate(tlsRVA, "TLS")
+        if (offset is None or not self._inFile(offset, layout.size, "TLS", "TLS Directory")):
+            return None
+        return layout.unpack(buffer, offset)
+
+    def iterTLSCallbacks(self): #yields virtual addresses of TLS callbacks one at a time
+        tls = self.tlsDirectory()
+        if (tls is None or tls["Address of Callbacks"] == 0):
+            return
+        if (tls["Address of Callbacks"] < self.opt_header["Image Base"]):
+            self._anomaly("TLS", "TLS Callback Table " + hex(tls["Address of Callbacks"]) + " Below Image Base")
+            return
+        offset = self._locate(tls["Address of Callbacks"] - self.opt_header["Image Base"], "TLS")
+        if (offset is None):
+            return
+        size = self.thunkStruct.size #callbacks are addresses of the same width as import thunks
+        while (self._inFile(offset, size, "TLS", "TLS Callback Table")):
+            callback = self.thunkStruct.unpack_from(self.buffer, offset)[0]
+            if (callback == 0 or self._spend("TLS Callbacks", 1, "TLS") == 0):
+                return
+            yield callback
+            offset += size
+
+    def iterDebug(self): #yields debug directory entries one at a time, CodeView entries with their "PDB" information
+        debugRVA, debugSize = self.dataDirectory("DEBUG")
+        if (debugRVA == 0):
+            return
+        buffer = self._content()
+        offset = self._locate(debugRVA, "Debug")
+        if (offset is None):
+            return
+        for i in range(debugSize // DEBUG_DIRECTORY_LAYOUT.size):
+            if (not self._inFile(offset, DEBUG_DIRECTORY_LAYOUT.size, "Debug", "Debug Directory")):
+                return
+            entry = DEBUG_DIRECTORY_LAYOUT.unpack(buffer, offset)
+            if (entry["Type"] == DEBUG_TYPE_CODEVIEW):
+                entry["PDB"] = self._codeView(entry["Pointer to Raw Data"], entry["Size of Data"])
+            yield entry
+            offset += DEBUG_DIRECTORY_LAYOUT.size
+
+    def _codeView(self, offset, size): #{"Format", "Signature", "Age", "Path"} of CodeView debug data, None if its format is unknown
+        if (not self._inFile(offset, size, "Debug", "CodeView Data")):
+            return None
+        data = bytes(self.buffer[offset:offset + size])
+        if (data[:4] == b"RSDS" and size >= CODEVIEW_RSDS_STRUCT.size):
+            signature, data1, data2, data3, data4, age = CODEVIEW_RSDS_STRUCT.unpack_from(data)
+            guid = format(data1, "08X") + "-" + format(data2, "04X") + "-" + format(data3, "04X") + "-" + data4[:2].hex().upper() + "-" + data4[2:].hex().upper()
+            path = data[CODEVIEW_RSDS_STRUCT.size:]
+        elif (data[:4] == b"NB10" and size >= CODEVIEW_NB10_STRUCT.size):
+            signature, timestamp, age = CODEVIEW_NB10_STRUCT.unpack_from(data)
+            guid = format(timestamp, "08X")
+            path = data[CODEVIEW_NB10_STRUCT.size:]
+        else:
+            return None
+        return {"Format": signature.decode("latin-1"), "Signature": guid, "Age": age, "Path": path.partition(b"\0")[0].decode("utf-8", "replace")}
+
+    def loadConfig(self): #load config directory with the fields covered by its "Size" (None if there is no load config directory)
+        loadConfigRVA = self.dataDirectory("LOAD CONFIG")[0] #the fields are covered by the size inside the structure, not by the directory size
+        if (loadConfigRVA == 0):
+            return None
+        buffer = self._content()
+        layout = LOAD_CONFIG_LAYOUTS[self.opt_header["Magic"]]
+        offset = self._locate(loadConfigRVA, "Load Config")
+        if (offset is None or not self._inFile(offset, UINT32.size, "Load Config", "Load Config Directory")):
+            return None
+        size = min(UINT32.unpack_from(buffer, offset)[0], layout.size)
+        if (not self._inFile(offset, size, "Load Config", "Load Config Directory")):
+            size = len(buffer) - offset
+        values = layout.struct.unpack(bytes(buffer[offset:offset + size]).ljust(layout.size, b"\0"))
+        loadConfig = {}
+        end = 0
+        for field, value, fieldSize in zip(layout.fields, values, layout.sizes):
+            end += fieldSize
+            if (end > size):
                 break
+            loadConfig[field] = value
+        return loadConfig
 
-    #PE HEADER LOADING
-    pe_file.seek(int(pe_header_offset, 16))
-    pe_header = {"Signature": "", "Machine": "", "Number of Sections": "", "Time Date Stamp": "", "Pointer to Symbol Table": "", "Number of Symbols": "", "Size of Optional Header": "", "Characteristics": ""}
-    for i in range(8):
-        for key in pe_header:
-            if (pe_header[key] == ""):
-                if (i == 0 or i == 3 or i == 4 or i == 5):
-                    pe_header[key] = reverseBytes(readBytes(pe_file, 4))
-                    i += 2
-                    break
-                else:
-                    pe_header[key] = reverseBytes(readBytes(pe_file, 2))
-                    break
-
-    #OPTIONAL HEADER LOADING
-    optionalHeaderSize = int(pe_header["Size of Optional Header"], 16)
-    opt_header = {"Magic": "", "Major Linker Version": "", "Minor Linker Version": "", "Size of Code": "", "Size of Initialized Data": "", "Size of Unitialized Data": "", "Address of Entry Point": "", "Base of Code": "", "Base of Data": "", "Image Base": "", "Section Alignment": "", "File Alignment": "", "Major O/S Version": "", "Minor O/S Version": "", "Major Image Version": "", "Minor Image Version": "", "Major Subsystem Version": "", "Minor Subsystem Version": "", "Win32 Version Value": "", "Size of Image": "", "Size of Headers": "", "Checksum": "", "Subsystem": "", "DLL Characteristics": "", "Size of Stack Reserve": "", "Size of Stack Commit": "", "Size of Heap Reserve": "", "Size of Heap Commit": "", "Loader Flags": "", "Number of Data Directories": "", "RVA    EXPORT Table": "", "Size   EXPORT Table": "", "RVA    IMPORT Table": "", "Size   IMPORT Table": ""}
-    for i in range(62):
-        for key in opt_header:
-            if (opt_header[key] == ""):
-                if (i == 1 or i == 2):
-                    opt_header[key] = reverseBytes(readBytes(pe_file, 1))
-                    break
-                elif (i == 0 or (i >= 12 and i <= 17) or i == 22 or i == 23):
-                    opt_header[key] = reverseBytes(readBytes(pe_file, 2))
-                    break
-                else:
-                    opt_header[key] = reverseBytes(readBytes(pe_file, 4))
-                    break
-        if (i >= 34):
-            pe_file.seek(4, 1)
+    @property
+    def sectionAnalysis(self): #{section name : analysis of its raw data}, see "analyzeSection" (requires numpy)
+        if (self._sectionAnalysis is None):
+            self._content()
+            self._sectionAnalysis = {}
+            with _profiler.stage("Sections"):
+                for name, fields in self.sections.items():
+                    section = dict(zip(SECTION_HEADER_FIELDS, fields))
+                    self._sectionAnalysis[name] = analyzeSection(self.buffer, section["Pointer to Raw Data"], section["Size of Raw Data"])
+        return self._sectionAnalysis
 
-    #SECTION HEADERS LOADING
-    sections = {} # structure --> { sectionName : [list of all data in this section] }
-    numberOfSections = int(pe_header["Number of Sections"], 16)     
-    for i in range(numberOfSections):
-        sectionName = hexStringToASCII(readBytes(pe_file, 8))
-        sections[sectionName] = ["" for j in range(9)]
-        for j in range(9):
-            if (j == 6 or j == 7):
-                sections[sectionName][j] = reverseBytes(readBytes(pe_file, 2))
+    def toDict(self): #whole parsed model as plain dicts/lists (picklable, used as batch result record)
+        record = {
+            "Path": self.filepath,
+            "MZ Header": dict(self.mz_header),
+            "PE Header": dict(self.pe_header),
+            "Optional Header": dict(self.opt_header),
+            "Sections": sectionRecords(self),
+            "Imports": self.imports,
+            "Exports": self.exports
+        }
+        if (self.warnings):
+            record["Warnings"] = self.warnings
+        return record
+
+    def toModel(self): #whole parsed model in compact form stored by ParseCache (names of imports by ordinal are left out, they depend on the ordinal database)
+        imports = []
+        for directory in self.imports:
+            thunks = [(thunk["Ordinal"], thunk["Hint"], None if thunk["Ordinal"] is not None else thunk["Name"]) for thunk in directory["Thunks"]]
+            imports.append((tuple(directory[field] for field in IMPORT_DIRECTORY_LAYOUT.fields), directory["Name"], thunks))
+        return (tuple(self.mz_header.values()), tuple(self.pe_header.values()), tuple(self.opt_header.values()), self.sections, imports, self.exports)
+
+    @classmethod
+    def fromModel(cls, model, filepath = None, ordinalDatabase = None): #PEFile restored from "toModel", without the content of the file
+        mz_header, pe_header, opt_header, sections, imports, exports = model
+        pe = cls.__new__(cls)
+        pe.filepath = filepath
+        pe.ordinalDatabase = ordinalDatabase
+        pe.strict = True
+        pe.limits = dict(DEFAULT_LIMITS)
+        pe.warnings = []
+        pe._suppressedWarnings = 0
+        pe._budget = dict(pe.limits)
+        pe._mapped = False
+        pe.buffer = b""
+        pe.mz_header = dict(zip(MZ_HEADER_LAYOUT.fields, mz_header))
+        pe.pe_header = dict(zip(PE_HEADER_LAYOUT.fields, pe_header))
+        pe.opt_header = dict(zip(OPT_HEADER_LAYOUTS[opt_header[0]].fields, opt_header))
+        pe.sections = sections
+        pe.index = SectionIndex(sections, pe.opt_header["Size of Headers"])
+        pe.strings = StringTable(pe.buffer, MAX_NAME_LENGTH)
+        pe.thunkStruct, pe.ordinalFlag = IMPORT_THUNK_FORMATS[pe.opt_header["Magic"]]
+        pe._imports = []
+        for fields, name, thunks in imports:
+            directory = dict(zip(IMPORT_DIRECTORY_LAYOUT.fields, fields))
+            directory["Name"] = name
+            directory["Thunks"] = [{"Ordinal": ordinal, "Hint": hint, "Name": thunkName if ordinal is None else pe._ordinalName(name, ordinal)} for ordinal, hint, thunkName in thunks]
+            pe._imports.append(directory)
+        pe._exports = exports
+        pe._exportMaps = None
+        pe._sectionAnalysis = None
+        return pe
+
+
+#Function "resolveExports" builds lookup maps of the export table in linear time, so listings and
+#ordinal lookups never have to search the ordinal table.
+#
+#@param:
+#   exports - export directory with "Functions", "Names" and "Ordinals" tables (or None)
+#
+#@return: ({ordinal index : name}, {name : function RVA})
+#
+#@author: Physx
+def resolveExports(exports):
+    if (exports is None):
+        return {}, {}
+    ordinalNames = {}
+    addresses = {}
+    functions = exports["Functions"]
+    for name, ordinal in zip(exports["Names"], exports["Ordinals"]):
+        ordinalNames.setdefault(ordinal, name)
+        if (ordinal < len(functions)):
+            addresses[name] = functions[ordinal]
+    return ordinalNames, addresses
+
+#Function "analyzeSection" computes Shannon entropy, byte histogram and zero-run statistics of raw
+#data of one section straight from the file buffer, in chunks of SECTION_CHUNK_SIZE bytes, so even
+#huge sections are never copied. Raw data past the end of the file is left out.
+#
+#@param:
+#   buffer - mmap, bytes or bytearray with the content of the PE file
+#   offset - "Pointer to Raw Data" of the section
+#   size - "Size of Raw Data" of the section
+#   chunkSize - number of bytes processed at once
+#
+#@return: map with "Entropy" (bits per byte), "Histogram" (256 counts), "Zero Bytes", "Zero Runs"
+#         (runs of at least ZERO_RUN_LENGTH zero bytes) and "Longest Zero Run"
+#
+#@author: Physx
+def analyzeSection(buffer, offset, size, chunkSize = SECTION_CHUNK_SIZE):
+    import numpy
+    end = min(offset + size, len(buffer))
+    histogram = numpy.zeros(256, dtype = numpy.int64)
+    zeroRuns = longestZeroRun = carry = 0 #carry: length of the zero run still open at the end of the previous chunk
+    for start in range(offset, end, chunkSize):
+        chunk = numpy.frombuffer(buffer, dtype = numpy.uint8, count = min(chunkSize, end - start), offset = start)
+        histogram += numpy.bincount(chunk, minlength = 256)
+
+        #zero runs are found from edges of the "is zero" mask
+        edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], (chunk == 0).view(numpy.int8), [0]))))
+        starts, ends = edges[0::2], edges[1::2]
+        lengths = ends - starts
+        if (lengths.size and starts[0] == 0):
+            lengths[0] += carry
+        elif (carry):
+            zeroRuns += carry >= ZERO_RUN_LENGTH
+            longestZeroRun = max(longestZeroRun, carry)
+        carry = 0
+        if (lengths.size and ends[-1] == chunk.size):
+            carry = int(lengths[-1])
+            lengths = lengths[:-1]
+        if (lengths.size):
+            zeroRuns += int(numpy.count_nonzero(lengths >= ZERO_RUN_LENGTH))
+            longestZeroRun = max(longestZeroRun, int(lengths.max()))
+        del chunk
+    zeroRuns += carry >= ZERO_RUN_LENGTH
+    longestZeroRun = max(longestZeroRun, carry)
+
+    total = int(histogram.sum())
+    entropy = 0.0
+    if (total):
+        probabilities = histogram[histogram > 0] / total
+        entropy = 0.0 - float((probabilities * numpy.log2(probabilities)).sum())
+    return {"Entropy": entropy, "Histogram": histogram.tolist(), "Zero Bytes": int(histogram[0]), "Zero Runs": int(zeroRuns), "Longest Zero Run": longestZeroRun}
+
+#names of ordinal imports that pefile (and so the usual imphash) resolves with its fixed ordlookup tables,
+#independent of the ordinal database, in form of: {dll name : [(first ordinal, "names of consecutive ordinals")]}
+IMPHASH_ORDINALS = {
+    "oleaut32.dll": [
+        (2, "SysAllocString SysReAllocString SysAllocStringLen SysReAllocStringLen SysFreeString SysStringLen VariantInit "
+            "VariantClear VariantCopy VariantCopyInd VariantChangeType VariantTimeToDosDateTime DosDateTimeToVariantTime "
+            "SafeArrayCreate SafeArrayDestroy SafeArrayGetDim SafeArrayGetElemsize SafeArrayGetUBound SafeArrayGetLBound "
+            "SafeArrayLock SafeArrayUnlock SafeArrayAccessData SafeArrayUnaccessData SafeArrayGetElement "
+            "SafeArrayPutElement SafeArrayCopy DispGetParam DispGetIDsOfNames DispInvoke CreateDispTypeInfo "
+            "CreateStdDispatch RegisterActiveObject RevokeActiveObject GetActiveObject SafeArrayAllocDescriptor "
+            "SafeArrayAllocData SafeArrayDestroyDescriptor SafeArrayDestroyData SafeArrayRedim SafeArrayAllocDescriptorEx "
+            "SafeArrayCreateEx SafeArrayCreateVectorEx SafeArraySetRecordInfo SafeArrayGetRecordInfo VarParseNumFromStr "
+            "VarNumFromParseNum VarI2FromUI1 VarI2FromI4 VarI2FromR4 VarI2FromR8 VarI2FromCy VarI2FromDate VarI2FromStr "
+            "VarI2FromDisp VarI2FromBool SafeArraySetIID VarI4FromUI1 VarI4FromI2 VarI4FromR4 VarI4FromR8 VarI4FromCy "
+            "VarI4FromDate VarI4FromStr VarI4FromDisp VarI4FromBool SafeArrayGetIID VarR4FromUI1 VarR4FromI2 VarR4FromI4 "
+            "VarR4FromR8 VarR4FromCy VarR4FromDate VarR4FromStr VarR4FromDisp VarR4FromBool SafeArrayGetVartype "
+            "VarR8FromUI1 VarR8FromI2 VarR8FromI4 VarR8FromR4 VarR8FromCy VarR8FromDate VarR8FromStr VarR8FromDisp "
+            "VarR8FromBool VarFormat VarDateFromUI1 VarDateFromI2 VarDateFromI4 VarDateFromR4 VarDateFromR8 VarDateFromCy "
+            "VarDateFromStr VarDateFromDisp VarDateFromBool VarFormatDateTime VarCyFromUI1 VarCyFromI2 VarCyFromI4 "
+            "VarCyFromR4 VarCyFromR8 VarCyFromDate VarCyFromStr VarCyFromDisp VarCyFromBool VarFormatNumber VarBstrFromUI1 "
+            "VarBstrFromI2 VarBstrFromI4 VarBstrFromR4 VarBstrFromR8 VarBstrFromCy VarBstrFromDate VarBstrFromDisp "
+            "VarBstrFromBool VarFormatPercent VarBoolFromUI1 VarBoolFromI2 VarBoolFromI4 VarBoolFromR4 VarBoolFromR8 "
+            "VarBoolFromDate VarBoolFromCy VarBoolFromStr VarBoolFromDisp VarFormatCurrency VarWeekdayName VarMonthName "
+            "VarUI1FromI2 VarUI1FromI4 VarUI1FromR4 VarUI1FromR8 VarUI1FromCy VarUI1FromDate VarUI1FromStr VarUI1FromDisp "
+            "VarUI1FromBool VarFormatFromTokens VarTokenizeFormatString VarAdd VarAnd VarDiv BSTR_UserFree64 "
+            "BSTR_UserMarshal64 DispCallFunc VariantChangeTypeEx SafeArrayPtrOfIndex SysStringByteLen SysAllocStringByteLen "
+            "BSTR_UserSize64 VarEqv VarIdiv VarImp VarMod VarMul VarOr VarPow VarSub CreateTypeLib LoadTypeLib "
+            "LoadRegTypeLib RegisterTypeLib QueryPathOfRegTypeLib LHashValOfNameSys LHashValOfNameSysA VarXor VarAbs VarFix "
+            "OaBuildVersion ClearCustData VarInt VarNeg VarNot VarRound VarCmp VarDecAdd VarDecDiv VarDecMul CreateTypeLib2 "
+            "VarDecSub VarDecAbs LoadTypeLibEx SystemTimeToVariantTime VariantTimeToSystemTime UnRegisterTypeLib VarDecFix "
+            "VarDecInt VarDecNeg VarDecFromUI1 VarDecFromI2 VarDecFromI4 VarDecFromR4 VarDecFromR8 VarDecFromDate "
+            "VarDecFromCy VarDecFromStr VarDecFromDisp VarDecFromBool GetErrorInfo SetErrorInfo CreateErrorInfo VarDecRound "
+            "VarDecCmp VarI2FromI1 VarI2FromUI2 VarI2FromUI4 VarI2FromDec VarI4FromI1 VarI4FromUI2 VarI4FromUI4 "
+            "VarI4FromDec VarR4FromI1 VarR4FromUI2 VarR4FromUI4 VarR4FromDec VarR8FromI1 VarR8FromUI2 VarR8FromUI4 "
+            "VarR8FromDec VarDateFromI1 VarDateFromUI2 VarDateFromUI4 VarDateFromDec VarCyFromI1 VarCyFromUI2 VarCyFromUI4 "
+            "VarCyFromDec VarBstrFromI1 VarBstrFromUI2 VarBstrFromUI4 VarBstrFromDec VarBoolFromI1 VarBoolFromUI2 "
+            "VarBoolFromUI4 VarBoolFromDec VarUI1FromI1 VarUI1FromUI2 VarUI1FromUI4 VarUI1FromDec VarDecFromI1 "
+            "VarDecFromUI2 VarDecFromUI4 VarI1FromUI1 VarI1FromI2 VarI1FromI4 VarI1FromR4 VarI1FromR8 VarI1FromDate "
+            "VarI1FromCy VarI1FromStr VarI1FromDisp VarI1FromBool VarI1FromUI2 VarI1FromUI4 VarI1FromDec VarUI2FromUI1 "
+            "VarUI2FromI2 VarUI2FromI4 VarUI2FromR4 VarUI2FromR8 VarUI2FromDate VarUI2FromCy VarUI2FromStr VarUI2FromDisp "
+            "VarUI2FromBool VarUI2FromI1 VarUI2FromUI4 VarUI2FromDec VarUI4FromUI1 VarUI4FromI2 VarUI4FromI4 VarUI4FromR4 "
+            "VarUI4FromR8 VarUI4FromDate VarUI4FromCy VarUI4FromStr VarUI4FromDisp VarUI4FromBool VarUI4FromI1 "
+            "VarUI4FromUI2 VarUI4FromDec BSTR_UserSize BSTR_UserMarshal BSTR_UserUnmarshal BSTR_UserFree VARIANT_UserSize "
+            "VARIANT_UserMarshal VARIANT_UserUnmarshal VARIANT_UserFree LPSAFEARRAY_UserSize LPSAFEARRAY_UserMarshal "
+            "LPSAFEARRAY_UserUnmarshal LPSAFEARRAY_UserFree LPSAFEARRAY_Size LPSAFEARRAY_Marshal LPSAFEARRAY_Unmarshal "
+            "VarDecCmpR8 VarCyAdd BSTR_UserUnmarshal64 DllCanUnloadNow DllGetClassObject VarCyMul VarCyMulI4 VarCySub "
+            "VarCyAbs VarCyFix VarCyInt VarCyNeg VarCyRound VarCyCmp VarCyCmpR8 VarBstrCat VarBstrCmp VarR8Pow VarR4CmpR8 "
+            "VarR8Round VarCat VarDateFromUdateEx DllRegisterServer DllUnregisterServer GetRecordInfoFromGuids "
+            "GetRecordInfoFromTypeInfo LPSAFEARRAY_UserFree64 SetVarConversionLocaleSetting GetVarConversionLocaleSetting "
+            "SetOaNoCache LPSAFEARRAY_UserMarshal64 VarCyMulI8 VarDateFromUdate VarUdateFromDate GetAltMonthNames "
+            "VarI8FromUI1 VarI8FromI2 VarI8FromR4 VarI8FromR8 VarI8FromCy VarI8FromDate VarI8FromStr VarI8FromDisp "
+            "VarI8FromBool VarI8FromI1 VarI8FromUI2 VarI8FromUI4 VarI8FromDec VarI2FromI8 VarI2FromUI8 VarI4FromI8 "
+            "VarI4FromUI8 LPSAFEARRAY_UserSize64 LPSAFEARRAY_UserUnmarshal64 OACreateTypeLib2 SafeArrayAddRef "
+            "SafeArrayReleaseData SafeArrayReleaseDescriptor SysAddRefString SysReleaseString VARIANT_UserFree64 "
+            "VARIANT_UserMarshal64 VarR4FromI8 VarR4FromUI8 VarR8FromI8 VarR8FromUI8 VarDateFromI8 VarDateFromUI8 "
+            "VarCyFromI8 VarCyFromUI8 VarBstrFromI8 VarBstrFromUI8 VarBoolFromI8 VarBoolFromUI8 VarUI1FromI8 VarUI1FromUI8 "
+            "VarDecFromI8 VarDecFromUI8 VarI1FromI8 VarI1FromUI8 VarUI2FromI8 VarUI2FromUI8 VARIANT_UserSize64 "
+            "VARIANT_UserUnmarshal64"),
+        (401, "OleLoadPictureEx OleLoadPictureFileEx"),
+        (411, "SafeArrayCreateVector SafeArrayCopyData VectorFromBstr BstrFromVector OleIconToCursor "
+            "OleCreatePropertyFrameIndirect OleCreatePropertyFrame OleLoadPicture OleCreatePictureIndirect "
+            "OleCreateFontIndirect OleTranslateColor OleLoadPictureFile OleSavePictureFile OleLoadPicturePath VarUI4FromI8 "
+            "VarUI4FromUI8 VarI8FromUI8 VarUI8FromI8 VarUI8FromUI1 VarUI8FromI2 VarUI8FromR4 VarUI8FromR8 VarUI8FromCy "
+            "VarUI8FromDate VarUI8FromStr VarUI8FromDisp VarUI8FromBool VarUI8FromI1 VarUI8FromUI2 VarUI8FromUI4 "
+            "VarUI8FromDec RegisterTypeLibForUser UnRegisterTypeLibForUser OaEnablePerUserTLibRegistration HWND_UserFree "
+            "HWND_UserMarshal HWND_UserSize HWND_UserUnmarshal HWND_UserFree64 HWND_UserMarshal64 HWND_UserSize64 "
+            "HWND_UserUnmarshal64"),
+        (500, "OACleanup"),
+    ],
+    "ws2_32.dll": [
+        (1, "accept bind closesocket connect getpeername getsockname getsockopt htonl htons ioctlsocket inet_addr inet_ntoa "
+            "listen ntohl ntohs recv recvfrom select send sendto setsockopt shutdown socket WSApSetPostRoutine "
+            "FreeAddrInfoEx FreeAddrInfoExW FreeAddrInfoW GetAddrInfoExA GetAddrInfoExCancel GetAddrInfoExOverlappedResult "
+            "GetAddrInfoExW GetAddrInfoW GetHostNameW GetNameInfoW InetNtopW InetPtonW ProcessSocketNotifications "
+            "SetAddrInfoExA SetAddrInfoExW WPUCompleteOverlappedRequest WPUGetProviderPathEx WSAAccept WSAAddressToStringA "
+            "WSAAddressToStringW WSAAdvertiseProvider WSACloseEvent WSAConnect WSAConnectByList WSAConnectByNameA "
+            "WSAConnectByNameW gethostbyaddr gethostbyname getprotobyname getprotobynumber getservbyname getservbyport "
+            "gethostname WSACreateEvent WSADuplicateSocketA WSADuplicateSocketW WSAEnumNameSpaceProvidersA "
+            "WSAEnumNameSpaceProvidersExA WSAEnumNameSpaceProvidersExW WSAEnumNameSpaceProvidersW WSAEnumNetworkEvents "
+            "WSAEnumProtocolsA WSAEnumProtocolsW WSAEventSelect WSAGetOverlappedResult WSAGetQOSByName "
+            "WSAGetServiceClassInfoA WSAGetServiceClassInfoW WSAGetServiceClassNameByClassIdA "
+            "WSAGetServiceClassNameByClassIdW WSAHtonl WSAHtons WSAInstallServiceClassA WSAInstallServiceClassW WSAIoctl "
+            "WSAJoinLeaf WSALookupServiceBeginA WSALookupServiceBeginW WSALookupServiceEnd WSALookupServiceNextA "
+            "WSALookupServiceNextW WSANSPIoctl WSANtohl WSANtohs WSAPoll WSAProviderCompleteAsyncCall "
+            "WSAProviderConfigChange WSARecv WSARecvDisconnect WSARecvFrom WSARemoveServiceClass WSAResetEvent WSASend "
+            "WSASendDisconnect WSASendMsg WSASendTo WSAAsyncSelect WSAAsyncGetHostByAddr WSAAsyncGetHostByName "
+            "WSAAsyncGetProtoByNumber WSAAsyncGetProtoByName WSAAsyncGetServByPort WSAAsyncGetServByName "
+            "WSACancelAsyncRequest WSASetBlockingHook WSAUnhookBlockingHook WSAGetLastError WSASetLastError "
+            "WSACancelBlockingCall WSAIsBlocking WSAStartup WSACleanup WSASetEvent WSASetServiceA WSASetServiceW WSASocketA "
+            "WSASocketW WSAStringToAddressA WSAStringToAddressW WSAUnadvertiseProvider WSAWaitForMultipleEvents "
+            "WSCDeinstallProvider WSCDeinstallProvider32 WSCDeinstallProviderEx WSCEnableNSProvider WSCEnableNSProvider32 "
+            "WSCEnumNameSpaceProviders32 WSCEnumNameSpaceProvidersEx32 WSCEnumProtocols WSCEnumProtocols32 "
+            "WSCEnumProtocolsEx WSCGetApplicationCategory WSCGetApplicationCategoryEx WSCGetProviderInfo "
+            "WSCGetProviderInfo32 WSCGetProviderPath WSCGetProviderPath32 WSCInstallNameSpace WSCInstallNameSpace32 "
+            "WSCInstallNameSpaceEx WSCInstallNameSpaceEx2 WSCInstallNameSpaceEx32 WSCInstallProvider "
+            "WSCInstallProvider64_32 WSCInstallProviderAndChains64_32 WSCInstallProviderEx __WSAFDIsSet "
+            "WSCSetApplicationCategory WSCSetApplicationCategoryEx WSCSetProviderInfo WSCSetProviderInfo32 "
+            "WSCUnInstallNameSpace WSCUnInstallNameSpace32 WSCUnInstallNameSpaceEx2 WSCUpdateProvider WSCUpdateProvider32 "
+            "WSCUpdateProviderEx WSCWriteNameSpaceOrder WSCWriteNameSpaceOrder32 WSCWriteProviderOrder "
+            "WSCWriteProviderOrder32 WSCWriteProviderOrderEx WahCloseApcHelper WahCloseHandleHelper "
+            "WahCloseNotificationHandleHelper WahCloseSocketHandle WahCloseThread WahCompleteRequest "
+            "WahCreateHandleContextTable WahCreateNotificationHandle WahCreateSocketHandle WahDestroyHandleContextTable "
+            "WahDisableNonIFSHandleSupport WahEnableNonIFSHandleSupport WahEnumerateHandleContexts WahInsertHandleContext "
+            "WahNotifyAllProcesses WahOpenApcHelper WahOpenCurrentThread WahOpenHandleHelper "
+            "WahOpenNotificationHandleHelper WahQueueUserApc WahReferenceContextByHandle WahRemoveHandleContext "
+            "WahWaitForNotification WahWriteLSPEvent freeaddrinfo getaddrinfo getnameinfo inet_ntop inet_pton"),
+        (500, "WEP"),
+    ],
+    "wsock32.dll": [
+        (1, "accept bind closesocket connect getpeername getsockname getsockopt htonl htons inet_addr inet_ntoa ioctlsocket "
+            "listen ntohl ntohs recv recvfrom select send sendto setsockopt shutdown socket MigrateWinsockConfiguration"),
+        (51, "gethostbyaddr gethostbyname getprotobyname getprotobynumber getservbyname getservbyport gethostname"),
+        (101, "WSAAsyncSelect WSAAsyncGetHostByAddr WSAAsyncGetHostByName WSAAsyncGetProtoByNumber WSAAsyncGetProtoByName "
+            "WSAAsyncGetServByPort WSAAsyncGetServByName WSACancelAsyncRequest WSASetBlockingHook WSAUnhookBlockingHook "
+            "WSAGetLastError WSASetLastError WSACancelBlockingCall WSAIsBlocking WSAStartup WSACleanup"),
+        (151, "__WSAFDIsSet"),
+        (500, "WEP"),
+        (1000, "WSApSetPostRoutine"),
+        (1100, "inet_network getnetbyname rcmd rexec rresvport sethostname dn_expand WSARecvEx s_perror GetAddressByNameA "
+            "GetAddressByNameW EnumProtocolsA EnumProtocolsW GetTypeByNameA GetTypeByNameW GetNameByTypeA GetNameByTypeW "
+            "SetServiceA SetServiceW GetServiceA GetServiceW"),
+        (1130, "NPLoadNameSpaces"),
+        (1140, "TransmitFile AcceptEx GetAcceptExSockaddrs"),
+    ],
+}
+
+@functools.lru_cache(maxsize = None)
+def imphashOrdinals(dllName): #{ordinal : name} of a lowercased DLL name, empty for DLLs pefile doesn't resolve
+    return {first + i : name for first, names in IMPHASH_ORDINALS.get(dllName, []) for i, name in enumerate(names.split())}
+
+#Function "imphash" computes the import hash: MD5 of "dll.api" pairs of all imports in import table
+#order, joined by ",". DLL names are lowercased without ".dll", ".ocx" or ".sys" extension, API
+#names are lowercased, and ordinal imports are named the way pefile does it: from IMPHASH_ORDINALS
+#or "ord<N>", never from the ordinal database, so the hash doesn't depend on --ordinal-db.
+#Damaged thunks without ordinal and name (lenient parsing) are left out.
+#
+#@param:
+#   pe - PEFile object
+#
+#@return: hex digest, "" if the file imports nothing
+#
+#@author: Physx
+def imphash(pe):
+    names = []
+    for directory in pe.iterImports():
+        ordinals = imphashOrdinals(directory["Name"].lower())
+        dllName = directory["Name"].lower()
+        base, extension = os.path.splitext(dllName)
+        if (extension in (".dll", ".ocx", ".sys")):
+            dllName = base
+        for thunk in directory["Thunks"]:
+            if (thunk["Ordinal"] is None and not thunk["Name"]): #damaged thunk: its hint/name entry couldn't be read or is empty
+                continue
+            if (thunk["Ordinal"] is None):
+                apiName = thunk["Name"]
+            else:
+                apiName = ordinals.get(thunk["Ordinal"], "ord" + str(thunk["Ordinal"]))
+            names.append(dllName + "." + apiName.lower())
+    import hashlib
+    return hashlib.md5(",".join(names).encode("latin-1")).hexdigest() if names else ""
+
+#Function "exphash" computes the export hash: MD5 of lowercased names of all exported functions in
+#export address table order, joined by ",". Functions exported only by ordinal are "ord<N>" and
+#unused slots of the address table are left out.
+#
+#@param:
+#   pe - PEFile object
+#
+#@return: hex digest, "" if the file exports nothing
+#
+#@author: Physx
+def exphash(pe):
+    exports = pe.exports
+    if (exports is None):
+        return ""
+    exportNames = pe.exportNames
+    names = []
+    for i, functionRVA in enumerate(exports["Functions"]):
+        if (functionRVA != 0):
+            names.append(exportNames.get(i, "ord" + str(exports["Ordinal Base"] + i)).lower())
+    import hashlib
+    return hashlib.md5(",".join(names).encode("latin-1")).hexdigest() if names else ""
+
+#===============================================================================================
+#Class "OrdinalDatabase" is a persistent on-disk index (SQLite) of exports of reference DLLs in form
+#of: {dll name : {ordinal : export name}}, used to resolve names of imports by ordinal. Exports are
+#stored per file hash, so rebuilding skips files that were already indexed (unchanged size and
+#modification time skip even the hashing), and the table of every looked up DLL is cached in memory.
+#Copies of the same DLL under other names share the exports of the hash, but every name is indexed.
+#
+#@param:
+#   path - path to the database file (created if it doesn't exist)
+#
+#@author: Physx
+#===============================================================================================
+class OrdinalDatabase:
+    def __init__(self, path):
+        import sqlite3
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if (self.connection.execute("PRAGMA user_version").fetchone()[0] < 1):
+            #version 0 stored one DLL name per hash: images are moved to the table keyed by (hash, dll name)
+            self.connection.executescript("""
+                DROP INDEX IF EXISTS images_dll;
+                CREATE TABLE IF NOT EXISTS images (hash TEXT, dll TEXT);
+                ALTER TABLE images RENAME TO images_v0;
+                CREATE TABLE images (hash TEXT, dll TEXT, PRIMARY KEY (hash, dll));
+                INSERT INTO images SELECT hash, dll FROM images_v0 ORDER BY rowid;
+                DROP TABLE images_v0;
+            """)
+        self.connection.execute("PRAGMA user_version = " + str(ORDINAL_DATABASE_VERSION))
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT);
+            CREATE INDEX IF NOT EXISTS images_dll ON images (dll);
+            CREATE TABLE IF NOT EXISTS exports (hash TEXT, ordinal INTEGER, name TEXT, PRIMARY KEY (hash, ordinal)) WITHOUT ROWID;
+        """)
+        self._cache = {}
+
+    def close(self):
+        self.connection.close()
+
+    #Function "build" indexes exports of every DLL under the folder.
+    #
+    #@param:
+    #   folder - folder with reference DLLs
+    #
+    #@return: (number of indexed files, number of unchanged files, number of files that failed)
+    def build(self, folder):
+        import hashlib
+        indexed = unchanged = failed = 0
+        cursor = self.connection.cursor()
+        for filepath in iterPaths(folder):
+            try:
+                stat = os.stat(filepath)
+                row = cursor.execute("SELECT size, mtime FROM files WHERE path = ?", (filepath,)).fetchone()
+                if (row == (stat.st_size, stat.st_mtime_ns)):
+                    unchanged += 1
+                    continue
+                with PEFile(filepath) as pe:
+                    fileHash = hashlib.blake2b(pe.buffer, digest_size = 16).hexdigest()
+                    if (cursor.execute("SELECT 1 FROM images WHERE hash = ?", (fileHash,)).fetchone() is None):
+                        exports = pe.exports
+                        if (exports is not None):
+                            ordinalBase = exports["Ordinal Base"]
+                            cursor.executemany("INSERT OR REPLACE INTO exports VALUES (?, ?, ?)", ((fileHash, ordinalBase + ordinal, name) for ordinal, name in pe.exportNames.items()))
+                    #exports of a known hash are reused, but a copy under another name still gets that name indexed
+                    if (cursor.execute("INSERT OR IGNORE INTO images VALUES (?, ?)", (fileHash, os.path.basename(filepath).lower())).rowcount):
+                        indexed += 1
+                    else:
+                        unchanged += 1
+                cursor.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (filepath, stat.st_size, stat.st_mtime_ns, fileHash))
+            except (OSError, PEFormatError, struct.error):
+                failed += 1
+        self.connection.commit()
+        self._cache.clear()
+        return indexed, unchanged, failed
+
+    #Function "lookup" returns the export name of a DLL for the given ordinal (None if unknown).
+    #
+    #@param:
+    #   dllName - name of the DLL as found in the import directory (case insensitive)
+    #   ordinal - ordinal from the import thunk
+    def lookup(self, dllName, ordinal):
+        dllName = dllName.lower()
+        table = self._cache.get(dllName)
+        if (table is None):
+            #later indexed versions of the same DLL override earlier ones
+            table = dict(self.connection.execute("SELECT exports.ordinal, exports.name FROM images JOIN exports ON exports.hash = images.hash WHERE images.dll = ? ORDER BY images.rowid", (dllName,)))
+            self._cache[dllName] = table
+        return table.get(ordinal)
+
+#===============================================================================================
+#Class "ParseCache" is a persistent on-disk cache (SQLite) of parsed models of PE files, keyed by
+#hash of the file content and the parse options (strict/lenient, limits), so identical files
+#(repeated samples, the same system DLLs) are parsed only once. Unchanged size, modification time
+#and inode of an already seen path skip even reading the file. Models are stored compressed, the
+#least recently used ones are evicted once the cache grows over its bound, and the whole cache is
+#dropped when PARSE_CACHE_VERSION changes. Worker processes share the cache, so hits only read it:
+#their access times are written in batches (with the next miss, every PARSE_CACHE_FLUSH hits and on
+#close), and the total size of the models is kept in a table instead of being summed up.
+#
+#@param:
+#   path - path to the database file (created if it doesn't exist)
+#   maxSize - bound of the stored models (in bytes)
+#
+#@author: Physx
+#===============================================================================================
+class ParseCache:
+    def __init__(self, path, maxSize = PARSE_CACHE_SIZE << 20):
+        self.path = path
+        self.maxSize = maxSize
+        import sqlite3
+        self.hits = self.misses = 0
+        self.connection = sqlite3.connect(path, timeout = 60)
+        self.connection.execute("PRAGMA journal_mode = WAL") #worker processes share one cache
+        if (self.connection.execute("PRAGMA user_version").fetchone()[0] != PARSE_CACHE_VERSION):
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS models;
+                DROP TABLE IF EXISTS totals;
+                PRAGMA user_version = """ + str(PARSE_CACHE_VERSION) + """;
+            """)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, inode INTEGER, hash TEXT);
+            CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+            CREATE TABLE IF NOT EXISTS models (hash TEXT, options TEXT, model BLOB, size INTEGER, used REAL, PRIMARY KEY (hash, options));
+            CREATE INDEX IF NOT EXISTS models_used ON models (used);
+            CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER);
+            INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM models;
+        """)
+        self._used = {} # structure --> { (hash, options) : time of the last hit not written yet }
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def flush(self): #writes access times of the hits since the last flush
+        if (self._used):
+            self.connection.executemany("UPDATE models SET used = ? WHERE hash = ? AND options = ?", [(used, fileHash, options) for (fileHash, options), used in self._used.items()])
+            self._used.clear()
+        self.connection.commit()
+
+    #Function "open" returns the PEFile of a file, restored from the cache if the same content was
+    #parsed before. Otherwise the file is parsed in full and its model is stored (unless its tables
+    #are corrupted, then the PEFile is returned as is and the error shows up while reading them).
+    #
+    #@param:
+    #   filepath - path to the PE file
+    #   ordinalDatabase - OrdinalDatabase used to resolve names of imports by ordinal (optional)
+    #   parseOptions - keyword arguments of PEFile ("strict", "limits"), files parsed with warnings are not stored
+    def open(self, filepath, ordinalDatabase = None, parseOptions = None):
+        with _profiler.stage("Parse Cache"):
+            return self._open(filepath, ordinalDatabase, parseOptions)
+
+    def _open(self, filepath, ordinalDatabase, parseOptions):
+        import hashlib
+        import pickle
+        import zlib
+        parseOptions = parseOptions or {}
+        options = parseOptionsKey(parseOptions)
+        stat = os.stat(filepath)
+        fileKey = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        row = self.connection.execute("SELECT files.size, files.mtime, files.inode, models.hash, models.model FROM files JOIN models ON models.hash = files.hash AND models.options = ? WHERE files.path = ?", (options, filepath)).fetchone()
+        if (row is not None and row[:3] == fileKey):
+            return self._restore(row[3], options, row[4], filepath, ordinalDatabase)
+
+        pe = PEFile(filepath, ordinalDatabase, **parseOptions)
+        fileHash = hashlib.blake2b(pe.buffer, digest_size = 16).hexdigest()
+        self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", (filepath,) + fileKey + (fileHash,))
+        row = self.connection.execute("SELECT model FROM models WHERE hash = ? AND options = ?", (fileHash, options)).fetchone()
+        if (row is not None):
+            pe.close()
+            return self._restore(fileHash, options, row[0], filepath, ordinalDatabase)
+
+        self.misses += 1
+        _profiler.count("Parse Cache Misses")
+        try:
+            model = zlib.compress(pickle.dumps(pe.toModel(), pickle.HIGHEST_PROTOCOL))
+        except (PEFormatError, struct.error):
+            self.flush()
+            return pe
+        if (pe.warnings):
+            self.flush()
+            return pe
+        #another worker may have stored the same model meanwhile, the total grows only by models actually inserted
+        if (self.connection.execute("INSERT OR IGNORE INTO models VALUES (?, ?, ?, ?, ?)", (fileHash, options, model, len(model), time.time())).rowcount):
+            self.connection.execute("UPDATE totals SET size = size + ?", (len(model),))
+            self.flush() #pending hits must not be evicted as least recently used
+            self._evict()
+        self.flush()
+        return pe
+
+    def _restore(self, fileHash, options, model, filepath, ordinalDatabase):
+        import pickle
+        import zlib
+        self.hits += 1
+        _profiler.count("Parse Cache Hits")
+        self._used[fileHash, options] = time.time()
+        if (len(self._used) >= PARSE_CACHE_FLUSH):
+            self.flush()
+        return PEFile.fromModel(pickle.loads(zlib.decompress(model)), filepath, ordinalDatabase)
+
+    def _evict(self): #drops the least recently used models until the cache fits into its bound
+        excess = self.connection.execute("SELECT size FROM totals").fetchone()[0] - self.maxSize
+        if (excess <= 0):
+            return
+        evicted = []
+        for fileHash, options, size in self.connection.execute("SELECT hash, options, size FROM models ORDER BY used"):
+            if (excess <= 0):
+                break
+            evicted.append((fileHash, options, size))
+            excess -= size
+        self.connection.executemany("DELETE FROM models WHERE hash = ? AND options = ?", [(fileHash, options) for fileHash, options, size in evicted])
+        self.connection.execute("UPDATE totals SET size = size - ?", (sum(size for fileHash, options, size in evicted),))
+        #paths are forgotten only once no model of their content is left
+        self.connection.executemany("DELETE FROM files WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM models WHERE models.hash = files.hash)", [(fileHash,) for fileHash, options, size in evicted])
+
+def parseOptionsKey(parseOptions): #parse options as stored in ParseCache, for example: "strict;Exports=4194304,..."
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(parseOptions.get("limits") or {})
+    return ("strict" if parseOptions.get("strict", True) else "lenient") + ";" + ",".join(limit + "=" + str(limits[limit]) for limit in sorted(limits))
+
+def physField(pe, RVA): #physical offset for display
+    try:
+        return hexField(pe.physOffset(RVA), 4)
+    except RVAError:
+        return "outside sections"
+
+def fileBanner(filepath): #for example: KERNEL32.DLL =====...
+    if ("/" in filepath):
+        directories = filepath.split("/")
+    else:
+        directories = filepath.split("\\")
+    return directories[len(directories)-1].upper() + " " + "="*80
+
+def errorMessage(error): #error of one file as shown in output
+    if (isinstance(error, PEFormatError)):
+        return str(error)
+    if (isinstance(error, OSError)):
+        return error.strerror or str(error)
+    return type(error).__name__ + ": " + str(error)
+
+def sectionRecords(pe): #section headers as list of maps, including "Name"
+    return [dict(zip(["Name"] + SECTION_HEADER_FIELDS, [key] + pe.sections[key])) for key in pe.sections]
+
+def normalizeField(name): #for example: "AddressOfEntryPoint", "address_of_entry_point" --> "addressofentrypoint"
+    return "".join(character for character in name if character.isalnum()).lower()
+
+SECTION_ANALYSIS_FIELDS = ["Entropy", "Histogram", "Zero Bytes", "Zero Runs", "Longest Zero Run"] #see "analyzeSection"
+
+def sectionAnalysisField(field): #computed section field, read from PEFile.sectionAnalysis
+    return lambda pe, section: pe.sectionAnalysis[section["Name"]][field]
+
+def entryPointOffset(pe, header): #physical offset of the entry point, None if it is outside sections (as "outside sections" of physField)
+    try:
+        return pe.physOffset(header["Address of Entry Point"])
+    except RVAError:
+        return None
+
+#fields that are not stored in the file but computed from it, in form of: {group : {field name : function(pe, item)}},
+#where item is the header map, the section record, the import directory or the export directory
+COMPUTED_FIELDS = {
+    "Optional Header": {"Entry Point Offset": entryPointOffset},
+    "Sections": {field: sectionAnalysisField(field) for field in SECTION_ANALYSIS_FIELDS},
+    "Imports": {},
+    "Exports": {}
+}
+
+#===============================================================================================
+#Class "Projection" selects the parts of a PE file to be parsed and shown, from a specification in
+#form of: "group.field,field,group.field,...", for example: "imports.dll,opt.AddressOfEntryPoint"
+#or "sections.name,rva". Groups are mz, pe, opt, sections, imports, exports and the data directories
+#resources, relocations, tls, debug and loadconfig, a group without fields (or with "*") selects all
+#of its fields. Field names are matched without case and non-alphanumeric characters. Tables that are not selected are never read, and projections of
+#headers only need just the headers and the section table of the file.
+#
+#@param:
+#   specification - projection specification
+#
+#@author: Physx
+#===============================================================================================
+class Projection:
+    GROUPS = {"mz": "MZ Header", "pe": "PE Header", "opt": "Optional Header", "sections": "Sections", "imports": "Imports", "exports": "Exports",
+              "resources": "Resources", "relocations": "Relocations", "tls": "TLS", "debug": "Debug", "loadconfig": "Load Config"}
+    ALIASES = {("Imports", "dll"): "Name", ("Exports", "dll"): "Name"}
+
+    def __init__(self, specification):
+        self.groups = {} # structure --> { group : [field names] or None for all fields }
+        group = None
+        for token in specification.replace(";", ",").split(","):
+            token = token.strip()
+            if (not token):
+                continue
+            if ("." in token):
+                groupName, token = token.split(".", 1)
+            elif (group is None or (normalizeField(token) in Projection.GROUPS and self._field(group, token) is None)):
+                groupName, token = token, "*"
+            else:
+                groupName = None
+            if (groupName is not None):
+                group = Projection.GROUPS.get(normalizeField(groupName))
+                if (group is None):
+                    raise ValueError("Unknown group \"" + groupName + "\"")
+                self.groups.setdefault(group, [])
+            if (self.groups[group] is None):
+                continue
+            if (token in ("", "*")):
+                self.groups[group] = None
+                continue
+            field = self._field(group, token)
+            if (field is None):
+                raise ValueError("Unknown field \"" + token + "\" of " + group)
+            if (field not in self.groups[group]):
+                self.groups[group].append(field)
+
+    @staticmethod
+    def fields(group): #all fields of the group
+        if (group == "MZ Header"):
+            fields = MZ_HEADER_LAYOUT.fields
+        elif (group == "PE Header"):
+            fields = PE_HEADER_LAYOUT.fields
+        elif (group == "Optional Header"):
+            fields = OPT_HEADER_LAYOUTS[PE32_MAGIC].fields + [field for field in OPT_HEADER_LAYOUTS[PE32PLUS_MAGIC].fields if field not in OPT_HEADER_LAYOUTS[PE32_MAGIC].fields]
+        elif (group == "Sections"):
+            fields = ["Name"] + SECTION_HEADER_FIELDS
+        elif (group == "Imports"):
+            fields = IMPORT_DIRECTORY_LAYOUT.fields + ["Name", "Thunks"]
+        elif (group == "Exports"):
+            fields = EXPORT_DIRECTORY_LAYOUT.fields + ["Name", "Functions", "Names", "Ordinals", "Forwarders"]
+        elif (group == "Resources"):
+            fields = ["Path"] + RESOURCE_DIRECTORY_LAYOUT.fields + RESOURCE_DATA_LAYOUT.fields
+        elif (group == "Relocations"):
+            fields = RELOCATION_BLOCK_LAYOUT.fields + ["Entries"]
+        elif (group == "TLS"):
+            fields = TLS_DIRECTORY_LAYOUTS[PE32_MAGIC].fields + ["Callbacks"]
+        elif (group == "Debug"):
+            fields = DEBUG_DIRECTORY_LAYOUT.fields + ["PDB"]
+        else:
+            fields = LOAD_CONFIG_LAYOUTS[PE32_MAGIC].fields
+        return fields + list(COMPUTED_FIELDS[group]) if group in COMPUTED_FIELDS else fields
+
+    def _field(self, group, name): #field of the group matching the name (None if there is no such field)
+        normalized = normalizeField(name)
+        if ((group, normalized) in Projection.ALIASES):
+            return Projection.ALIASES[(group, normalized)]
+        for field in Projection.fields(group):
+            if (normalizeField(field) == normalized):
+                return field
+        return None
+
+    @property
+    def headersOnly(self): #True if neither tables nor section data have to be read
+        return all(group in ("MZ Header", "PE Header", "Optional Header", "Sections") for group in self.groups) and not self.analyzesSections
+
+    @property
+    def analyzesSections(self): #True if section data has to be analyzed (requires numpy)
+        return "Sections" in self.groups and (self.groups["Sections"] is None or any(field in SECTION_ANALYSIS_FIELDS for field in self.groups["Sections"]))
+
+    def _select(self, pe, group, item): #selected fields of one header, section or directory
+        fields = self.groups[group] or Projection.fields(group)
+        computed = COMPUTED_FIELDS.get(group, {})
+        return {field: computed[field](pe, item) if field in computed else item[field] for field in fields if field in item or field in computed}
+
+    #Function "project" parses the selected parts of the PE file.
+    #
+    #@param:
+    #   pe - PEFile object
+    #
+    #@return: map in the same structure as PEFile.toDict, with selected groups and fields only
+    def project(self, pe):
+        record = {"Path": pe.filepath}
+        for group, fields in self.groups.items():
+            if (group == "MZ Header"):
+                record[group] = self._select(pe, group, pe.mz_header)
+            elif (group == "PE Header"):
+                record[group] = self._select(pe, group, pe.pe_header)
+            elif (group == "Optional Header"):
+                record[group] = self._select(pe, group, pe.opt_header)
+            elif (group == "Sections"):
+                record[group] = [self._select(pe, group, section) for section in sectionRecords(pe)]
+            elif (group == "Imports"):
+                withThunks = fields is None or "Thunks" in fields
+                record[group] = [self._select(pe, group, directory) for directory in pe.iterImports(withThunks)]
+            elif (group == "Exports"):
+                tables = fields is None or any(field in ("Functions", "Names", "Ordinals", "Forwarders") for field in fields)
+                exports = pe.exports if tables else pe.exportDirectory()
+                record[group] = None if exports is None else self._select(pe, group, exports)
+            elif (group == "Resources"):
+                record[group] = [self._select(pe, group, node) for node in pe.iterResources()]
+            elif (group == "Relocations"):
+                record[group] = [self._select(pe, group, block) for block in pe.iterRelocations()]
+            elif (group == "TLS"):
+                tls = pe.tlsDirectory()
+                if (tls is not None and (fields is None or "Callbacks" in fields)):
+                    tls["Callbacks"] = list(pe.iterTLSCallbacks())
+                record[group] = None if tls is None else self._select(pe, group, tls)
+            elif (group == "Debug"):
+                record[group] = [self._select(pe, group, entry) for entry in pe.iterDebug()]
             else:
-                sections[sectionName][j] = reverseBytes(readBytes(pe_file, 4))
-        
-    #PRINTING MZ HEADER
-    print("MZ Header")
-    print("=========")
-    for key in mz_header:
-        layoutPrint(key + ":", hexFormat(mz_header[key]))
-        if (key == "Signature"):
-            print(" --> \"MZ\"", end = '')
-        print()
-    print()
-    
-    #PRINTING PE HEADER
-    print("PE Header")
-    print("=========")
-    for key in pe_header:
-        layoutPrint(key + ":", hexFormat(pe_header[key]))
-        if (key == "Signature"):
-            print(" --> \"PE\"", end = '')
-        print()
-    print()
-
-    #PRINTING OPTIONAL HEADER
-    print("Optional Header")
-    print("===============")
-    for key in opt_header:
-        layoutPrint(key + ":", hexFormat(opt_header[key]))
-        if (key == "Address of Entry Point"):
-            print(" (phys: " + hexFormat(calcPhysOffset(sections, opt_header["Address of Entry Point"])) + ")", end = '')
-        print()
-    print()
-
-    #PRINTING SECTION HEADERS
-    print("Section Headers")
-    print("===============")
-    for key in sections:
-        layoutPrint("Name:", key); print()
-        layoutPrint("Virtual Size:", hexFormat(sections[key][0])); print()
-        layoutPrint("RVA:", hexFormat(sections[key][1])); print()
-        layoutPrint("Size of Raw Data:", hexFormat(sections[key][2])); print()
-        layoutPrint("Pointer to Raw Data:", hexFormat(sections[key][3])); print()
-        layoutPrint("Pointer to Relocations:", hexFormat(sections[key][4])); print()
-        layoutPrint("Pointer to Line Numbers:", hexFormat(sections[key][5])); print()
-        layoutPrint("Number of Relocations:", hexFormat(sections[key][6])); print()
-        layoutPrint("Number of Line Numbers:", hexFormat(sections[key][7])); print()
-        layoutPrint("Characteristics:", hexFormat(sections[key][8])); print()
-        print()
-
-    #EXPORT TABLE DATA FOR ORDINALS
-    exportTableRVA = opt_header["RVA    EXPORT Table"]
-    if (exportTableRVA != '00'*4):
-        pe_file.seek(int(calcPhysOffset(sections, exportTableRVA), 16) + 16)
-        ordBase = reverseBytes(readBytes(pe_file, 4))
-        pe_file.seek(16, 1)
-        ordTableRVA = reverseBytes(readBytes(pe_file, 4))
-        ordTableOffset = calcPhysOffset(sections, ordTableRVA)
-        pe_file.seek(-8, 1)
-        exportNamePointerTableRVA = reverseBytes(readBytes(pe_file, 4))
-        exportNamePointerTableOffset = calcPhysOffset(sections, exportNamePointerTableRVA)
+                loadConfig = pe.loadConfig()
+                record[group] = None if loadConfig is None else self._select(pe, group, loadConfig)
+        if (pe.warnings):
+            record["Warnings"] = pe.warnings
+        return record
+
+#===============================================================================================
+#RENDERERS
+#Every renderer writes one parsed file to a binary output stream, as soon as each part of the file
+#is parsed (import directories one by one, export tables in chunks), so neither the parsed model
+#nor the output of a huge file has to be held in memory (export tables are read in chunks, parts
+#of the output that can only be written once they are complete are spooled to a temporary file
+#past OUTPUT_SPOOL_SIZE). Output is collected into large chunks instead of issuing one print call
+#per line. Renderers return False if the tables of the file
+#couldn't be parsed (the error is written in place of them).
+#
+#   text    - tabular display of all parsed data
+#   summary - one line per file
+#   jsonl   - one JSON object per file and line
+#   msgpack - one MessagePack map per file
+#   hash    - import and export hash, one line per file
+#===============================================================================================
+OUTPUT_SPOOL_SIZE = 1 << 20 #bytes of output held in memory before it is spooled to a temporary file
+
+def writeLines(out, lines):
+    out.write(("\n".join(lines) + "\n").encode(sys.stdout.encoding or "utf-8", "replace"))
+    del lines[:]
+
+def spoolOutput(): #binary stream kept in memory up to OUTPUT_SPOOL_SIZE, then in a temporary file
+    import tempfile
+    return tempfile.SpooledTemporaryFile(OUTPUT_SPOOL_SIZE)
+
+def copySpool(spool, out):
+    import shutil
+    spool.seek(0)
+    shutil.copyfileobj(spool, out, OUTPUT_SPOOL_SIZE)
+
+#Function "renderText" displays all parsed data of the PE file in tabular text layout.
+#
+#@param:
+#   pe - PEFile object
+#   out - binary output stream
+#
+#@author: Physx
+def renderText(pe, out):
+    lines = []
+    if (pe.filepath is not None):
+        lines += [fileBanner(pe.filepath), ""]
+
+    #MZ HEADER
+    lines += ["MZ Header", "========="]
+    for key, size in zip(pe.mz_header, MZ_HEADER_LAYOUT.sizes):
+        lines.append(layoutLine(key + ":", hexField(pe.mz_header[key], size)) + (" --> \"MZ\"" if key == "Signature" else ""))
+    lines.append("")
+
+    #PE HEADER
+    lines += ["PE Header", "========="]
+    for key, size in zip(pe.pe_header, PE_HEADER_LAYOUT.sizes):
+        lines.append(layoutLine(key + ":", hexField(pe.pe_header[key], size)) + (" --> \"PE\"" if key == "Signature" else ""))
+    lines.append("")
 
+    #OPTIONAL HEADER
+    lines += ["Optional Header", "==============="]
+    for key, size in zip(pe.opt_header, OPT_HEADER_LAYOUTS[pe.opt_header["Magic"]].sizes):
+        lines.append(layoutLine(key + ":", hexField(pe.opt_header[key], size)) + (" (phys: " + physField(pe, pe.opt_header[key]) + ")" if key == "Address of Entry Point" else ""))
+    lines.append("")
+
+    #SECTION HEADERS
+    lines += ["Section Headers", "==============="]
+    for key in pe.sections:
+        lines.append(layoutLine("Name:", key))
+        for field, value, size in zip(SECTION_HEADER_FIELDS, pe.sections[key], SECTION_HEADER_SIZES):
+            lines.append(layoutLine(field + ":", hexField(value, size)))
+        lines.append("")
+    writeLines(out, lines)
+
+    parsed = True
+    try:
+        renderTextTables(pe, out, lines)
+    except (PEFormatError, struct.error) as error:
+        lines += ["", "Error: " + errorMessage(error) + "! Program Terminated."]
+        parsed = False
+    if (pe.warnings):
+        lines += ["", "Warnings", "========"] + ["    " + warning["Table"] + ": " + warning["Message"] for warning in pe.warnings]
+    writeLines(out, lines)
+    return parsed
+
+def renderTextTables(pe, out, lines):
     #IMPORT TABLE
-    importTableRVA = opt_header["RVA    IMPORT Table"]
-    importTableOffset = int(calcPhysOffset(sections, importTableRVA), 16)
-    pe_file.seek(importTableOffset)
-    print("IMPORT Table")
-    print("============")
-    next20Bytes = readBytes(pe_file, 20)
-    while (next20Bytes != '00'*20): #20 Bytes of Zeroes = End of Import Directory
-        pe_file.seek(-20, 1)
-
-        #PRINTING IMPORT DIRECTORY
-        layoutPrint("Import Directory", ""); print()
-        layoutPrint("================", ""); print()
-        importNameTableRVA = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Import Name Table RVA:", hexFormat(importNameTableRVA)); print()
-        layoutPrint("    Time Date Stamp:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        layoutPrint("    Forwarder Chain:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        nameRVA = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Name RVA:", hexFormat(nameRVA))
-        dllNameOffset = calcPhysOffset(sections, nameRVA)
-        print(" (phys: " + hexFormat(dllNameOffset) + ")", end = ' --> ')
-
-        #PRINTING DLL NAME===============================
-        rememberImportDirOffset = pe_file.tell()
-        pe_file.seek(int(dllNameOffset, 16))
-        nextByte = readBytes(pe_file, 1)
-        dllName = ""
-        while (nextByte != '00'):
-            pe_file.seek(-1, 1)
-            dllName += readBytes(pe_file, 1)
-            nextByte = readBytes(pe_file, 1)
-        print("\"" + hexStringToASCII(dllName) + "\"")
-        pe_file.seek(rememberImportDirOffset)
-        #================================================
-
-        importAddressTableRVA = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Import Address Table RVA:", hexFormat(importAddressTableRVA)); print()
-
-        #PRINTING IMPORT THUNKS==========================
-        print()
-        layoutPrint("    Import Thunks", ""); print()
-        layoutPrint("    =============", ""); print()
-        rememberImportDirOffset = pe_file.tell()
-        importNameTableOffset = calcPhysOffset(sections, importNameTableRVA)
-        pe_file.seek(int(importNameTableOffset, 16))
-        
-        next4Bytes = readBytes(pe_file, 4)
-        offset = 0
-        while (next4Bytes != '00'*4):
-            pe_file.seek(-4, 1)
-            currentNameTableRVA = format(int(importNameTableRVA, 16) + offset, 'x')
-            hintNameRVA = reverseBytes(readBytes(pe_file, 4))
-            
-            #ORDINAL HANDLING=============================================================
-            if (hintNameRVA[0] == '8'):
-                ordinal = hintNameRVA[4:]
-                rememberOrdinal = pe_file.tell()
-                
-                pe_file.seek(int(ordTableOffset, 16))
-                ordinalBytes = ""
-                counter = 0
-                while (True):
-                    ordinalBytes = reverseBytes(readBytes(pe_file, 2))
-                    counter += 1
-                    if (int(ordinal, 16) == int(ordinalBytes, 16) + int(ordBase, 16)):
-                        break
-
-                pe_file.seek(int(exportNamePointerTableOffset, 16))
-                for i in range(counter):
-                    functionRVA = reverseBytes(readBytes(pe_file, 4))
-                    
-                pe_file.seek(int(calcPhysOffset(sections, functionRVA), 16))
-                nextByteOrdinal = readBytes(pe_file, 1);
-                apiName = ""
-                while (nextByteOrdinal != '00'):
-                    pe_file.seek(-1, 1)
-                    apiName += readBytes(pe_file, 1)
-                    nextByteOrdinal = readBytes(pe_file, 1)
-                apiName = hexStringToASCII(apiName)
-                print(" "*12 + "API: " + hexFormat(currentNameTableRVA) + " (phys: " + hexFormat(calcPhysOffset(sections, currentNameTableRVA)) + ") --> Ordinal: " + hexFormat(ordinal) + ", Name: \"" + apiName + "\"")
-                
-                pe_file.seek(rememberOrdinal)
-            #=============================================================================
+    lines += ["IMPORT Table", "============"]
+    for directory in pe.iterImports():
+        lines.append(layoutLine("Import Directory", ""))
+        lines.append(layoutLine("================", ""))
+        lines.append(layoutLine("    Import Name Table RVA:", hexField(directory["Import Name Table RVA"], 4)))
+        lines.append(layoutLine("    Time Date Stamp:", hexField(directory["Time Date Stamp"], 4)))
+        lines.append(layoutLine("    Forwarder Chain:", hexField(directory["Forwarder Chain"], 4)))
+        lines.append(layoutLine("    Name RVA:", hexField(directory["Name RVA"], 4)) + " (phys: " + physField(pe, directory["Name RVA"]) + ") --> \"" + directory["Name"] + "\"")
+        lines.append(layoutLine("    Import Address Table RVA:", hexField(directory["Import Address Table RVA"], 4)))
+
+        #IMPORT THUNKS
+        lines.append("")
+        lines.append(layoutLine("    Import Thunks", ""))
+        lines.append(layoutLine("    =============", ""))
+        currentRVA = directory["Import Name Table RVA"] or directory["Import Address Table RVA"]
+        for thunk in directory["Thunks"]:
+            if (thunk["Ordinal"] is not None):
+                entry = "Ordinal: " + hexField(thunk["Ordinal"], 2)
             else:
-                hintNameOffset = calcPhysOffset(sections, hintNameRVA)
-            
-                rememberImportNameTableOffset = pe_file.tell()
-                pe_file.seek(int(hintNameOffset, 16))
-                hint = reverseBytes(readBytes(pe_file, 2))
-                nextByte = readBytes(pe_file, 1);
-                apiName = ""
-                while (nextByte != '00'):
-                    pe_file.seek(-1, 1)
-                    apiName += readBytes(pe_file, 1)
-                    nextByte = readBytes(pe_file, 1)
-                apiName = hexStringToASCII(apiName)
-                pe_file.seek(rememberImportNameTableOffset)
-            
-                print(" "*12 + "API: " + hexFormat(currentNameTableRVA) + " (phys: " + hexFormat(calcPhysOffset(sections, currentNameTableRVA)) + ") --> Hint: " + hexFormat(hint) + ", Name: \"" + apiName + "\"")
-
-            offset += 4
-            next4Bytes = readBytes(pe_file, 4)
-            
-        pe_file.seek(rememberImportDirOffset)
-        #================================================
-
-        print()
-        next20Bytes = readBytes(pe_file, 20)  #reminder: next20Bytes - looks for 20 zeroes for the end of import directory table
+                entry = "Hint: " + hexField(thunk["Hint"], 2)
+            lines.append(" "*12 + "API: " + hex(currentRVA) + " (phys: " + physField(pe, currentRVA) + ") --> " + entry + ", Name: \"" + thunk["Name"] + "\"")
+            currentRVA += pe.thunkStruct.size
+        lines.append("")
+        writeLines(out, lines)
 
     #EXPORT TABLE
-    print("EXPORT Table")
-    print("============")
-    if (exportTableRVA == '00'*4):
-        print("Doesn't exist!")
+    lines += ["EXPORT Table", "============"]
+    exports = pe.exports
+    if (exports is None):
+        lines.append("Doesn't exist!")
+        return
+    lines += ["    Export Directory", "    ================"]
+    for key, size in zip(EXPORT_DIRECTORY_LAYOUT.fields, EXPORT_DIRECTORY_LAYOUT.sizes):
+        if (key == "Name RVA"):
+            lines.append(layoutLine("    Name RVA:", hexField(exports["Name RVA"], 4) + " (phys: " + physField(pe, exports["Name RVA"]) + ") --> \"" + exports["Name"] + "\""))
+        else:
+            lines.append(layoutLine("    " + key + ":", hexField(exports[key], size)))
+
+    ordinalNames = resolveExports(exports)[0]
+
+    #EXPORT ADDRESS TABLE
+    lines += ["", "        Export Address Table", "        ===================="]
+    for i in range(len(exports["Functions"])):
+        currentRVA = exports["Address Table RVA"] + i*4
+        line = "            API: " + hex(currentRVA) + " (phys: " + physField(pe, currentRVA) + ") --> Ordinal: " + hexField(i, 2) + ", Name: \"" + ordinalNames.get(i, "") + "\""
+        if (i in exports["Forwarders"]):
+            line += ", Forwarder: \"" + exports["Forwarders"][i] + "\""
+        lines.append(line)
+        if (len(lines) >= OUTPUT_CHUNK_SIZE):
+            writeLines(out, lines)
+
+    #EXPORT FUNCTION NAME TABLE
+    lines += ["", "        Export Function Name Table", "        =========================="]
+    for i, (ordinal, name) in enumerate(zip(exports["Ordinals"], exports["Names"])):
+        currentRVA = exports["Name Pointer Table RVA"] + i*4
+        lines.append("            API: " + hex(currentRVA) + " (phys: " + physField(pe, currentRVA) + ") --> Ordinal: " + hexField(ordinal, 2) + ", Name: \"" + name + "\"")
+        if (len(lines) >= OUTPUT_CHUNK_SIZE):
+            writeLines(out, lines)
+
+    #EXPORT ORDINAL TABLE
+    lines += ["", "        Export Ordinal Table", "        ===================="]
+    for value, name in zip(exports["Ordinals"], exports["Names"]):
+        lines.append("            Value: " + hexField(value, 2) + " (Decoded Ordinal: " + hexField(value + exports["Ordinal Base"], 2) + "), Name: \"" + name + "\"")
+        if (len(lines) >= OUTPUT_CHUNK_SIZE):
+            writeLines(out, lines)
+
+#Function "renderSummary" writes one line with the most important data of the PE file.
+#
+#@param:
+#   pe - PEFile object
+#   out - binary output stream
+#
+#@author: Physx
+def renderSummary(pe, out):
+    try:
+        directories = thunks = 0
+        for directory in pe.iterImports():
+            directories += 1
+            thunks += len(directory["Thunks"])
+        exports = len(pe.exports["Functions"]) if pe.exports else 0
+    except (PEFormatError, struct.error) as error:
+        renderError("summary", pe.filepath, errorMessage(error), out)
+        return False
+    line = str(pe.filepath) + "    Machine: " + hexField(pe.pe_header["Machine"], 2) + ", Sections: " + str(len(pe.sections)) + ", Imports: " + str(directories) + " (" + str(thunks) + " APIs), Exports: " + str(exports)
+    if (pe.warnings):
+        line += ", Warnings: " + str(len(pe.warnings))
+    writeLines(out, [line])
+    return True
+
+#Function "jsonSerializer" returns the fastest available function for serializing an object into
+#compact JSON bytes: orjson if it is installed, otherwise the standard json encoder.
+@functools.lru_cache(maxsize = None)
+def jsonSerializer():
+    try:
+        import orjson
+        return orjson.dumps
+    except ImportError:
+        import json
+        encode = json.JSONEncoder(ensure_ascii = False, check_circular = False, separators = (",", ":")).encode
+        return lambda value: encode(value).encode("utf-8")
+
+#Function "renderJSON" writes the PE file as one JSON object on one line.
+#
+#@param:
+#   pe - PEFile object
+#   out - binary output stream
+#
+#@author: Physx
+def renderJSON(pe, out):
+    dumps = jsonSerializer()
+    parsed = True
+    out.write(b'{"Path":' + dumps(pe.filepath) + b',"MZ Header":' + dumps(pe.mz_header) + b',"PE Header":' + dumps(pe.pe_header) + b',"Optional Header":' + dumps(pe.opt_header) + b',"Sections":' + dumps(sectionRecords(pe)))
+    try:
+        out.write(b',"Imports":[')
+        for i, directory in enumerate(pe.iterImports()):
+            out.write((b"," if i else b"") + dumps(directory))
+        exports = pe.exportDirectory()
+    except (PEFormatError, struct.error) as error:
+        #close the object so the line stays valid JSON, keeping whatever was parsed before the error
+        out.write(b'],"Exports":null,"Error":' + dumps(errorMessage(error)))
+        parsed = False
+    else:
+        out.write(b'],"Exports":')
+        if (exports is None):
+            out.write(b"null")
+        else:
+            #export tables are streamed into a spool, so an error in the middle of them still leaves valid JSON
+            with spoolOutput() as spool:
+                try:
+                    spool.write(dumps({key: exports[key] for key in EXPORT_DIRECTORY_LAYOUT.fields + ["Name"]})[:-1])
+                    for table in ("Functions", "Names", "Ordinals"):
+                        spool.write(b',"' + table.encode() + b'":[')
+                        for i, chunk in enumerate(pe.exportTable(exports, table)[1]):
+                            spool.write((b"," if i else b"") + dumps(chunk)[1:-1])
+                        spool.write(b"]")
+                    spool.write(b',"Forwarders":' + dumps({str(i): forwarder for i, forwarder in exports["Forwarders"].items()}) + b"}")
+                except (PEFormatError, struct.error) as error:
+                    out.write(b'null,"Error":' + dumps(errorMessage(error)))
+                    parsed = False
+                else:
+                    copySpool(spool, out)
+    if (pe.warnings):
+        out.write(b',"Warnings":' + dumps(pe.warnings))
+    out.write(b"}\n")
+    return parsed
+
+#Function "renderMsgPack" writes the PE file as one MessagePack map (requires the msgpack package).
+#
+#@param:
+#   pe - PEFile object
+#   out - binary output stream
+#
+#@author: Physx
+def renderMsgPack(pe, out):
+    import msgpack
+    packer = msgpack.Packer()
+    #MessagePack needs lengths up front and whether the map has "Error" and "Warnings" keys is known
+    #only at the end, so import directories and export tables are packed into spools first
+    with spoolOutput() as imports, spoolOutput() as exports:
+        count = 0
+        try:
+            for directory in pe.iterImports():
+                imports.write(packer.pack(directory))
+                count += 1
+            directory = pe.exportDirectory()
+            if (directory is None):
+                exports.write(packer.pack(None))
+            else:
+                fields = EXPORT_DIRECTORY_LAYOUT.fields + ["Name"]
+                exports.write(packer.pack_map_header(len(fields) + 4))
+                for key in fields:
+                    exports.write(packer.pack(key) + packer.pack(directory[key]))
+                for table in ("Functions", "Names", "Ordinals"):
+                    length, chunks = pe.exportTable(directory, table)
+                    exports.write(packer.pack(table) + packer.pack_array_header(length))
+                    for chunk in chunks:
+                        exports.write(b"".join(packer.pack(value) for value in chunk))
+                exports.write(packer.pack("Forwarders") + packer.pack(directory["Forwarders"]))
+            error = None
+        except (PEFormatError, struct.error) as parseError:
+            error = errorMessage(parseError)
+
+        out.write(packer.pack_map_header(7 + (error is not None) + bool(pe.warnings)))
+        for key, value in (("Path", pe.filepath), ("MZ Header", pe.mz_header), ("PE Header", pe.pe_header), ("Optional Header", pe.opt_header), ("Sections", sectionRecords(pe))):
+            out.write(packer.pack(key) + packer.pack(value))
+        if (error is None):
+            out.write(packer.pack("Imports") + packer.pack_array_header(count))
+            copySpool(imports, out)
+            out.write(packer.pack("Exports"))
+            copySpool(exports, out)
+        else:
+            out.write(packer.pack("Imports") + packer.pack([]) + packer.pack("Exports") + packer.pack(None))
+            out.write(packer.pack("Error") + packer.pack(error))
+    if (pe.warnings):
+        out.write(packer.pack("Warnings") + packer.pack(pe.warnings))
+    return error is None
+
+#Function "renderHash" writes only the import and export hash of the PE file: only import and
+#export tables are walked and nothing else is formatted, for fingerprinting large corpora.
+#
+#@param:
+#   pe - PEFile object
+#   out - binary output stream
+#
+#@author: Physx
+def renderHash(pe, out):
+    try:
+        line = str(pe.filepath) + "    Imphash: " + (imphash(pe) or "-") + ", Exphash: " + (exphash(pe) or "-")
+    except (PEFormatError, struct.error) as error:
+        renderError("hash", pe.filepath, errorMessage(error), out)
+        return False
+    writeLines(out, [line])
+    return True
+
+RENDERERS = {"text": renderText, "summary": renderSummary, "jsonl": renderJSON, "msgpack": renderMsgPack, "hash": renderHash}
+
+#Function "renderError" writes the error record of a file that couldn't be parsed.
+#
+#@param:
+#   outputFormat - one of RENDERERS
+#   filepath - path to the file
+#   message - error message
+#   out - binary output stream
+#
+#@author: Physx
+def renderError(outputFormat, filepath, message, out):
+    if (outputFormat == "text"):
+        writeLines(out, [fileBanner(str(filepath)), "", "Error: " + message + "! Program Terminated."])
+    elif (outputFormat in ("summary", "hash")):
+        writeLines(out, [str(filepath) + "    Error: " + message])
+    elif (outputFormat == "jsonl"):
+        dumps = jsonSerializer()
+        out.write(b'{"Path":' + dumps(filepath) + b',"Error":' + dumps(message) + b"}\n")
+    else:
+        import msgpack
+        out.write(msgpack.packb({"Path": filepath, "Error": message}))
+
+def projectionValue(value): #value of a projected field as shown in text output
+    if (isinstance(value, bool) or value is None):
+        return str(value)
+    if (isinstance(value, int)):
+        return hex(value)
+    if (isinstance(value, float)):
+        return format(value, ".4f")
+    if (isinstance(value, str)):
+        return "\"" + value + "\""
+    if (isinstance(value, dict)):
+        return "{" + ", ".join(str(key) + ": " + projectionValue(item) for key, item in value.items()) + "}"
+    return "[" + ", ".join(projectionValue(item) for item in value) + "]"
+
+#Function "renderProjection" writes the selected parts of the PE file in the requested output format:
+#one table per group (text), one line per file (summary) or the projected record (jsonl, msgpack).
+#
+#@param:
+#   pe - PEFile object
+#   projection - Projection object
+#   outputFormat - one of RENDERERS
+#   out - binary output stream
+#
+#@author: Physx
+def renderProjection(pe, projection, outputFormat, out):
+    try:
+        record = projection.project(pe)
+    except (PEFormatError, struct.error) as error:
+        renderError(outputFormat, pe.filepath, errorMessage(error), out)
+        return False
+    if (outputFormat == "jsonl"):
+        if (record.get("Exports") and "Forwarders" in record["Exports"]):
+            record["Exports"]["Forwarders"] = {str(i): forwarder for i, forwarder in record["Exports"]["Forwarders"].items()}
+        out.write(jsonSerializer()(record) + b"\n")
+    elif (outputFormat == "msgpack"):
+        import msgpack
+        out.write(msgpack.packb(record))
+    elif (outputFormat == "summary"):
+        values = []
+        for group, value in record.items():
+            if (group in ("Path", "Warnings")):
+                continue
+            items = value if isinstance(value, list) else [value]
+            for field in projection.groups[group] or Projection.fields(group):
+                selected = [item[field] for item in items if item is not None and field in item]
+                if (selected):
+                    values.append(field + ": " + ("|".join(projectionValue(item) for item in selected)))
+        if (pe.warnings):
+            values.append("Warnings: " + str(len(pe.warnings)))
+        writeLines(out, [str(pe.filepath) + "    " + ", ".join(values)])
+    else:
+        lines = []
+        if (pe.filepath is not None):
+            lines += [fileBanner(pe.filepath), ""]
+        for group, value in record.items():
+            if (group in ("Path", "Warnings")):
+                continue
+            lines += [group, "="*len(group)]
+            if (value is None):
+                lines.append("Doesn't exist!")
+            for item in (value if isinstance(value, list) else [value] if value is not None else []):
+                for field, fieldValue in item.items():
+                    lines.append(layoutLine(field + ":", projectionValue(fieldValue)))
+                if (isinstance(value, list)):
+                    lines.append("")
+            if (not isinstance(value, list)):
+                lines.append("")
+        if (pe.warnings):
+            lines += ["Warnings", "========"] + ["    " + warning["Table"] + ": " + warning["Message"] for warning in pe.warnings]
+        writeLines(out, lines)
+    return True
+
+#Function "renderFile" parses one file and writes it in the requested output format.
+#
+#@param:
+#   filepath - path to the PE file
+#   outputFormat - one of RENDERERS
+#   out - binary output stream
+#   ordinalDatabase - OrdinalDatabase used to resolve names of imports by ordinal (optional)
+#   parseCache - ParseCache the file is looked up in and stored to (optional)
+#   projection - Projection of the parts to be shown (optional, whole file by default)
+#   parseOptions - keyword arguments of PEFile: "strict" and "limits" (optional)
+#
+#@return: True if the file was parsed, False if its error was written instead
+#
+#@author: Physx
+def renderFile(filepath, outputFormat, out, ordinalDatabase = None, parseCache = None, projection = None, parseOptions = None):
+    parseOptions = parseOptions or {}
+    try:
+        if (projection is not None and projection.headersOnly):
+            pe = PEFile(filepath, headersOnly = True, **parseOptions)
+        elif (parseCache is not None):
+            pe = parseCache.open(filepath, ordinalDatabase, parseOptions)
+        else:
+            pe = PEFile(filepath, ordinalDatabase, **parseOptions)
+    except (PEFormatError, OSError) as error:
+        renderError(outputFormat, filepath, errorMessage(error), out)
+        return False
+    with pe, _profiler.stage("Render"):
+        if (projection is not None):
+            return renderProjection(pe, projection, outputFormat, out)
+        return RENDERERS[outputFormat](pe, out)
+
+#===============================================================================================
+#BATCH SCANNING
+#Files are parsed in a process pool and every file produces exactly one result record, so a
+#broken sample comes back as {"Path": ..., "Error": ...} instead of stopping the whole run.
+#===============================================================================================
+
+_workerOrdinalDatabase = None
+_workerFormat = None
+_workerParseCache = None
+_workerProjection = None
+_workerParseOptions = {}
+
+def initWorker(ordinalDatabasePath, outputFormat = None, parseCachePath = None, parseCacheSize = PARSE_CACHE_SIZE, projection = None, parseOptions = None, profile = False): #every worker process opens its own connections to the databases
+    global _workerOrdinalDatabase, _workerFormat, _workerParseCache, _workerProjection, _workerParseOptions
+    if (profile):
+        setProfiler(Profiler())
+    _workerProjection = projection
+    _workerParseOptions = parseOptions or {}
+    _workerOrdinalDatabase = OrdinalDatabase(ordinalDatabasePath) if ordinalDatabasePath else None
+    _workerFormat = outputFormat
+    _workerParseCache = ParseCache(parseCachePath, parseCacheSize << 20) if parseCachePath else None
+    if (_workerParseCache is not None):
+        #workers are stopped without returning to this module: the last access times are flushed on their exit
+        from multiprocessing import util
+        util.Finalize(_workerParseCache, _workerParseCache.close, exitpriority = 0)
+
+#Function "scanFile" parses one file into its result record (runs inside the worker processes).
+#
+#@param:
+#   filepath - path to the PE file
+#
+#@author: Physx
+def scanFile(filepath):
+    try:
+        if (_workerProjection is not None and _workerProjection.headersOnly):
+            with PEFile(filepath, headersOnly = True, **_workerParseOptions) as pe, _profiler.stage("Render"):
+                return _workerProjection.project(pe)
+        with (PEFile(filepath, _workerOrdinalDatabase, **_workerParseOptions) if _workerParseCache is None else _workerParseCache.open(filepath, _workerOrdinalDatabase, _workerParseOptions)) as pe, _profiler.stage("Render"):
+            return pe.toDict() if _workerProjection is None else _workerProjection.project(pe)
+    except Exception as error: #not PE, missing, truncated or corrupted tables
+        return {"Path": filepath, "Error": errorMessage(error)}
+
+#Function "renderScannedFile" parses one file and returns its output already rendered in the
+#worker's output format, so serialization runs in parallel in the worker processes.
+#
+#@param:
+#   filepath - path to the PE file
+#
+#@return: (True if the file was parsed, rendered output)
+#
+#@author: Physx
+def renderScannedFile(filepath):
+    out = io.BytesIO()
+    try:
+        parsed = renderFile(filepath, _workerFormat, out, _workerOrdinalDatabase, _workerParseCache, _workerProjection, _workerParseOptions)
+    except Exception as error:
+        out = io.BytesIO()
+        renderError(_workerFormat, filepath, errorMessage(error), out)
+        parsed = False
+    return parsed, out.getvalue()
+
+def profileScannedFile(filepath): #scanFile or renderScannedFile (by the worker's output format) together with the profile collected meanwhile
+    result = scanFile(filepath) if _workerFormat is None else renderScannedFile(filepath)
+    return result, _profiler.take()
+
+#Function "iterPaths" yields paths of all files to be scanned: every file under a directory tree,
+#a single file, or one path per line from stdin if root is "-".
+#
+#@param:
+#   root - directory, file or "-"
+#
+#@author: Physx
+def iterPaths(root):
+    if (root == "-"):
+        for line in sys.stdin:
+            line = line.strip()
+            if (line):
+                yield line
+    elif (os.path.isfile(root)):
+        yield root
     else:
-        pe_file.seek(int(calcPhysOffset(sections, exportTableRVA), 16))
-        print("    Export Directory")
-        print("    ================")
-        layoutPrint("    Characteristics:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        layoutPrint("    Time Date Stamp:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        layoutPrint("    Major Version:", hexFormat(reverseBytes(readBytes(pe_file, 2)))); print()
-        layoutPrint("    Minor Version:", hexFormat(reverseBytes(readBytes(pe_file, 2)))); print()
-        nameRVA = reverseBytes(readBytes(pe_file, 4))
-        nameOffset = calcPhysOffset(sections, nameRVA)
-        rememberExportDirOffset = pe_file.tell()
-
-        #DLL NAME===============================
-        pe_file.seek(int(nameOffset, 16))
-        nextByte = readBytes(pe_file, 1)
-        dllName = ""
-        while (nextByte != '00'):
-            pe_file.seek(-1, 1)
-            dllName += readBytes(pe_file, 1)
-            nextByte = readBytes(pe_file, 1)
-        pe_file.seek(rememberExportDirOffset)
-        #=======================================
-        
-        layoutPrint("    Name RVA:", hexFormat(nameRVA) + " (phys: " + hexFormat(nameOffset) + ") --> \"" + hexStringToASCII(dllName) + "\""); print()
-        layoutPrint("    Ordinal Base:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        numberOfFunctions = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Number of Functions:", hexFormat(numberOfFunctions)); print()
-        layoutPrint("    Number of Names:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-        exportAddressTableRVA = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Address Table RVA:", hexFormat(exportAddressTableRVA)); print()
-        exportNamePointerTableRVA = reverseBytes(readBytes(pe_file, 4))
-        layoutPrint("    Name Pointer Table RVA:", hexFormat(exportNamePointerTableRVA)); print()
-        layoutPrint("    Ordinal Table RVA:", hexFormat(reverseBytes(readBytes(pe_file, 4)))); print()
-
-        #EXPORT ORDINAL TABLE LIST
-        pe_file.seek(int(ordTableOffset, 16))
-        ord_table = [0 for i in range(int(numberOfFunctions, 16))]
-        for i in range(int(numberOfFunctions, 16)):
-            ord_table[i] = reverseBytes(readBytes(pe_file, 2))
-
-        #EXPORT ADDRESS TABLE
-        print()
-        print("        Export Address Table")
-        print("        ====================")
-        exportAddressTableOffset = calcPhysOffset(sections, exportAddressTableRVA)
-        pe_file.seek(int(exportAddressTableOffset, 16))
-        offset = 0
-        for i in range(int(numberOfFunctions, 16)):
-            currentRVA = format(int(exportAddressTableRVA, 16) + offset, 'x')
-            functionRVA = reverseBytes(readBytes(pe_file, 4))
-
-            ordinal = format(offset//4, 'x')
-            print("            API: " + hexFormat(currentRVA) + " (phys: " + hexFormat(calcPhysOffset(sections, currentRVA)) + ") --> Ordinal: " + hexFormat(fourDigitString(str(ordinal))) + ", Name: \"", end = '')
-            
-            functionNameOrd = ord_table.index(fourDigitString(str(ordinal)))
-            rememberAddressTableOffset = pe_file.tell()
-
-            #API NAME===============================================
-            pe_file.seek(int(calcPhysOffset(sections, exportNamePointerTableRVA), 16))
-            pe_file.seek(functionNameOrd*4, 1)
-            functionNameRVA = reverseBytes(readBytes(pe_file, 4))
-            pe_file.seek(int(calcPhysOffset(sections, functionNameRVA), 16))
-            
-            nextByte = readBytes(pe_file, 1);
-            apiName = ""
-            while (nextByte != '00'):
-                pe_file.seek(-1, 1)
-                apiName += readBytes(pe_file, 1)
-                nextByte = readBytes(pe_file, 1)
-            apiName = hexStringToASCII(apiName)
-            
-            print(apiName + "\"")
-            #=======================================================
-            pe_file.seek(rememberAddressTableOffset)
-            offset += 4
-
-        #EXPORT FUNCTION NAME TABLE
-        print()
-        print("        Export Function Name Table")
-        print("        ==========================")
-        exportNamePointerTableOffset = calcPhysOffset(sections, exportNamePointerTableRVA)
-        pe_file.seek(int(exportNamePointerTableOffset, 16))
-        offset = 0
-        for i in range(int(numberOfFunctions, 16)):
-            currentRVA = format(int(exportNamePointerTableRVA, 16) + offset, 'x')
-            functionRVA = reverseBytes(readBytes(pe_file, 4))
-
-            ordinal = format(offset//4, 'x')
-            print("            API: " + hexFormat(currentRVA) + " (phys: " + hexFormat(calcPhysOffset(sections, currentRVA)) + ") --> Ordinal: " + hexFormat(fourDigitString(str(ordinal))) + ", Name: \"", end = '')
-            
-            functionNameOrd = ord_table.index(fourDigitString(str(ordinal)))
-            rememberAddressTableOffset = pe_file.tell()
-
-            #API NAME===============================================
-            pe_file.seek(int(calcPhysOffset(sections, exportNamePointerTableRVA), 16))
-            pe_file.seek(functionNameOrd*4, 1)
-            functionNameRVA = reverseBytes(readBytes(pe_file, 4))
-            pe_file.seek(int(calcPhysOffset(sections, functionNameRVA), 16))
-
-            nextByte = readBytes(pe_file, 1);
-            apiName = ""
-            while (nextByte != '00'):
-                pe_file.seek(-1, 1)
-                apiName += readBytes(pe_file, 1)
-                nextByte = readBytes(pe_file, 1)
-            apiName = hexStringToASCII(apiName)
-            
-            print(apiName + "\"")
-            #=======================================================
-            pe_file.seek(rememberAddressTableOffset)
-            offset += 4
-
-        #EXPORT ORDINAL TABLE
-        print()
-        print("        Export Ordinal Table")
-        print("        ====================")
-        pe_file.seek(int(ordTableOffset, 16))
-        #ordBase
-        for i in ord_table:
-            print("            Value: " + hexFormat(i) + " (Decoded Ordinal: " + hexFormat(fourDigitString(format(int(i, 16) + int(ordBase, 16), 'x'))) + "), Name: \"", end = '')
-
-            rememberOrdTable = pe_file.tell()
-            #API NAME===============================================
-            pe_file.seek(int(calcPhysOffset(sections, exportNamePointerTableRVA), 16))
-            pe_file.seek(ord_table.index(i)*4, 1)
-            functionNameRVA = reverseBytes(readBytes(pe_file, 4))
-            pe_file.seek(int(calcPhysOffset(sections, functionNameRVA), 16))
-
-            nextByte = readBytes(pe_file, 1);
-            apiName = ""
-            while (nextByte != '00'):
-                pe_file.seek(-1, 1)
-                apiName += readBytes(pe_file, 1)
-                nextByte = readBytes(pe_file, 1)
-            apiName = hexStringToASCII(apiName)
-            
-            print(apiName + "\"")
-            #=======================================================
-            pe_file.seek(rememberOrdTable)
-
-    pe_file.close()
-
-main()
-os.system("pause")
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                yield os.path.join(dirpath, filename)
+
+#Function "scanCorpus" fans the paths out across a process pool and yields one result per file in
+#input order as soon as it is ready: the result record, or (True if the file was parsed, rendered
+#output of the file) if an output format is given. Paths are submitted in windows (two in flight at a time), so the path
+#list of a huge corpus is never held in memory at once.
+#
+#@param:
+#   paths - iterable of file paths
+#   workers - number of worker processes (1 parses in the current process)
+#   chunksize - number of paths sent to a worker in one go
+#   ordinalDatabasePath - path to the OrdinalDatabase used to resolve imports by ordinal (optional)
+#   outputFormat - one of RENDERERS, or None for result records
+#   parseCachePath - path to the ParseCache shared by the workers (optional)
+#   parseCacheSize - bound of the ParseCache (in MB)
+#   projection - Projection of the parts to be parsed (optional, whole files by default)
+#   parseOptions - keyword arguments of PEFile: "strict" and "limits" (optional)
+#   profile - profile the workers too, their profiles are merged into the active Profiler (see "setProfiler")
+#
+#@author: Physx
+def scanCorpus(paths, workers = None, chunksize = 16, ordinalDatabasePath = None, outputFormat = None, parseCachePath = None, parseCacheSize = PARSE_CACHE_SIZE, projection = None, parseOptions = None, profile = False):
+    workers = workers or os.cpu_count() or 1
+    scan = scanFile if outputFormat is None else renderScannedFile
+    paths = iter(paths)
+    if (workers == 1):
+        initWorker(ordinalDatabasePath, outputFormat, parseCachePath, parseCacheSize, projection, parseOptions)
+        for filepath in paths:
+            yield scan(filepath)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    if (profile):
+        scan = profileScannedFile
+    windowSize = workers * chunksize * 4
+    with ProcessPoolExecutor(max_workers = workers, initializer = initWorker, initargs = (ordinalDatabasePath, outputFormat, parseCachePath, parseCacheSize, projection, parseOptions, profile)) as executor:
+        window = list(itertools.islice(paths, windowSize))
+        pending = executor.map(scan, window, chunksize = chunksize)
+        while (window):
+            window = list(itertools.islice(paths, windowSize))
+            following = executor.map(scan, window, chunksize = chunksize)
+            for result in pending:
+                if (profile):
+                    result, workerProfile = result
+                    _profiler.merge(workerProfile)
+                yield result
+            pending = following
+
+def scanMain(args, out): #returns the number of files that couldn't be parsed
+    failed = 0
+    if (args.workers == 1):
+        #single process: files are streamed straight to the output while they are parsed
+        ordinalDatabase = parseCache = None
+        try:
+            ordinalDatabase = OrdinalDatabase(args.ordinal_db) if args.ordinal_db else None
+            parseCache = ParseCache(args.cache, args.cache_size << 20) if args.cache else None
+            for filepath in iterPaths(args.batch):
+                try:
+                    parsed = renderFile(filepath, args.format, out, ordinalDatabase, parseCache, args.fields, args.parse_options)
+                except Exception as error:
+                    renderError(args.format, filepath, errorMessage(error), out)
+                    parsed = False
+                failed += not parsed
+        finally:
+            if (parseCache):
+                parseCache.close()
+            if (ordinalDatabase):
+                ordinalDatabase.close()
+        return failed
+    for parsed, output in scanCorpus(iterPaths(args.batch), args.workers, args.chunksize, args.ordinal_db, args.format, args.cache, args.cache_size, args.fields, args.parse_options, args.profile or args.metrics is not None):
+        out.write(output)
+        failed += not parsed
+    return failed
+
+#===============================================================================================
+#COLUMNAR EXPORT
+#Batch results are collected into tables with one typed column per field, for loading millions of
+#files into analytics jobs: "files" (header fields of every file), "sections", "imports" (one row per
+#imported function) and "exports" (one row per exported function). Rows refer to their file by the
+#"File" column. Names of sections, DLLs, functions and forwarders are dictionary encoded: the tables
+#hold indexes into table "names" (-1 for no name). Rows are written in row groups, so memory is
+#bounded by the row group size and the number of distinct names, not by the size of the corpus.
+#
+#   array   - one ".columns" file per table, read with "readColumnar" (no dependencies)
+#   parquet - one ".parquet" file per table (requires the pyarrow package)
+#
+#Format of ".columns" files: magic "PECOLUMN", uint32 length and JSON list of [column, type code],
+#then row groups: uint32 number of rows and every column as uint64 length and little endian values
+#(type codes of the array module). Strings (type code "s") are uint32 end offsets of all values
+#followed by their UTF-8 bytes.
+#===============================================================================================
+COLUMNAR_ROW_GROUP = 65536  #rows of a table written at once
+COLUMNAR_MAGIC = b"PECOLUMN"
+COLUMNAR_FORMATS = {"array": ".columns", "parquet": ".parquet"}
+
+SIZE_TYPES = {1: "B", 2: "H", 4: "I", 8: "Q"} #type code of an unsigned field by its size
+ARROW_TYPES = {"B": "uint8", "H": "uint16", "I": "uint32", "Q": "uint64", "i": "int32", "s": "string"}
+
+def layoutColumns(prefix, layouts): #typed columns of all fields of the layouts (the wider type where they differ)
+    columns = {}
+    for layout in layouts:
+        for field, size in zip(layout.fields, layout.sizes):
+            columns[prefix + field] = max(columns.get(prefix + field, "B"), SIZE_TYPES[size], key = "BHIQ".index)
+    return list(columns.items())
+
+HEADER_GROUPS = [("MZ Header", [MZ_HEADER_LAYOUT]), ("PE Header", [PE_HEADER_LAYOUT]), ("Optional Header", list(OPT_HEADER_LAYOUTS.values()))]
+
+COLUMNAR_TABLES = {
+    "files": [("File", "I"), ("Path", "s"), ("Error", "s"), ("Warnings", "I")] + [column for group, layouts in HEADER_GROUPS for column in layoutColumns(group + ".", layouts)] + [("Export Name", "i")],
+    "sections": [("File", "I"), ("Name", "i")] + list(zip(SECTION_HEADER_FIELDS, [SIZE_TYPES[size] for size in SECTION_HEADER_SIZES])),
+    "imports": [("File", "I"), ("DLL", "i"), ("Name", "i"), ("Ordinal", "i"), ("Hint", "i")],   #-1 for hint of imports by ordinal and ordinal of imports by name
+    "exports": [("File", "I"), ("Ordinal", "I"), ("RVA", "I"), ("Name", "i"), ("Forwarder", "i")],
+    "names": [("Name", "s")]    #row number is the index used in the other tables
+}
+
+#===============================================================================================
+#Class "ColumnarTable" collects rows of one table and writes them in row groups.
+#
+#@param:
+#   path - path to the output file
+#   columns - list of (column name, type code)
+#   fileFormat - one of COLUMNAR_FORMATS
+#   rowGroupSize - number of rows written at once
+#
+#@author: Physx
+#===============================================================================================
+class ColumnarTable:
+    def __init__(self, path, columns, fileFormat = "array", rowGroupSize = COLUMNAR_ROW_GROUP):
+        import json
+        self.columns = columns
+        self.codes = [column[1] for column in columns]
+        self.rowGroupSize = rowGroupSize
+        self.rows = []
+        self.writer = None
+        if (fileFormat == "parquet"):
+            import pyarrow
+            import pyarrow.parquet
+            self.schema = pyarrow.schema([(name, getattr(pyarrow, ARROW_TYPES[code])()) for name, code in columns])
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+            return
+        self.file = open(path, "wb")
+        schema = json.dumps(columns).encode("utf-8")
+        self.file.write(COLUMNAR_MAGIC + UINT32.pack(len(schema)) + schema)
+
+    def add(self, rows): #rows as tuples of values in the order of columns
+        self.rows += rows
+        while (len(self.rows) >= self.rowGroupSize):
+            self.writeGroup(self.rows[:self.rowGroupSize])
+            del self.rows[:self.rowGroupSize]
+
+    def writeGroup(self, rows):
+        import array
+        values = list(zip(*rows))
+        if (self.writer is not None):
+            import pyarrow
+            self.writer.write_table(pyarrow.Table.from_arrays([pyarrow.array(column, field.type) for column, field in zip(values, self.schema)], schema = self.schema))
+        else:
+            chunks = [UINT32.pack(len(rows))]
+            for code, column in zip(self.codes, values):
+                if (code == "s"):
+                    encoded = [value.encode("utf-8", "replace") for value in column]
+                    data = array.array("I", itertools.accumulate(len(value) for value in encoded))
+                    tail = b"".join(encoded)
+                else:
+                    data = array.array(code, column)
+                    tail = b""
+                if (sys.byteorder == "big"):
+                    data.byteswap()
+                chunks += [UINT64.pack(len(data) * data.itemsize + len(tail)), data.tobytes(), tail]
+            self.file.write(b"".join(chunks))
+
+    def close(self):
+        if (self.rows):
+            self.writeGroup(self.rows)
+            self.rows = []
+        if (self.writer is not None):
+            self.writer.close()
+        else:
+            self.file.close()
+
+#===============================================================================================
+#Class "ColumnarSink" writes result records of batch scanning (see "scanCorpus") into the tables of
+#COLUMNAR_TABLES, one file per table in the output folder.
+#
+#@param:
+#   folder - output folder (created if it doesn't exist)
+#   fileFormat - one of COLUMNAR_FORMATS
+#   rowGroupSize - number of rows of a table written at once
+#
+#@author: Physx
+#===============================================================================================
+class ColumnarSink:
+    def __init__(self, folder, fileFormat = "array", rowGroupSize = COLUMNAR_ROW_GROUP):
+        os.makedirs(folder, exist_ok = True)
+        self.tables = {}
+        try:
+            for table, columns in COLUMNAR_TABLES.items():
+                self.tables[table] = ColumnarTable(os.path.join(folder, table + COLUMNAR_FORMATS[fileFormat]), columns, fileFormat, rowGroupSize)
+        except BaseException:
+            self.close()
+            raise
+        self.names = {}
+        self.files = 0
+        self.headerColumns = [(group, [column[0][len(group) + 1:] for column in layoutColumns(group + ".", layouts)]) for group, layouts in HEADER_GROUPS]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+    def nameIndex(self, name): #index of the name in table "names", -1 for no name
+        if (not name):
+            return -1
+        index = self.names.get(name)
+        if (index is None):
+            index = self.names[name] = len(self.names)
+            self.tables["names"].add([(name,)])
+        return index
+
+    def add(self, record): #returns False if the record is the error of a file that couldn't be parsed
+        fileIndex = self.files
+        self.files += 1
+        exports = record.get("Exports")
+        row = [fileIndex, record["Path"] or "", record.get("Error", ""), len(record.get("Warnings", []))]
+        for group, fields in self.headerColumns:
+            header = record.get(group, {})
+            row += [header.get(field, 0) for field in fields]
+        row.append(self.nameIndex(exports["Name"]) if exports else -1)
+        self.tables["files"].add([tuple(row)])
+        if ("Error" in record):
+            return False
+
+        nameIndex = self.nameIndex
+        self.tables["sections"].add([(fileIndex, nameIndex(section["Name"])) + tuple(section[field] for field in SECTION_HEADER_FIELDS) for section in record["Sections"]])
+        for directory in record["Imports"]:
+            dll = nameIndex(directory["Name"])
+            self.tables["imports"].add([(fileIndex, dll, nameIndex(thunk["Name"]), -1 if thunk["Ordinal"] is None else thunk["Ordinal"], -1 if thunk["Hint"] is None else thunk["Hint"]) for thunk in directory["Thunks"]])
+        if (exports):
+            names = resolveExports(exports)[0] #the first name of an ordinal with several names, as in the other outputs
+            forwarders = exports["Forwarders"]
+            base = exports["Ordinal Base"]
+            self.tables["exports"].add([(fileIndex, (base + i) & 0xFFFFFFFF, functionRVA, nameIndex(names.get(i)), nameIndex(forwarders.get(i))) for i, functionRVA in enumerate(exports["Functions"])])
+        return True
+
+#Function "readColumnar" reads a table written in the "array" format by ColumnarSink, one row
+#group at a time.
+#
+#@param:
+#   path - path to the ".columns" file
+#
+#@return: generator of row groups as {column name : array of values (list for strings)}
+#
+#@author: Physx
+def readColumnar(path):
+    import array
+    import json
+    with open(path, "rb") as file:
+        if (file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC):
+            raise ValueError("Not Columnar File Format")
+        columns = json.loads(file.read(UINT32.unpack(file.read(UINT32.size))[0]).decode("utf-8"))
+        while (True):
+            count = file.read(UINT32.size)
+            if (not count):
+                return
+            count = UINT32.unpack(count)[0]
+            group = {}
+            for name, code in columns:
+                chunk = file.read(UINT64.unpack(file.read(UINT64.size))[0])
+                data = array.array("I" if code == "s" else code)
+                data.frombytes(chunk[:count * data.itemsize])
+                if (sys.byteorder == "big"):
+                    data.byteswap()
+                if (code == "s"):
+                    strings = chunk[count * data.itemsize:]
+                    data = [strings[start:end].decode("utf-8") for start, end in zip([0] + data[:-1].tolist(), data)]
+                group[name] = data
+            yield group
+
+def columnarMain(args): #batch scan into ColumnarSink, returns the number of files that couldn't be parsed
+    failed = 0
+    with ColumnarSink(args.columnar, args.columnar_format, args.row_group) as sink:
+        for record in scanCorpus(iterPaths(args.batch), args.workers, args.chunksize, args.ordinal_db, None, args.cache, args.cache_size, None, args.parse_options, args.profile or args.metrics is not None):
+            with _profiler.stage("Columnar Export"):
+                failed += not sink.add(record)
+    print("Files: " + str(sink.files) + ", Failed: " + str(failed) + ", Names: " + str(len(sink.names)))
+    return failed
+
+#===============================================================================================
+#SERVICE
+#Local HTTP service (TCP on localhost or a Unix socket) that parses PE files uploaded in request
+#bodies, so clients don't pay interpreter startup for every file. Uploads stay in memory and are
+#parsed in a process pool. Every request first takes one of a bounded number of slots (requests
+#queued or being parsed) before its body is read, so a flood of uploads waits in the socket buffers
+#instead of in memory, and requests that can't get a slot in time are turned away.
+#
+#   POST /parse?format=jsonl&fields=SPEC&name=NAME  - body is the content of the PE file ("upload" without name)
+#   GET  /status                                    - number of queued requests
+#===============================================================================================
+SERVICE_QUEUE_SIZE = 64     #requests waiting for a worker
+SERVICE_TIMEOUT = 30        #seconds for parsing one file (and for waiting for a free slot)
+SERVICE_MAX_SIZE = 256      #largest accepted upload (in MB)
+SERVICE_MAX_HEADERS = 100   #header lines of one request
+
+CONTENT_TYPES = {"text": "text/plain; charset=utf-8", "summary": "text/plain; charset=utf-8", "hash": "text/plain; charset=utf-8", "jsonl": "application/x-ndjson", "msgpack": "application/msgpack"}
+
+class ParseTimeout(Exception):
+    pass
+
+def raiseParseTimeout(signum, frame):
+    raise ParseTimeout()
+
+#Function "renderBuffer" parses one uploaded file and returns its output in the requested format
+#(runs inside the worker processes). Parsing that takes longer than the timeout is interrupted
+#with SIGALRM where available, so pathological files don't keep the worker busy.
+#
+#@param:
+#   data - content of the PE file (bytes)
+#   name - name of the file shown in output (optional)
+#   outputFormat - one of RENDERERS
+#   projection - Projection of the parts to be shown (optional)
+#   timeout - seconds for parsing the file (optional)
+#
+#@author: Physx
+def renderBuffer(data, name, outputFormat, projection = None, timeout = None):
+    import signal
+    out = io.BytesIO()
+    timer = bool(timeout) and hasattr(signal, "setitimer")
+    if (timer):
+        signal.signal(signal.SIGALRM, raiseParseTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        try:
+            pe = PEFile(data, _workerOrdinalDatabase, **_workerParseOptions)
+            pe.filepath = name
+            if (projection is not None):
+                renderProjection(pe, projection, outputFormat, out)
+            else:
+                RENDERERS[outputFormat](pe, out)
+        finally:
+            if (timer):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except ParseTimeout:
+        out = io.BytesIO()
+        renderError(outputFormat, name, "Parsing Timed Out", out)
+    except Exception as error: #not PE, truncated or corrupted tables
+        out = io.BytesIO()
+        renderError(outputFormat, name, errorMessage(error), out)
+    return out.getvalue()
+
+#===============================================================================================
+#Class "ParseService" is the asyncio server of the parsing service. Requests are put into a bounded
+#queue, from which one consumer task per worker process hands them to the process pool.
+#
+#@param:
+#   workers - number of worker processes (default: number of CPUs)
+#   queueSize - number of requests waiting for a worker, beyond that new uploads are not read
+#   timeout - seconds for parsing one file, for reading request headers or body and for waiting for a free slot
+#   maxSize - largest accepted upload (in bytes)
+#   ordinalDatabasePath - path to the OrdinalDatabase used to resolve imports by ordinal (optional)
+#   parseOptions - keyword arguments of PEFile: "strict" and "limits" (optional)
+#
+#@author: Physx
+#===============================================================================================
+class ParseService:
+    def __init__(self, workers = None, queueSize = SERVICE_QUEUE_SIZE, timeout = SERVICE_TIMEOUT, maxSize = SERVICE_MAX_SIZE << 20, ordinalDatabasePath = None, parseOptions = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queueSize = queueSize
+        self.timeout = timeout
+        self.maxSize = maxSize
+        self.ordinalDatabasePath = ordinalDatabasePath
+        self.parseOptions = parseOptions
+        self.queue = None
+        self.slots = None
+
+    #Function "serve" runs the service until it is cancelled.
+    #
+    #@param:
+    #   address - "HOST:PORT" or ":PORT" (localhost) for TCP, or path to a Unix socket
+    async def serve(self, address):
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        self.queue = asyncio.Queue(self.queueSize + self.workers) #never full, requests holding a slot always fit
+        self.slots = asyncio.Semaphore(self.queueSize + self.workers)
+        with ProcessPoolExecutor(max_workers = self.workers, initializer = initWorker, initargs = (self.ordinalDatabasePath, None, None, PARSE_CACHE_SIZE, None, self.parseOptions)) as executor:
+            #workers are started before the first connection is accepted, forked later they would keep its socket open
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(executor, os.getpid) for i in range(self.workers)])
+            consumers = [asyncio.ensure_future(self._consume(executor)) for i in range(self.workers)]
+            if ("/" in address or "\\" in address):
+                server = await asyncio.start_unix_server(self._handle, address)
+            else:
+                host, separator, port = address.rpartition(":")
+                server = await asyncio.start_server(self._handle, host or "127.0.0.1", int(port))
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                for consumer in consumers:
+                    consumer.cancel()
+
+    async def _consume(self, executor):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while (True):
+            arguments, result = await self.queue.get()
+            try:
+                #the worker interrupts itself after the timeout; waiting a bit longer covers platforms without SIGALRM
+                output = await asyncio.wait_for(loop.run_in_executor(executor, renderBuffer, *arguments), self.timeout + 5)
+            except Exception as error:
+                if (not result.done()):
+                    result.set_exception(error)
+            else:
+                if (not result.done()):
+                    result.set_result(output)
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        try:
+            status, contentType, body = await self._request(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except asyncio.CancelledError: #an Exception before Python 3.8
+            raise
+        except Exception as error:
+            status, contentType, body = serviceError(500, errorMessage(error))
+        import http
+        writer.write(("HTTP/1.1 " + str(status) + " " + http.HTTPStatus(status).phrase + "\r\nContent-Type: " + contentType + "\r\nContent-Length: " + str(len(body)) + "\r\nConnection: close\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _readHeaders(self, reader): #returns (request line, {header : value}), None if there are too many headers
+        requestLine = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        line = await reader.readline()
+        for i in range(SERVICE_MAX_HEADERS):
+            if (not line.strip()):
+                return requestLine, headers
+            key, separator, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+            line = await reader.readline()
+        return None if line.strip() else (requestLine, headers)
+
+    async def _request(self, reader): #reads and answers one request, returns (status, content type, body)
+        import asyncio
+        import urllib.parse
+        try:
+            request = await asyncio.wait_for(self._readHeaders(reader), self.timeout)
+        except asyncio.TimeoutError:
+            return serviceError(408, "Request Timed Out")
+        except ValueError: #line over the limit of the stream (asyncio.LimitOverrunError)
+            return serviceError(431, "Header Line Too Long")
+        if (request is None):
+            return serviceError(431, "Too Many Headers")
+        requestLine, headers = request
+        if (len(requestLine) != 3):
+            return serviceError(400, "Malformed Request")
+        method = requestLine[0]
+        url = urllib.parse.urlsplit(requestLine[1])
+        query = dict(urllib.parse.parse_qsl(url.query))
+
+        if (url.path == "/status"):
+            return 200, "application/json", jsonSerializer()({"Queued": self.queue.qsize(), "Queue Size": self.queueSize, "Workers": self.workers}) + b"\n"
+        if (url.path != "/parse"):
+            return serviceError(404, "Unknown Path")
+        if (method != "POST"):
+            return serviceError(405, "Files Must Be POSTed")
+        outputFormat = query.get("format", "jsonl")
+        if (outputFormat not in RENDERERS):
+            return serviceError(400, "Unknown Format")
+        projection = None
+        if ("fields" in query):
+            try:
+                projection = Projection(query["fields"])
+            except ValueError as error:
+                return serviceError(400, str(error))
+        try:
+            length = int(headers.get("content-length", "-1"))
+        except ValueError:
+            return serviceError(400, "Malformed Content-Length")
+        if (length < 0):
+            return serviceError(411, "Content-Length Required")
+        if (length > self.maxSize):
+            return serviceError(413, "File Too Large")
+
+        #the body is read only after a slot is free (backpressure)
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            return serviceError(503, "Service Busy")
+        try:
+            try:
+                data = await asyncio.wait_for(reader.readexactly(length), self.timeout) #a stalled upload must not keep its slot
+            except asyncio.TimeoutError:
+                return serviceError(408, "Request Timed Out")
+            result = asyncio.get_running_loop().create_future()
+            await self.queue.put(((data, query.get("name", "upload"), outputFormat, projection, self.timeout), result))
+            del data
+            try:
+                output = await result
+            except asyncio.TimeoutError:
+                return serviceError(504, "Parsing Timed Out")
+            except Exception as error:
+                return serviceError(500, errorMessage(error))
+        finally:
+            self.slots.release()
+        return 200, CONTENT_TYPES[outputFormat], output
+
+def serviceError(status, message): #(status, content type, body) of an error response
+    return status, "text/plain; charset=utf-8", ("Error: " + message + "\n").encode("utf-8")
+
+def serveMain(args):
+    import asyncio
+    service = ParseService(args.workers, args.queue_size, args.timeout, args.max_size << 20, args.ordinal_db, args.parse_options)
+    print("Serving on " + args.serve + " (" + str(service.workers) + " workers)", file = sys.stderr)
+    try:
+        asyncio.run(service.serve(args.serve))
+    except KeyboardInterrupt:
+        pass
+
+#===============================================================================================
+#COMMAND LINE
+#The "perilica" console script (or "python PErilica.py") never waits for input, so it can run from
+#scripts and pipelines. Exit status tells whether every file was parsed.
+#===============================================================================================
+EXIT_SUCCESS = 0        #every file was parsed
+EXIT_FAILURE = 1        #some file couldn't be parsed (not PE, missing, truncated, corrupted)
+EXIT_USAGE = 2          #invalid arguments
+EXIT_BROKEN_PIPE = 141  #output closed early (for example piped to "head")
+EXIT_INTERRUPTED = 130  #interrupted with Ctrl+C
+
+def showFile(filepath, out, outputFormat = "text", ordinalDatabasePath = None, parseCachePath = None, parseCacheSize = PARSE_CACHE_SIZE, projection = None, parseOptions = None):
+    if (outputFormat == "text"):
+        writeLines(out, ["PErilica" + chr(0x2122) + "    by Physx", ""])
+    ordinalDatabase = parseCache = None
+    try:
+        ordinalDatabase = OrdinalDatabase(ordinalDatabasePath) if ordinalDatabasePath else None
+        parseCache = ParseCache(parseCachePath, parseCacheSize << 20) if parseCachePath else None
+        return renderFile(filepath, outputFormat, out, ordinalDatabase, parseCache, projection, parseOptions)
+    finally:
+        if (parseCache):
+            parseCache.close()
+        if (ordinalDatabase):
+            ordinalDatabase.close()
+
+#Function "main" runs the command line and returns its exit status (see EXIT_SUCCESS, ...).
+#
+#@param:
+#   argv - command line arguments (optional, sys.argv[1:] by default)
+#
+#@author: Physx
+def main(argv = None):
+    import argparse
+    parser = argparse.ArgumentParser(prog = "perilica", description = "Parser and viewer of the internal binary structure of PE files.")
+    parser.add_argument("file", nargs = "?", help = "PE file to display")
+    parser.add_argument("--format", choices = sorted(RENDERERS), default = None, help = "output format (default: text for one file, summary in batch mode)")
+    parser.add_argument("--batch", metavar = "PATH", help = "scan every file under directory PATH, or paths read from stdin if PATH is \"-\"")
+    parser.add_argument("--workers", type = int, default = None, help = "number of worker processes in batch mode (default: number of CPUs)")
+    parser.add_argument("--chunksize", type = int, default = 16, help = "number of files handed to a worker at once in batch mode (default: 16)")
+    parser.add_argument("--columnar", metavar = "FOLDER", help = "write batch results into columnar tables (files, sections, imports, exports, names) in FOLDER instead of the output")
+    parser.add_argument("--columnar-format", choices = sorted(COLUMNAR_FORMATS), default = "array", help = "file format of --columnar tables: array (no dependencies) or parquet (requires pyarrow) (default: array)")
+    parser.add_argument("--row-group", type = int, default = COLUMNAR_ROW_GROUP, metavar = "ROWS", help = "rows of a --columnar table written at once (default: " + str(COLUMNAR_ROW_GROUP) + ")")
+    parser.add_argument("--ordinal-db", metavar = "DB", help = "database of reference DLL exports used to resolve imports by ordinal")
+    parser.add_argument("--build-ordinal-db", metavar = "FOLDER", help = "index exports of all DLLs under FOLDER into the --ordinal-db database and exit")
+    parser.add_argument("--cache", metavar = "DB", help = "cache of parsed files, repeated files are not parsed again")
+    parser.add_argument("--cache-size", type = int, default = PARSE_CACHE_SIZE, metavar = "MB", help = "bound of the --cache database, least recently used files are evicted (default: " + str(PARSE_CACHE_SIZE) + ")")
+    parser.add_argument("--fields", metavar = "SPEC", help = "parse and show only the given fields, for example: \"imports.dll,opt.AddressOfEntryPoint\" or \"sections.name,rva\" (groups: " + ", ".join(Projection.GROUPS) + ")")
+    parser.add_argument("--serve", metavar = "ADDRESS", help = "run the parsing service on [HOST]:PORT (localhost by default) or on a Unix socket at path ADDRESS")
+    parser.add_argument("--queue-size", type = int, default = SERVICE_QUEUE_SIZE, help = "requests waiting for a worker in service mode (default: " + str(SERVICE_QUEUE_SIZE) + ")")
+    parser.add_argument("--timeout", type = float, default = SERVICE_TIMEOUT, help = "seconds for parsing one file in service mode (default: " + str(SERVICE_TIMEOUT) + ")")
+    parser.add_argument("--max-size", type = int, default = SERVICE_MAX_SIZE, metavar = "MB", help = "largest accepted upload in service mode (default: " + str(SERVICE_MAX_SIZE) + ")")
+    parser.add_argument("--lenient", action = "store_true", help = "record anomalies of malformed files as warnings and parse as much as possible, instead of stopping at the first one")
+    parser.add_argument("--limit", action = "append", default = [], metavar = "NAME=N", help = "override a limit of work spent on one file (" + ", ".join(normalizeField(limit) for limit in DEFAULT_LIMITS) + ")")
+    parser.add_argument("--profile", action = "store_true", help = "print time spent in every parse stage and I/O and RVA lookup counters to stderr (summed over all files in batch mode)")
+    parser.add_argument("--metrics", metavar = "SINK", help = "send stage timings and counters in statsd format to file SINK, or to udp://HOST:PORT")
+    args = parser.parse_args(argv)
+    if (args.workers is not None and args.workers < 1):
+        parser.error("--workers: expected a positive number of processes")
+    if (args.chunksize < 1):
+        parser.error("--chunksize: expected a positive number of files")
+    if (args.file is None and args.batch is None and args.serve is None and args.build_ordinal_db is None):
+        parser.error("a file, --batch, --serve or --build-ordinal-db is required")
+    if (args.columnar is not None):
+        if (args.batch is None):
+            parser.error("--columnar requires --batch")
+        if (args.format is not None or args.fields is not None):
+            parser.error("--columnar can't be combined with --format and --fields")
+        if (args.row_group < 1):
+            parser.error("--row-group: expected a positive number of rows")
+        if (args.columnar_format == "parquet"):
+            import importlib.util
+            if (importlib.util.find_spec("pyarrow") is None):
+                parser.error("parquet output requires the pyarrow package")
+    if (args.format is None):
+        args.format = "summary" if args.batch is not None else "text"
+    limits = {}
+    for limit in args.limit:
+        name, separator, value = limit.partition("=")
+        matches = [key for key in DEFAULT_LIMITS if normalizeField(key) == normalizeField(name)]
+        if (not matches or not value.isdigit()):
+            parser.error("--limit: expected NAME=N with NAME one of " + ", ".join(normalizeField(key) for key in DEFAULT_LIMITS))
+        limits[matches[0]] = int(value)
+    args.parse_options = {"strict": not args.lenient, "limits": limits}
+    if (args.fields is not None):
+        try:
+            args.fields = Projection(args.fields)
+        except ValueError as error:
+            parser.error("--fields: " + str(error))
+        if (args.format == "hash"):
+            parser.error("--fields can't be combined with hash output")
+        if (args.fields.analyzesSections):
+            import importlib.util
+            if (importlib.util.find_spec("numpy") is None):
+                parser.error("section analysis requires the numpy package")
+    if (args.format == "msgpack"):
+        import importlib.util
+        if (importlib.util.find_spec("msgpack") is None):
+            parser.error("msgpack output requires the msgpack package")
+
+    if (args.build_ordinal_db is not None):
+        if (args.ordinal_db is None):
+            parser.error("--build-ordinal-db requires --ordinal-db")
+        database = OrdinalDatabase(args.ordinal_db)
+        indexed, unchanged, failed = database.build(args.build_ordinal_db)
+        database.close()
+        print("Indexed: " + str(indexed) + ", Unchanged: " + str(unchanged) + ", Failed: " + str(failed))
+        return EXIT_SUCCESS
+
+    if (args.serve is not None):
+        if (args.profile or args.metrics is not None):
+            parser.error("--profile and --metrics can't be combined with --serve")
+        if (args.queue_size < 1):
+            parser.error("--queue-size: expected a positive number of requests")
+        serveMain(args)
+        return EXIT_SUCCESS
+
+    if (args.profile or args.metrics is not None):
+        try:
+            setProfiler(Profiler([MetricsSink(args.metrics)] if args.metrics is not None else []))
+        except (OSError, ValueError) as error:
+            parser.error("--metrics: " + errorMessage(error))
+    out = sys.stdout.buffer
+    sys.stdout.flush()
+    try:
+        if (args.columnar is not None):
+            parsed = columnarMain(args) == 0
+        elif (args.batch is not None):
+            parsed = scanMain(args, out) == 0
+        else:
+            parsed = showFile(args.file, out, args.format, args.ordinal_db, args.cache, args.cache_size, args.fields, args.parse_options)
+        out.flush()
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        #the reader went away: stdout is pointed to devnull so that flushing it at exit doesn't fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_BROKEN_PIPE
+    if (args.profile):
+        sys.stderr.write("\n".join(activeProfiler().report()) + "\n")
+    if (args.metrics is not None):
+        activeProfiler().close()
+    return EXIT_SUCCESS if parsed else EXIT_FAILURE
+
+if __name__ == "__main__":
+    sys.exit(main())
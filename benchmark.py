@@ -0,0 +1,330 @@
+import argparse
+import io
+import json
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import PErilica
+
+#===============================================================================================
+#PErilica Benchmark
+#==================
+#
+#Benchmark of the parser hot paths on synthetic PE files generated in memory, so no real binaries
+#are needed. Every stage (header decode, RVA lookups, import walk, export walk, rendering) is timed
+#separately, together with the cold start of a header-only parse from the command line. Results are
+#written to a JSON file that can be compared with a previous run.
+#
+#@author: ftodoric
+#===============================================================================================
+
+FILE_ALIGNMENT = 0x200
+SECTION_ALIGNMENT = 0x1000
+
+def align(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+#Function "buildPE" generates a valid PE file with the given number of sections, imported DLLs,
+#import thunks per DLL (the first "ordinalImports" of them imported by ordinal) and exports.
+#Import and export tables are placed in ".rdata", the rest of the sections are filled with data.
+#
+#@param:
+#   numberOfSections - number of sections (at least 2: ".text" and ".rdata")
+#   numberOfDlls - number of import directories
+#   thunksPerDll - number of imported functions per DLL
+#   numberOfExports - number of exported functions (0 for no export table)
+#   ordinalImports - number of functions per DLL imported by ordinal
+#   pe32plus - generate 64-bit (PE32+) file
+#
+#@return: content of the PE file (bytes)
+#
+#@author: Physx
+def buildPE(numberOfSections = 4, numberOfDlls = 4, thunksPerDll = 50, numberOfExports = 500, ordinalImports = 5, pe32plus = False):
+    optionalHeaderSize = 240 if pe32plus else 224
+    peHeaderOffset = 0x80
+    numberOfSections = max(numberOfSections, 2)
+    sizeOfHeaders = align(peHeaderOffset + 24 + optionalHeaderSize + 40 * numberOfSections, FILE_ALIGNMENT)
+    thunkFormat, ordinalFlag = ("<Q", 1 << 63) if pe32plus else ("<I", 1 << 31)
+    thunkSize = struct.calcsize(thunkFormat)
+
+    textRVA = SECTION_ALIGNMENT
+    text = b"\xcc" * 0x400
+    rdataRVA = textRVA + align(len(text), SECTION_ALIGNMENT)
+    rdata = bytearray()
+
+    def put(data, alignment = 4): #appends data to ".rdata", returns its RVA
+        rdata.extend(b"\0" * (-len(rdata) % alignment))
+        RVA = rdataRVA + len(rdata)
+        rdata.extend(data)
+        return RVA
+
+    #IMPORT TABLE
+    directories = []
+    for dll in range(numberOfDlls):
+        nameRVA = put(("lib" + str(dll) + ".dll").encode() + b"\0", 2)
+        thunks = []
+        for i in range(thunksPerDll):
+            if (i < ordinalImports):
+                thunks.append(ordinalFlag | (i + 1))
+            else:
+                thunks.append(put(struct.pack("<H", i) + ("Function_" + str(dll) + "_" + str(i)).encode() + b"\0", 2))
+        thunkTable = b"".join(struct.pack(thunkFormat, thunk) for thunk in thunks) + b"\0" * thunkSize
+        directories.append((put(thunkTable, 8), nameRVA, put(thunkTable, 8)))
+    importTableRVA = put(b"".join(struct.pack("<IIIII", nameTableRVA, 0, 0, nameRVA, addressTableRVA) for nameTableRVA, nameRVA, addressTableRVA in directories) + b"\0" * 20)
+    importTableSize = 20 * (numberOfDlls + 1)
+
+    #EXPORT TABLE
+    exportTableRVA = exportTableSize = 0
+    if (numberOfExports):
+        names = ["Export_" + str(i).zfill(6) for i in range(numberOfExports)]
+        nameRVAs = [put(name.encode() + b"\0", 1) for name in names]
+        dllNameRVA = put(b"synthetic.dll\0", 1)
+        exportTableRVA = put(b"\0" * 40)
+        addressTableRVA = put(struct.pack("<" + str(numberOfExports) + "I", *[textRVA + (i * 16) % len(text) for i in range(numberOfExports)]))
+        namePointerTableRVA = put(struct.pack("<" + str(numberOfExports) + "I", *nameRVAs))
+        ordinalTableRVA = put(struct.pack("<" + str(numberOfExports) + "H", *reversed(range(numberOfExports))), 2)
+        exportTableSize = rdataRVA + len(rdata) - exportTableRVA
+        struct.pack_into("<IIHHIIIIIII", rdata, exportTableRVA - rdataRVA, 0, 0, 0, 0, dllNameRVA, 1, numberOfExports, numberOfExports, addressTableRVA, namePointerTableRVA, ordinalTableRVA)
+
+    sections = [(b".text", textRVA, text, 0x60000020), (b".rdata", rdataRVA, bytes(rdata), 0x40000040)]
+    nextRVA = rdataRVA + align(len(rdata), SECTION_ALIGNMENT)
+    for i in range(numberOfSections - 2):
+        sections.append((b".data" + str(i).encode(), nextRVA, bytes((i * 7 + j) & 0xFF for j in range(FILE_ALIGNMENT)), 0xC0000040))
+        nextRVA += SECTION_ALIGNMENT
+
+    #HEADERS
+    pe = bytearray(sizeOfHeaders)
+    struct.pack_into("<2s58xI", pe, 0, b"MZ", peHeaderOffset)
+    struct.pack_into("<4sHHIIIHH", pe, peHeaderOffset, b"PE\0\0", 0x8664 if pe32plus else 0x014C, len(sections), 0x5D000000, 0, 0, optionalHeaderSize, 0x2102)
+    optionalHeaderOffset = peHeaderOffset + 24
+    if (pe32plus):
+        struct.pack_into("<HBBIIIIIQIIHHHHHHIIIIHHQQQQII", pe, optionalHeaderOffset, 0x020B, 14, 0, len(text), len(rdata), 0, textRVA, textRVA, 0x180000000, SECTION_ALIGNMENT, FILE_ALIGNMENT, 6, 0, 0, 0, 6, 0, 0, nextRVA, sizeOfHeaders, 0, 3, 0x8160, 0x100000, 0x1000, 0x100000, 0x1000, 0, 16)
+        dataDirectoriesOffset = optionalHeaderOffset + 112
+    else:
+        struct.pack_into("<HBBIIIIIIIIIHHHHHHIIIIHHIIIIII", pe, optionalHeaderOffset, 0x010B, 14, 0, len(text), len(rdata), 0, textRVA, textRVA, rdataRVA, 0x10000000, SECTION_ALIGNMENT, FILE_ALIGNMENT, 6, 0, 0, 0, 6, 0, 0, nextRVA, sizeOfHeaders, 0, 3, 0x8140, 0x100000, 0x1000, 0x100000, 0x1000, 0, 16)
+        dataDirectoriesOffset = optionalHeaderOffset + 96
+    struct.pack_into("<IIII", pe, dataDirectoriesOffset, exportTableRVA, exportTableSize, importTableRVA, importTableSize)
+
+    #SECTION HEADERS AND DATA
+    sectionHeaderOffset = optionalHeaderOffset + optionalHeaderSize
+    pointerToRawData = sizeOfHeaders
+    for name, RVA, data, characteristics in sections:
+        sizeOfRawData = align(len(data), FILE_ALIGNMENT)
+        struct.pack_into("<8sIIIIIIHHI", pe, sectionHeaderOffset, name, len(data), RVA, sizeOfRawData, pointerToRawData, 0, 0, 0, 0, characteristics)
+        sectionHeaderOffset += 40
+        pointerToRawData += sizeOfRawData
+    for name, RVA, data, characteristics in sections:
+        pe.extend(data + b"\0" * (align(len(data), FILE_ALIGNMENT) - len(data)))
+    return bytes(pe)
+
+#===============================================================================================
+#STAGES
+#Every stage gets freshly constructed PEFile objects (outside of the timed part where possible),
+#so lazy parsing and LRU caches of one stage never make another stage look faster.
+#===============================================================================================
+def stageHeaders(files):
+    for data in files:
+        PErilica.PEFile(data)
+
+def stageLookups(files):
+    for data, RVAs in files:
+        index = PErilica.SectionIndex(data.sections, data.opt_header["Size of Headers"])
+        for RVA in RVAs:
+            index.calcPhysOffset(RVA)
+
+def stageImports(files):
+    for pe in files:
+        for directory in pe.iterImports():
+            pass
+
+def stageExports(files):
+    for pe in files:
+        pe.exports
+
+def stageRender(files, outputFormat):
+    out = io.BytesIO()
+    for pe in files:
+        PErilica.RENDERERS[outputFormat](pe, out)
+        out.seek(0)
+        out.truncate()
+
+def parsedFiles(files): #PEFile objects with all tables already parsed, so the rendering stage times only formatting
+    parsed = []
+    for data in files:
+        pe = PErilica.PEFile(data)
+        pe.imports
+        if (pe.exports is not None):
+            pe.exportNames
+        parsed.append(pe)
+    return parsed
+
+def lookupRVAs(pe): #every RVA the parser translates for this file: directories, thunk tables, names
+    RVAs = []
+    for directory in pe.imports:
+        RVAs += [directory["Name RVA"], directory["Import Name Table RVA"]]
+    exports = pe.exports
+    if (exports is not None):
+        RVAs += [exports["Address Table RVA"], exports["Name Pointer Table RVA"], exports["Ordinal Table RVA"]]
+        RVAs += [exports["Address Table RVA"] + i*4 for i in range(exports["Number of Functions"])]
+    return RVAs
+
+def timeStage(repeat, prepare, stage):
+    best = None
+    for i in range(repeat):
+        files = prepare()
+        start = time.perf_counter()
+        stage(files)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+#Function "runBenchmark" times all stages over the generated files.
+#
+#@param:
+#   files - list of generated PE files (bytes)
+#   repeat - number of runs of each stage (the fastest one is reported)
+#   outputFormat - renderer used in the rendering stage
+#
+#@return: map with the results
+#
+#@author: Physx
+def runBenchmark(files, repeat, outputFormat):
+    totalBytes = sum(len(data) for data in files)
+    stages = {
+        "headers": timeStage(repeat, lambda: files, stageHeaders),
+        "lookups": timeStage(repeat, lambda: [(pe, lookupRVAs(pe)) for pe in (PErilica.PEFile(data) for data in files)], stageLookups),
+        "imports": timeStage(repeat, lambda: [PErilica.PEFile(data) for data in files], stageImports),
+        "exports": timeStage(repeat, lambda: [PErilica.PEFile(data) for data in files], stageExports),
+        "render": timeStage(repeat, lambda: parsedFiles(files), lambda parsed: stageRender(parsed, outputFormat))
+    }
+
+    #full run: parse and render every file from scratch
+    def fullRun(files):
+        out = io.BytesIO()
+        for data in files:
+            PErilica.RENDERERS[outputFormat](PErilica.PEFile(data), out)
+            out.seek(0)
+            out.truncate()
+    total = timeStage(repeat, lambda: files, fullRun)
+
+    tracemalloc.start()
+    fullRun(files)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "stages": stages,
+        "total": total,
+        "files/s": len(files) / total,
+        "MB/s": totalBytes / total / 1e6,
+        "peak memory": peakMemory
+    }
+
+#Function "measureColdStart" times a header-only parse of one file from the command line, the way
+#the "perilica" console script runs it: a new interpreter imports PErilica (from its cached bytecode),
+#parses the headers and exits.
+#
+#@param:
+#   data - content of the PE file
+#   runs - number of runs, the fastest is reported
+#
+#@return: seconds of the fastest run
+#
+#@author: Physx
+def measureColdStart(data, runs):
+    with tempfile.NamedTemporaryFile(suffix = ".exe", delete = False) as file:
+        file.write(data)
+    command = [sys.executable, "-c", "import sys, PErilica; sys.exit(PErilica.main())", file.name, "--fields", "pe", "--format", "summary"]
+    directory = os.path.dirname(os.path.abspath(PErilica.__file__))
+    try:
+        best = float("inf")
+        for i in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd = directory, stdout = subprocess.DEVNULL, check = True)
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        os.remove(file.name)
+
+#Function "compareResults" prints the change of every timing against a previous run.
+#
+#@return: True if any stage got slower by more than the threshold
+#
+#@author: Physx
+def compareResults(previous, current, threshold):
+    regression = False
+    rows = [(name, previous["results"]["stages"].get(name), seconds) for name, seconds in current["results"]["stages"].items()]
+    rows.append(("total", previous["results"]["total"], current["results"]["total"]))
+    if ("cold start" in current["results"]):
+        rows.append(("cold start", previous["results"].get("cold start"), current["results"]["cold start"]))
+    for name, before, after in rows:
+        if (before is None):
+            continue
+        change = (after - before) / before
+        slower = change > threshold
+        regression = regression or slower
+        print("    " + (name + ":").ljust(20) + format(before * 1000, ".2f") + " ms --> " + format(after * 1000, ".2f") + " ms (" + format(change * 100, "+.1f") + "%)" + ("  REGRESSION" if slower else ""))
+    return regression
+
+def main():
+    parser = argparse.ArgumentParser(prog = "benchmark", description = "Benchmark of PErilica parse stages on synthetic PE files.")
+    parser.add_argument("--files", type = int, default = 50, help = "number of generated files (default: 50)")
+    parser.add_argument("--sections", type = int, default = 4, help = "sections per file (default: 4)")
+    parser.add_argument("--dlls", type = int, default = 4, help = "imported DLLs per file (default: 4)")
+    parser.add_argument("--thunks", type = int, default = 50, help = "imported functions per DLL (default: 50)")
+    parser.add_argument("--ordinal-imports", type = int, default = 5, help = "functions per DLL imported by ordinal (default: 5)")
+    parser.add_argument("--exports", type = int, default = 500, help = "exported functions per file (default: 500)")
+    parser.add_argument("--pe32plus", action = "store_true", help = "generate 64-bit files")
+    parser.add_argument("--format", choices = ["text", "summary", "jsonl", "hash"], default = "text", help = "renderer used in the rendering stage (default: text)")
+    parser.add_argument("--repeat", type = int, default = 5, help = "runs of every stage, the fastest is reported (default: 5)")
+    parser.add_argument("--cold-starts", type = int, default = 10, help = "runs of a header-only parse in a new interpreter, the fastest is reported (default: 10, 0 to skip)")
+    parser.add_argument("--output", metavar = "FILE", help = "file the results are written to, \"-\" for stdout (not saved by default)")
+    parser.add_argument("--compare", metavar = "FILE", help = "results of a previous run to compare with")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "slowdown reported as regression (default: 0.10)")
+    args = parser.parse_args()
+
+    config = {"files": args.files, "sections": args.sections, "dlls": args.dlls, "thunks": args.thunks, "ordinal imports": args.ordinal_imports, "exports": args.exports, "pe32plus": args.pe32plus, "format": args.format, "repeat": args.repeat, "cold starts": args.cold_starts}
+    files = [buildPE(args.sections, args.dlls, args.thunks, args.exports, args.ordinal_imports, args.pe32plus) for i in range(args.files)]
+    results = runBenchmark(files, args.repeat, args.format)
+    if (args.cold_starts > 0):
+        results["cold start"] = measureColdStart(files[0], args.cold_starts)
+    report = {"config": config, "python": platform.python_version(), "results": results}
+
+    resultsOut = sys.stdout
+    if (args.output == "-"):
+        sys.stdout = sys.stderr #the report is moved to stderr, so stdout carries only the JSON results
+    print("PErilica Benchmark")
+    print("==================")
+    for name, seconds in results["stages"].items():
+        print("    " + (name + ":").ljust(20) + format(seconds * 1000, ".2f") + " ms")
+    print("    " + "total:".ljust(20) + format(results["total"] * 1000, ".2f") + " ms")
+    print("    " + "throughput:".ljust(20) + format(results["files/s"], ".1f") + " files/s, " + format(results["MB/s"], ".2f") + " MB/s")
+    print("    " + "peak memory:".ljust(20) + format(results["peak memory"] / 1024, ".1f") + " KiB")
+    if ("cold start" in results):
+        print("    " + "cold start:".ljust(20) + format(results["cold start"] * 1000, ".2f") + " ms")
+
+    if (args.output == "-"):
+        json.dump(report, resultsOut, indent = 4)
+        resultsOut.write("\n")
+    elif (args.output is not None):
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent = 4)
+
+    if (args.compare is not None):
+        with open(args.compare) as file:
+            previous = json.load(file)
+        if (previous["config"] != config):
+            print("Warning: compared runs have different configuration!")
+        print()
+        print("Compared to " + args.compare)
+        if (compareResults(previous, report, args.threshold)):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import itertools
+import math
+import random
+
+import pytest
+
+import PErilica
+
+pytest.importorskip("numpy")
+
+def expectedAnalysis(data): #the same statistics computed byte by byte
+    runs = [len(list(group)) for byte, group in itertools.groupby(data) if byte == 0]
+    counts = [data.count(byte) for byte in range(256)]
+    entropy = 0.0 - sum(count / len(data) * math.log2(count / len(data)) for count in counts if count)
+    return {"Histogram": counts, "Zero Bytes": counts[0], "Zero Runs": sum(run >= PErilica.ZERO_RUN_LENGTH for run in runs), "Longest Zero Run": max(runs, default = 0)}, entropy
+
+#random data with zero runs of every length from 1 to 70, one of them at the very end
+def sampleData():
+    generator = random.Random(13)
+    data = bytearray()
+    for length in range(1, 71):
+        data += bytes(generator.randrange(1, 256) for i in range(generator.randrange(1, 40)))
+        data += bytes(length)
+    return bytes(data)
+
+@pytest.mark.parametrize("chunkSize", [1, 7, 16, 17, 64, 1 << 24])
+def testZeroRunsSpanningChunksAreCountedOnce(chunkSize):
+    data = sampleData()
+    expected, entropy = expectedAnalysis(data)
+    analysis = PErilica.analyzeSection(b"\xCC" * 10 + data + b"\xCC" * 10, 10, len(data), chunkSize)
+    assert analysis.pop("Entropy") == pytest.approx(entropy)
+    assert analysis == expected
+
+def testSectionOfZerosAndDataPastTheEndOfFile():
+    analysis = PErilica.analyzeSection(bytes(100), 20, 1000, 16)
+    assert (analysis["Zero Bytes"], analysis["Zero Runs"], analysis["Longest Zero Run"], analysis["Entropy"]) == (80, 1, 80, 0.0)
+    assert PErilica.analyzeSection(bytes(100), 200, 50)["Histogram"] == [0] * 256
@@ -0,0 +1,44 @@
+import PErilica
+from benchmark import buildPE
+
+def cachedFile(tmp_path):
+    path = tmp_path / "synthetic.dll"
+    path.write_bytes(buildPE(3, 2, 5, 20, 1, False))
+    return str(path)
+
+def testModelsAreKeyedByParseOptions(tmp_path):
+    path = cachedFile(tmp_path)
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"))
+    for parseOptions in [None, None, {"strict": False}, {"limits": {"Exports": 100}}, {}]:
+        cache.open(path, None, parseOptions).close()
+    cache.close()
+    assert (cache.hits, cache.misses) == (2, 3)
+
+def testRunningTotalFollowsEviction(tmp_path):
+    path = cachedFile(tmp_path)
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"))
+    cache.open(path).close()
+    cache.open(path, None, {"strict": False}).close()
+    total = cache.connection.execute("SELECT size FROM totals").fetchone()[0]
+    assert total == cache.connection.execute("SELECT SUM(size) FROM models").fetchone()[0] > 0
+    cache.close()
+
+    #reopening doesn't count the stored models again, a smaller bound evicts them on the next miss
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"), total // 2)
+    assert cache.connection.execute("SELECT size FROM totals").fetchall() == [(total,)]
+    cache.open(path, None, {"limits": {"Exports": 100}}).close()
+    assert cache.connection.execute("SELECT size FROM totals").fetchone()[0] == cache.connection.execute("SELECT SUM(size) FROM models").fetchone()[0] <= total // 2
+    cache.close()
+
+def testHitsAreWrittenOnClose(tmp_path):
+    path = cachedFile(tmp_path)
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"))
+    cache.open(path).close()
+    stored = cache.connection.execute("SELECT used FROM models").fetchone()[0]
+    cache.close()
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"))
+    cache.open(path).close()
+    cache.close()
+    cache = PErilica.ParseCache(str(tmp_path / "cache.db"))
+    assert cache.connection.execute("SELECT used FROM models").fetchone()[0] > stored
+    cache.close()
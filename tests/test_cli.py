@@ -0,0 +1,20 @@
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+@pytest.mark.parametrize("arguments", [["--chunksize", "0"], ["--workers", "-2"], ["--workers", "0"]])
+def testNonPositiveCountsAreUsageErrors(arguments, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit:
+        PErilica.main(["--batch", str(tmp_path)] + arguments)
+    assert exit.value.code == PErilica.EXIT_USAGE
+    assert "expected a positive number" in capsys.readouterr().err
+
+def testShowFileClosesOrdinalDatabase(tmp_path, monkeypatch):
+    closed = []
+    close = PErilica.OrdinalDatabase.close
+    monkeypatch.setattr(PErilica.OrdinalDatabase, "close", lambda database: closed.append(database) or close(database))
+    path = tmp_path / "synthetic.dll"
+    path.write_bytes(buildPE(3, 2, 5, 20, 1, False))
+    assert PErilica.main([str(path), "--ordinal-db", str(tmp_path / "ordinals.db"), "--format", "hash"]) == PErilica.EXIT_SUCCESS
+    assert len(closed) == 1
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+#parses the files into the tables of ColumnarSink, returns the record of every file
+def writeTables(folder, files, fileFormat):
+    records = []
+    with PErilica.ColumnarSink(str(folder), fileFormat, 2) as sink:
+        for path in files:
+            with PErilica.PEFile(path) as pe:
+                records.append(pe.toDict())
+            sink.add(records[-1])
+        sink.add({"Path": "missing.exe", "Error": "No such file or directory"})
+    return records
+
+def sampleFiles(tmp_path):
+    files = []
+    for i, pe32plus in enumerate([False, True]):
+        path = tmp_path / ("sample" + str(i) + ".dll")
+        path.write_bytes(buildPE(3, 2, 5, 20, 1, pe32plus))
+        files.append(str(path))
+    return files
+
+def readTable(folder, table):
+    rows = {}
+    for group in PErilica.readColumnar(os.path.join(str(folder), table + ".columns")):
+        for name, column in group.items():
+            rows.setdefault(name, []).extend(column)
+    return rows
+
+def testArrayTablesRoundTrip(tmp_path):
+    records = writeTables(tmp_path / "tables", sampleFiles(tmp_path), "array")
+    names = readTable(tmp_path / "tables", "names")["Name"]
+    files = readTable(tmp_path / "tables", "files")
+    assert files["Path"] == [record["Path"] for record in records] + ["missing.exe"]
+    assert files["Error"] == ["", "", "No such file or directory"]
+    imports = readTable(tmp_path / "tables", "imports")
+    thunks = [(directory["Name"], thunk["Name"]) for record in records for directory in record["Imports"] for thunk in directory["Thunks"]]
+    assert [(names[dll], names[name] if name >= 0 else "") for dll, name in zip(imports["DLL"], imports["Name"])] == thunks
+    exports = readTable(tmp_path / "tables", "exports")
+    assert list(exports["RVA"]) == [functionRVA for record in records for functionRVA in record["Exports"]["Functions"]]
+
+def testParquetTablesMatchArrayTables(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow.parquet")
+    files = sampleFiles(tmp_path)
+    writeTables(tmp_path / "array", files, "array")
+    writeTables(tmp_path / "parquet", files, "parquet")
+    for table in PErilica.COLUMNAR_TABLES:
+        expected = {name: list(column) for name, column in readTable(tmp_path / "array", table).items()}
+        assert pyarrow.read_table(str(tmp_path / "parquet" / (table + ".parquet"))).to_pydict() == expected
+
+def testOrdinalWithSeveralNamesKeepsTheFirst(tmp_path):
+    data = bytearray(buildPE(3, 2, 5, 20, 1, False))
+    with PErilica.PEFile(bytes(data)) as pe:
+        offset = pe.physOffset(pe.exports["Ordinal Table RVA"])
+        ordinal = pe.exports["Ordinals"][0]
+        firstName = pe.exports["Names"][0]
+    data[offset + 2:offset + 4] = data[offset:offset + 2] #the second name is an alias of the first one's ordinal
+    path = tmp_path / "aliased.dll"
+    path.write_bytes(data)
+    records = writeTables(tmp_path / "tables", [str(path)], "array")
+    with PErilica.PEFile(str(path)) as pe:
+        assert pe.exportNames[ordinal] == firstName
+        expected = [pe.exportNames.get(i, "") for i in range(len(pe.exports["Functions"]))]
+    names = readTable(tmp_path / "tables", "names")["Name"]
+    exports = readTable(tmp_path / "tables", "exports")
+    assert [names[name] if name >= 0 else "" for name in exports["Name"]] == expected
+    assert records[0]["Exports"]["Names"][1] != firstName
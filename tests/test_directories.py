@@ -0,0 +1,56 @@
+import struct
+
+import PErilica
+from benchmark import buildPE
+
+DATA_DIRECTORY_OFFSET = 0x80 + 24 + 96 #data directory array of the PE32 files built by buildPE
+
+#synthetic PE32 file with the content of one data directory stored in its .data0 section
+def withDirectory(name, content, **parseOptions):
+    data = bytearray(buildPE(3, 2, 5, 20, 1, False))
+    virtualSize, RVA, sizeOfRawData, pointerToRawData = PErilica.PEFile(bytes(data)).sections[".data0"][:4]
+    assert len(content) <= sizeOfRawData
+    data[pointerToRawData:pointerToRawData + len(content)] = content
+    struct.pack_into("<II", data, DATA_DIRECTORY_OFFSET + PErilica.DATA_DIRECTORY_NAMES.index(name) * PErilica.DATA_DIRECTORY_SIZE, RVA, len(content))
+    return PErilica.PEFile(bytes(data), **parseOptions)
+
+#resource tree of nested directories with one ID entry each, the last one pointing to "target"
+def resourceChain(depth, target):
+    content = b""
+    for level in range(depth):
+        following = (level + 1) * 24 | PErilica.RESOURCE_HIGH_BIT if level + 1 < depth else target
+        content += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", level + 1, following)
+    return content
+
+def testResourceTreeIsWalkedDepthFirst():
+    pe = withDirectory("RESOURCE", resourceChain(4, 4 * 24) + struct.pack("<IIII", 0x3000, 16, 0, 0))
+    nodes = list(pe.iterResources())
+    assert [node["Path"] for node in nodes] == [[], [1], [1, 2], [1, 2, 3], [1, 2, 3, 4]]
+    assert (nodes[-1]["Data RVA"], nodes[-1]["Size"]) == (0x3000, 16)
+
+def testResourceLoopsAreNotWalked():
+    pe = withDirectory("RESOURCE", resourceChain(3, 24 | PErilica.RESOURCE_HIGH_BIT), strict = False)
+    assert [node["Path"] for node in pe.iterResources()] == [[], [1], [1, 2]]
+    assert pe.warnings == [{"Table": "Resources", "Message": "Resource Directory Loop at 0x18"}]
+
+def testDeepResourceTreesStopAtTheEntriesLimit():
+    pe = withDirectory("RESOURCE", resourceChain(20, 0), strict = False, limits = {"Resource Entries": 5})
+    assert len(list(pe.iterResources())) == 6
+    assert pe.warnings == [{"Table": "Resources", "Message": "Resource Entries Limit of 5 Exceeded"}]
+
+def relocationBlock(pageRVA, entries, blockSize = None):
+    return struct.pack("<II" + str(len(entries)) + "H", pageRVA, blockSize or 8 + 2 * len(entries), *entries)
+
+def testRelocationBlocksAreDecoded():
+    pe = withDirectory("BASE RELOCATION", relocationBlock(0x1000, [0x3004, 0x3008]) + relocationBlock(0x2000, [0xA010, 0]))
+    assert [(block["Page RVA"], block["Entries"]) for block in pe.iterRelocations()] == [(0x1000, [(3, 4), (3, 8)]), (0x2000, [(10, 0x10), (0, 0)])]
+
+def testRelocationBlockPastTheTableIsAnAnomaly():
+    pe = withDirectory("BASE RELOCATION", relocationBlock(0x1000, [0x3004, 0x3008]) + relocationBlock(0x2000, [0x3004], 0x100), strict = False)
+    assert [block["Page RVA"] for block in pe.iterRelocations()] == [0x1000]
+    assert pe.warnings == [{"Table": "Relocations", "Message": "Relocation Block Size 0x100 Out of Table"}]
+
+def testRelocationsStopAtTheirLimit():
+    pe = withDirectory("BASE RELOCATION", relocationBlock(0x1000, [0x3004] * 6) + relocationBlock(0x2000, [0x3004] * 6), strict = False, limits = {"Relocations": 8})
+    assert [len(block["Entries"]) for block in pe.iterRelocations()] == [6, 2]
+    assert pe.warnings == [{"Table": "Relocations", "Message": "Relocations Limit of 8 Exceeded"}]
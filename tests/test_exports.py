@@ -0,0 +1,37 @@
+import struct
+
+import PErilica
+from benchmark import buildPE
+
+SECTION_TABLE_OFFSET = 0x80 + 24 + 224 #section headers of the PE32 files built by buildPE
+EXPORT_SIZE_OFFSET = 0x80 + 24 + 96 + 4 #"Size   EXPORT Table" of the same files
+
+def testNamesAndAddressesWithOrdinalGaps():
+    exports = {"Functions": [0x1000, 0, 0x2000, 0x3000], "Names": ["Second", "First", "Alias", "Missing"], "Ordinals": [2, 0, 2, 9]}
+    ordinalNames, addresses = PErilica.resolveExports(exports)
+    assert ordinalNames == {2: "Second", 0: "First", 9: "Missing"} #the first name of an ordinal wins
+    assert addresses == {"Second": 0x2000, "First": 0x1000, "Alias": 0x2000} #names of ordinals past the address table have no address
+    assert PErilica.resolveExports(None) == ({}, {})
+
+#export number 2 of a synthetic DLL forwarded to "NTDLL.RtlForwarded", stored right after the export table
+def forwardingDLL():
+    data = bytearray(buildPE(3, 2, 5, 20, 1, False))
+    pe = PErilica.PEFile(bytes(data))
+    forwarderRVA = pe.opt_header["RVA    EXPORT Table"] + pe.opt_header["Size   EXPORT Table"]
+    rdata = pe.sections[".rdata"]
+    forwarderOffset = forwarderRVA - rdata[1] + rdata[3] #past the virtual size of .rdata, in its raw data
+    functionOffset = pe.physOffset(pe.exports["Address Table RVA"]) + 2 * 4
+    struct.pack_into("<I", data, SECTION_TABLE_OFFSET + 40 + 8, rdata[2]) #virtual size of .rdata covers its raw data
+    struct.pack_into("<I", data, EXPORT_SIZE_OFFSET, pe.opt_header["Size   EXPORT Table"] + 32)
+    struct.pack_into("<I", data, functionOffset, forwarderRVA)
+    data[forwarderOffset:forwarderOffset + 19] = b"NTDLL.RtlForwarded\0"
+    return bytes(data), forwarderRVA
+
+def testForwardersAreReadFromTheExportTable():
+    data, forwarderRVA = forwardingDLL()
+    pe = PErilica.PEFile(data)
+    assert pe.exports["Forwarders"] == {2: "NTDLL.RtlForwarded"}
+    assert pe.exports["Functions"][2] == forwarderRVA
+    name = pe.exportNames[2]
+    assert pe.exportAddresses[name] == forwarderRVA
+    assert len(pe.exportNames) == len(pe.exports["Functions"])
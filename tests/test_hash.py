@@ -0,0 +1,30 @@
+import hashlib
+
+import PErilica
+
+class Imports: #imports as PEFile.iterImports yields them, names of ordinal imports resolved by an ordinal database
+    def __init__(self, directories):
+        self.directories = directories
+
+    def iterImports(self):
+        return iter(self.directories)
+
+def testOrdinalImportsAreHashedLikePefile():
+    pe = Imports([
+        {"Name": "WS2_32.dll", "Thunks": [{"Ordinal": 1, "Hint": None, "Name": "accept"}, {"Ordinal": 999, "Hint": None, "Name": ""}]},
+        {"Name": "OLEAUT32.DLL", "Thunks": [{"Ordinal": 2, "Hint": None, "Name": "DatabaseName"}]},
+        {"Name": "KERNEL32.dll", "Thunks": [{"Ordinal": 1, "Hint": None, "Name": "DatabaseName"}, {"Ordinal": None, "Hint": 0, "Name": "GetProcAddress"}]},
+    ])
+    expected = "ws2_32.accept,ws2_32.ord999,oleaut32.sysallocstring,kernel32.ord1,kernel32.getprocaddress"
+    assert PErilica.imphash(pe) == hashlib.md5(expected.encode()).hexdigest()
+
+def testWsock32HasItsOwnOrdinals():
+    assert PErilica.imphashOrdinals("wsock32.dll")[1100] == "inet_network"
+    assert 1100 not in PErilica.imphashOrdinals("ws2_32.dll")
+    assert PErilica.imphashOrdinals("kernel32.dll") == {}
+
+def testDamagedThunksAreLeftOut():
+    damaged = {"Ordinal": None, "Hint": 0, "Name": ""}
+    pe = Imports([{"Name": "KERNEL32.dll", "Thunks": [damaged, {"Ordinal": None, "Hint": 0, "Name": "GetProcAddress"}, damaged]}])
+    assert PErilica.imphash(pe) == hashlib.md5(b"kernel32.getprocaddress").hexdigest()
+    assert PErilica.imphash(Imports([{"Name": "KERNEL32.dll", "Thunks": [damaged]}])) == ""
@@ -0,0 +1,37 @@
+import mmap
+
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+def testFilesAreMappedAndUnmappedOnClose(tmp_path):
+    path = tmp_path / "synthetic.dll"
+    path.write_bytes(buildPE(3, 2, 5, 20, 1, False))
+    with PErilica.PEFile(str(path)) as pe:
+        assert isinstance(pe.buffer, mmap.mmap)
+        assert pe.imports[0]["Name"] == "lib0.dll"
+    assert pe.buffer.closed
+
+def testEveryBufferTypeDecodesTheSameHeaders():
+    data = buildPE(3, 2, 5, 20, 1, False)
+    expected = PErilica.PEFile(data).toDict()
+    for source in (bytearray(data), memoryview(data), memoryview(data).cast("I")):
+        assert PErilica.PEFile(source).toDict() == expected
+
+def testHeadersAreDecodedIntoNamedFields():
+    pe = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False))
+    assert pe.mz_header["Signature"] == PErilica.MZ_SIGNATURE
+    assert (pe.pe_header["Signature"], pe.pe_header["Number of Sections"]) == (PErilica.PE_SIGNATURE, 3)
+    assert pe.opt_header["Magic"] == PErilica.PE32_MAGIC
+    assert list(pe.sections) == [".text", ".rdata", ".data0"]
+    assert pe.sections[".text"][:4] == [1024, 0x1000, 1024, 512]
+
+@pytest.mark.parametrize("data", [b"", b"MZ", b"MZ" + bytes(100), b"ZM" + bytes(100), buildPE(3, 2, 5, 20, 1, False)[:0x90]])
+def testOtherFilesAreNotPE(data, tmp_path):
+    with pytest.raises(PErilica.PEFormatError, match = "Not PE File Format"):
+        PErilica.PEFile(data)
+    path = tmp_path / "other.bin"
+    path.write_bytes(data)
+    with pytest.raises(PErilica.PEFormatError, match = "Not PE File Format"):
+        PErilica.PEFile(str(path))
@@ -0,0 +1,32 @@
+import struct
+
+import PErilica
+from benchmark import buildPE
+
+def testPE32AndPE32PlusHeadersShareFieldNames():
+    pe32 = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False))
+    pe32plus = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, True))
+    assert (pe32.opt_header["Magic"], pe32plus.opt_header["Magic"]) == (PErilica.PE32_MAGIC, PErilica.PE32PLUS_MAGIC)
+    assert (pe32.pe_header["Size of Optional Header"], pe32plus.pe_header["Size of Optional Header"]) == (224, 240)
+    assert pe32plus.opt_header["Image Base"] == 0x180000000 #64-bit field
+    assert "Base of Data" in pe32.opt_header and "Base of Data" not in pe32plus.opt_header
+    assert set(pe32.opt_header) - set(pe32plus.opt_header) == {"Base of Data"}
+    assert list(pe32.sections) == list(pe32plus.sections)
+    assert [directory["Name"] for directory in pe32plus.imports] == ["lib0.dll", "lib1.dll"]
+    assert pe32plus.imports[0]["Thunks"][:2] == [{"Ordinal": 1, "Hint": None, "Name": ""}, {"Ordinal": None, "Hint": 1, "Name": "Function_0_1"}]
+
+#synthetic PE32+ file with the second import thunk of the first DLL changed by function(value of the thunk)
+def patchedThunk(function):
+    data = bytearray(buildPE(3, 2, 5, 20, 1, True))
+    pe = PErilica.PEFile(bytes(data))
+    offset = pe.physOffset(pe.imports[0]["Import Name Table RVA"]) + 8
+    struct.pack_into("<Q", data, offset, function(struct.unpack_from("<Q", data, offset)[0]))
+    return bytes(data)
+
+def testBit63IsTheOrdinalFlagOfPE32Plus():
+    pe = PErilica.PEFile(patchedThunk(lambda thunk: (1 << 63) | 7))
+    assert pe.imports[0]["Thunks"][1] == {"Ordinal": 7, "Hint": None, "Name": ""}
+
+def testBit31IsNotTheOrdinalFlagOfPE32Plus():
+    pe = PErilica.PEFile(patchedThunk(lambda thunk: thunk | (1 << 31))) #hint/name RVAs are 31 bits wide, the bit is ignored
+    assert pe.imports[0]["Thunks"][1] == {"Ordinal": None, "Hint": 1, "Name": "Function_0_1"}
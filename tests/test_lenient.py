@@ -0,0 +1,34 @@
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+#file cut off right after its export directory, so all three export tables start past the end of the file
+def truncatedExports():
+    data = buildPE(3, 2, 5, 20, 1, False)
+    with PErilica.PEFile(data) as pe:
+        offset = pe.physOffset(pe.opt_header["RVA    EXPORT Table"])
+    return data[:offset + PErilica.EXPORT_DIRECTORY_LAYOUT.size]
+
+def testTablesPastEndOfFileAreWarnings():
+    pe = PErilica.PEFile(truncatedExports(), strict = False)
+    exports = pe.exports
+    assert exports["Name"] == "synthetic.dll"
+    assert exports["Functions"] == exports["Names"] == exports["Ordinals"] == []
+    assert [warning["Message"] for warning in pe.warnings] == ["Export Address Table Out of File", "Export Name Pointer Table Out of File", "Export Ordinal Table Out of File"]
+
+def testTablesPastEndOfFileStopStrictParsing():
+    pe = PErilica.PEFile(truncatedExports())
+    with pytest.raises(PErilica.PEFormatError):
+        pe.exports
+
+def testLenientCommandLineParsesTruncatedFile(tmp_path, capsysbinary):
+    path = tmp_path / "truncated.dll"
+    path.write_bytes(truncatedExports())
+    assert PErilica.main([str(path), "--lenient", "--format", "jsonl"]) == PErilica.EXIT_SUCCESS
+    assert b"Export Address Table Out of File" in capsysbinary.readouterr().out
+
+def testWarningsOverLimitAreCounted():
+    pe = PErilica.PEFile(truncatedExports(), strict = False, limits = {"Warnings": 1})
+    pe.exports
+    assert pe.warnings == [{"Table": "Exports", "Message": "Export Address Table Out of File"}, {"Table": "Warnings", "Message": "2 Further Warnings Suppressed"}]
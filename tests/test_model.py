@@ -0,0 +1,33 @@
+import PErilica
+from benchmark import buildPE
+
+def testTablesAreParsedOnFirstAccess():
+    pe = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False))
+    assert pe._imports is PErilica.PEFile._UNPARSED and pe._exports is PErilica.PEFile._UNPARSED
+    imports = pe.imports
+    assert pe._exports is PErilica.PEFile._UNPARSED
+    assert pe.imports is imports
+    assert [len(directory["Thunks"]) for directory in imports] == [5, 5]
+    assert pe.exports["Name"] == "synthetic.dll" and len(pe.exports["Functions"]) == 20
+
+def testImportsAreStreamedWithoutBeingKept():
+    pe = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False))
+    directories = list(pe.iterImports(False))
+    assert [directory["Name"] for directory in directories] == ["lib0.dll", "lib1.dll"]
+    assert "Thunks" not in directories[0]
+    assert pe._imports is PErilica.PEFile._UNPARSED
+    assert [directory["Thunks"] for directory in pe.iterImports()] == [directory["Thunks"] for directory in pe.imports]
+
+def testFileWithoutExportsHasNoExportTable():
+    pe = PErilica.PEFile(buildPE(3, 2, 5, 0, 1, False))
+    assert pe.exports is None and pe.exportDirectory() is None
+    assert pe.exportNames == {} and pe.exportAddresses == {}
+
+def testHeadersOnlyReadsTheBeginningOfTheFile(tmp_path):
+    data = buildPE(8, 2, 5, 2000, 1, False)
+    path = tmp_path / "synthetic.dll"
+    path.write_bytes(data)
+    pe = PErilica.PEFile(str(path), headersOnly = True)
+    assert len(pe.buffer) <= PErilica.HEADER_READ_SIZE < len(data)
+    full = PErilica.PEFile(data)
+    assert (pe.mz_header, pe.pe_header, pe.opt_header, pe.sections) == (full.mz_header, full.pe_header, full.opt_header, full.sections)
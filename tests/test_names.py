@@ -0,0 +1,41 @@
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+@pytest.fixture
+def nameCache(monkeypatch): #empty process-wide name cache of 1000 bytes
+    monkeypatch.setattr(PErilica, "_nameCache", {})
+    monkeypatch.setattr(PErilica, "_nameCacheBytes", 0)
+    monkeypatch.setattr(PErilica, "NAME_CACHE_BYTES", 1000)
+    return PErilica
+
+def testNamesAreReadUpToTheTerminatorOrTheLongestName():
+    buffer = b"KERNEL32.dll\0GetProcAddress\0" + b"A" * 20
+    for source in (buffer, memoryview(buffer)):
+        strings = PErilica.StringTable(source, 16)
+        assert [strings.read(0), strings.read(13), strings.read(28), strings.read(len(buffer))] == ["KERNEL32.dll", "GetProcAddress", "A" * 16, ""]
+
+def testNamesAreInternedAcrossFiles(nameCache):
+    first = PErilica.StringTable(b"LoadLibraryA\0").read(0)
+    second = PErilica.StringTable(bytearray(b"xxLoadLibraryA\0")).read(2)
+    assert first == second and first is second
+    assert list(nameCache._nameCache) == [b"LoadLibraryA"]
+
+def testNameCacheStopsGrowingAtItsBound(nameCache):
+    buffer = b"".join(b"Function_" + str(i).encode() + b"\0" for i in range(100))
+    strings = PErilica.StringTable(buffer)
+    names = [strings.readOnce(offset) for offset in range(0, len(buffer)) if offset == 0 or buffer[offset - 1] == 0]
+    assert names == ["Function_" + str(i) for i in range(100)]
+    assert 0 < len(nameCache._nameCache) < 100
+    assert nameCache._nameCacheBytes < nameCache.NAME_CACHE_BYTES + 2 * 100 #at most one entry past the bound
+    assert PErilica.StringTable(buffer).read(0) == "Function_0"
+
+def testLongNamesAreNotInterned(nameCache):
+    name = b"N" * (PErilica.INTERN_NAME_LENGTH + 1)
+    assert PErilica.StringTable(name + b"\0", len(name)).read(0) == name.decode()
+    assert nameCache._nameCache == {}
+
+def testNamesOfBytearrayBuffersAreInterned():
+    data = buildPE(3, 2, 5, 20, 1, False)
+    assert PErilica.PEFile(bytearray(data)).imports == PErilica.PEFile(data).imports
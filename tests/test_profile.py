@@ -0,0 +1,54 @@
+import socket
+
+import PErilica
+from benchmark import buildPE
+
+def testNestedStagesAreTimedWithoutTheirChildren():
+    metrics = []
+    profiler = PErilica.Profiler([lambda metric, value, kind: metrics.append((metric, kind))])
+    with profiler.stage("Outer"):
+        with profiler.stage("Inner"):
+            sum(range(10000))
+    profiler.count("Files", 2)
+    assert metrics == [("Inner", "ms"), ("Outer", "ms"), ("Files", "c")]
+    assert profiler.stages["Outer"][0] == profiler.stages["Inner"][0] == 1
+    assert profiler.counters == {"Files": 2}
+    report = profiler.report()
+    assert report[:2] == ["Profile", "======="] and any(line.split()[:2] == ["Inner", "1"] for line in report)
+
+def testProfilesOfWorkersAreMerged():
+    worker, main = PErilica.Profiler(), PErilica.Profiler()
+    worker.add("Imports", 0.5)
+    worker.count("Files")
+    main.add("Imports", 0.25, 2)
+    main.merge(worker.take())
+    assert main.stages == {"Imports": [3, 0.75]} and main.counters == {"Files": 1}
+    assert worker.take() == ({}, {})
+
+def testParsingReportsStagesAndCounters():
+    profiler = PErilica.Profiler()
+    previous = PErilica.setProfiler(profiler)
+    try:
+        with PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False)) as pe:
+            pe.imports
+    finally:
+        PErilica.setProfiler(previous)
+    assert "Headers" in profiler.stages and "Imports" in profiler.stages
+    assert profiler.counters["Files"] == 1 and profiler.counters["RVA Lookups"] > 0
+
+def testMetricsAreWrittenInStatsdFormat(tmp_path):
+    sink = PErilica.MetricsSink(str(tmp_path / "metrics.log"), "test.")
+    sink("Export Names", 0.1534, "ms")
+    sink("RVA Lookups", 2048, "c")
+    sink.close()
+    assert (tmp_path / "metrics.log").read_text() == "test.export_names:0.153|ms\ntest.rva_lookups:2048|c\n"
+
+def testMetricsAreSentAsDatagrams():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5)
+    sink = PErilica.MetricsSink("udp://127.0.0.1:" + str(receiver.getsockname()[1]))
+    sink("Files", 1, "c")
+    sink.close()
+    assert receiver.recv(100) == b"perilica.files:1|c"
+    receiver.close()
@@ -0,0 +1,44 @@
+import json
+import struct
+
+import pytest
+
+import PErilica
+from benchmark import buildPE
+
+ENTRY_POINT_OFFSET = 0x80 + 24 + 16 #"Address of Entry Point" of the files built by buildPE
+
+def testEntryPointOutsideSectionsHasNoOffset(tmp_path, capsysbinary):
+    data = bytearray(buildPE(3, 2, 5, 20, 1, False))
+    struct.pack_into("<I", data, ENTRY_POINT_OFFSET, 0x900000)
+    path = tmp_path / "entry.dll"
+    path.write_bytes(data)
+    assert PErilica.main([str(path), "--lenient", "--fields", "opt", "--format", "jsonl"]) == PErilica.EXIT_SUCCESS
+    header = json.loads(capsysbinary.readouterr().out)["Optional Header"]
+    assert header["Address of Entry Point"] == 0x900000
+    assert header["Entry Point Offset"] is None
+
+def testFieldsFollowTheirGroup():
+    projection = PErilica.Projection("imports.dll, name; sections.name,rva,opt.AddressOfEntryPoint,size_of_image")
+    assert projection.groups == {"Imports": ["Name"], "Sections": ["Name", "RVA"], "Optional Header": ["Address of Entry Point", "Size of Image"]}
+    assert projection.headersOnly is False
+
+def testGroupsWithoutFieldsSelectEverything():
+    projection = PErilica.Projection("mz,pe.*,opt.magic,opt")
+    assert projection.groups == {"MZ Header": None, "PE Header": None, "Optional Header": None}
+    assert projection.headersOnly is True
+    assert PErilica.Projection("sections.entropy").analyzesSections and not PErilica.Projection("sections.name").analyzesSections
+
+def testUnknownGroupsAndFieldsAreErrors():
+    with pytest.raises(ValueError, match = "Unknown group \"headers\""):
+        PErilica.Projection("headers.magic")
+    with pytest.raises(ValueError, match = "Unknown field \"dll\" of Sections"):
+        PErilica.Projection("sections.name,dll")
+    with pytest.raises(ValueError, match = "Unknown field \"magic\" of PE Header"):
+        PErilica.Projection("pe.magic")
+
+def testProjectionReadsOnlyTheSelectedParts():
+    pe = PErilica.PEFile(buildPE(3, 2, 5, 20, 1, False))
+    record = PErilica.Projection("imports.dll,exports.name,opt.entrypointoffset").project(pe)
+    assert record == {"Path": None, "Imports": [{"Name": "lib0.dll"}, {"Name": "lib1.dll"}], "Exports": {"Name": "synthetic.dll"}, "Optional Header": {"Entry Point Offset": 0x200}}
+    assert pe._exports is PErilica.PEFile._UNPARSED and pe._imports is PErilica.PEFile._UNPARSED #directories were read without their tables
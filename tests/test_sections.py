@@ -0,0 +1,26 @@
+import pytest
+
+import PErilica
+
+#{section name : [Virtual Size, RVA, Size of Raw Data, Pointer to Raw Data]}, given out of RVA order
+SECTIONS = {".data": [0x200, 0x3000, 0x200, 0x800], ".text": [0x1000, 0x1000, 0x400, 0x400], ".bss": [0, 0x5000, 0x100, 0xA00], ".empty": [0, 0x6000, 0, 0]}
+
+def testRVAsAreTranslatedBySection():
+    index = PErilica.SectionIndex(SECTIONS, 0x400)
+    assert index.calcPhysOffset(0x1000) == 0x400
+    assert index.calcPhysOffset(0x1FFF) == 0x13FF
+    assert index.calcPhysOffset(0x3010) == 0x810
+    assert index.calcPhysOffset(0x50FF) == 0xAFF #no virtual size: raw size is used
+
+def testHeaderRVAsAreMappedOneToOne():
+    index = PErilica.SectionIndex(SECTIONS, 0x400)
+    assert index.calcPhysOffset(0) == 0
+    assert index.calcPhysOffset(0x3FF) == 0x3FF
+    with pytest.raises(PErilica.RVAError):
+        index.calcPhysOffset(0x400)
+
+@pytest.mark.parametrize("RVA", [0x2000, 0x3200, 0x5100, 0x6000, 0x900000])
+def testRVAsOutsideSectionsRaise(RVA):
+    index = PErilica.SectionIndex(SECTIONS, 0x400)
+    with pytest.raises(PErilica.RVAError, match = "Outside of All Sections"):
+        index.calcPhysOffset(RVA)
@@ -0,0 +1,71 @@
+import asyncio
+
+import PErilica
+from benchmark import buildPE
+
+#starts the service on a Unix socket, sends every request on its own connection and returns the responses
+def exchange(tmp_path, requests, service = None):
+    service = service or PErilica.ParseService(1, 1, 1)
+    address = str(tmp_path / "service.sock")
+
+    async def run():
+        server = asyncio.ensure_future(service.serve(address))
+        for i in range(100):
+            if ((tmp_path / "service.sock").exists()):
+                break
+            await asyncio.sleep(0.05)
+        responses = []
+        try:
+            for request in requests:
+                reader, writer = await asyncio.open_unix_connection(address)
+                writer.write(request)
+                responses.append(await reader.read())
+                writer.close()
+        finally:
+            server.cancel()
+            try:
+                await server
+            except asyncio.CancelledError:
+                pass
+        return responses
+
+    return asyncio.run(run())
+
+def status(response):
+    return int(response.split(b" ")[1])
+
+def testUploadWithoutNameIsNamedUpload(tmp_path):
+    data = buildPE(3, 2, 5, 20, 1, False)
+    response, = exchange(tmp_path, [b"POST /parse?format=hash HTTP/1.1\r\nContent-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data])
+    assert status(response) == 200
+    assert response.split(b"\r\n\r\n", 1)[1].startswith(b"upload    Imphash: ")
+
+def testMalformedHeadersAreRejected(tmp_path):
+    tooMany = b"GET /status HTTP/1.1\r\n" + b"X: y\r\n" * (PErilica.SERVICE_MAX_HEADERS + 1) + b"\r\n"
+    tooLong = b"GET /status HTTP/1.1\r\nX: " + b"y" * (1 << 17) + b"\r\n\r\n"
+    responses = exchange(tmp_path, [tooMany, tooLong])
+    assert [status(response) for response in responses] == [431, 431]
+
+def testSlowHeadersTimeOut(tmp_path):
+    response, = exchange(tmp_path, [b"GET /status HTTP/1.1\r\n"])
+    assert status(response) == 408
+
+def testStalledBodyTimesOutAndFreesItsSlot(tmp_path):
+    data = buildPE(3, 2, 5, 20, 1, False)
+    stalled = b"POST /parse?format=hash HTTP/1.1\r\nContent-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data[:100]
+    complete = b"POST /parse?format=hash HTTP/1.1\r\nContent-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data
+    service = PErilica.ParseService(1, 1, 1)
+    #more stalled uploads than slots (queue size + workers), every one of them gives its slot back
+    responses = exchange(tmp_path, [stalled] * 3 + [complete], service)
+    assert [status(response) for response in responses] == [408, 408, 408, 200]
+    assert service.slots._value == service.queueSize + service.workers
+
+def testUnexpectedErrorsAreAnswered(tmp_path):
+    service = PErilica.ParseService(1, 1, 1)
+    async def failingRequest(reader):
+        await reader.readline()
+        raise RuntimeError("broken")
+    service._request = failingRequest
+    response, = exchange(tmp_path, [b"GET /status HTTP/1.1\r\n"], service)
+    assert status(response) == 500
+    assert b"RuntimeError: broken" in response